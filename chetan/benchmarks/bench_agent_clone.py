@@ -0,0 +1,107 @@
+"""Benchmark creating agents from the default loop and language model, and forking a long context.
+
+Agents are added through `SessionManager.agents.add`, which clones the default agent loop and
+language model for each one. The loop uses a module holding a large embedding matrix, standing in
+for embedding models and indexes. The context benchmark snapshots a context and writes to both
+branches.
+
+Run from `chetan/` with `PYTHONPATH=python python benchmarks/bench_agent_clone.py`.
+"""
+
+import argparse
+import copy
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+
+from bench_context_items import DictLM, fill
+
+from chetan._mgr import SessionManager
+from chetan.agent import Agent, AgentLoop
+from chetan.agent.module import AgentLoopModule, prologue
+from chetan.events import NullSink, set_sink
+from chetan.types.context.agent import EntityMessage
+from chetan.types.context.agent.iteration import AgentContext
+
+
+class EmbeddingModule(AgentLoopModule):
+    def __init__(self, rows: int):
+        super().__init__()
+        self.matrix = np.random.default_rng(0).random((rows, 384), dtype=np.float32)
+
+    def setup(self): ...
+
+    @prologue
+    def noop(self, context, *args, **kwargs): ...
+
+
+def measure(fn):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, size
+
+
+def bench_agents(count: int, rows: int):
+    mgr = SessionManager()
+    mgr.lm["default"] = DictLM()
+    mgr.agentloop["default"] = AgentLoop(mgr).use(EmbeddingModule(rows))
+
+    def add():
+        for i in range(count):
+            mgr.agents.add(
+                Agent(
+                    id=f"agent-{i}",
+                    name=f"Agent {i}",
+                    description="Benchmark agent",
+                    role="assistant",
+                    system_prompt="Be brief.",
+                )
+            )
+
+    _, elapsed, size = measure(add)
+    print(
+        f"agents  {count / elapsed:10.1f} agents/s  {size / count / 1024:10.1f} KiB/agent "
+        f"(module state {rows * 384 * 4 / 2**20:.1f} MiB)"
+    )
+
+
+def bench_snapshot(iterations: int):
+    context = AgentContext(_lm=DictLM())
+    fill(context, iterations)
+
+    if hasattr(context, "snapshot"):
+        branch, elapsed, size = measure(context.snapshot)
+        print(f"snapshot {elapsed * 1e3:9.2f} ms  {size / 1024:10.1f} KiB")
+    else:
+        branch = None
+    _, elapsed, size = measure(lambda: copy.deepcopy(context))
+    print(f"deepcopy {elapsed * 1e3:9.2f} ms  {size / 1024:10.1f} KiB")
+
+    if branch is not None:
+        branch.add_item(EntityMessage(content="what if?"), "prologue")
+        context.add_item(EntityMessage(content="as planned"), "prologue")
+        assert branch.latest().prologue[-1].content == "what if?"
+        assert context.latest().prologue[-1].content == "as planned"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agents", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--iterations", type=int, default=10_000)
+    args = parser.parse_args()
+    set_sink(NullSink())
+
+    bench_agents(args.agents, args.rows)
+    bench_snapshot(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark checkpointing an agent loop to a `ContextJournal` and recovering from it.
+
+Each iteration is built the way the loop builds it, with a checkpoint after every stage: the
+prologue, the response, the tool result, the process function and the epilogue. The checkpoint
+cost is reported per stage with and without fsync, and recovery is `ContextJournal.restore`, i.e.
+reading the journal, rebuilding the context and replaying it into the language model.
+
+Run from `chetan/` with `PYTHONPATH=python python benchmarks/bench_checkpoint.py`.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from bench_context_items import DictLM
+
+from chetan.events import NullSink, set_sink
+from chetan.tools import AgentToolCall
+from chetan.types.context.agent import (
+    AgentResponse,
+    AgentToolCallResult,
+    AgentToolCallResults,
+    EntityMessage,
+)
+from chetan.types.context.agent.iteration import AgentContext
+from chetan.types.context.agent.journal import ContextJournal
+
+
+def run(context: AgentContext, iterations: int):
+    for i in range(iterations):
+        context.new()
+        context.add_item(EntityMessage(role="user", content=f"question {i} about the weather"), "prologue")
+        context.checkpoint("prologue")
+        context.add_item(
+            AgentResponse(
+                content=f"let me check {i}",
+                tool_calls=[AgentToolCall(id=f"call_{i}", tool_name="weather.get", tool_args={"city": "Pune"})],
+            ),
+            "process",
+        )
+        context.checkpoint("response")
+        result = AgentToolCallResult(id=f"call_{i}", results="31C, sunny")
+        context.checkpoint("tool_result", result=result)
+        context.add_item(AgentToolCallResults(tool_call_results=[result]), "process")
+        context.add_item(AgentResponse(content=f"It is 31C and sunny in Pune ({i})."), "process")
+        context.checkpoint("process")
+        context.checkpoint("epilogue")
+
+
+def bench(iterations: int, fsync: bool, directory: str):
+    path = os.path.join(directory, f"journal-{fsync}.jsonl")
+    context = AgentContext(_lm=DictLM())
+    context.journal = ContextJournal(path, fsync=fsync)
+
+    start = time.perf_counter()
+    run(context, iterations)
+    elapsed = time.perf_counter() - start
+    context.journal.close()
+
+    start = time.perf_counter()
+    restored, checkpoint = ContextJournal(path).restore(DictLM())
+    recovery = time.perf_counter() - start
+    assert len(restored) == iterations and checkpoint.stage == "epilogue"
+
+    print(
+        f"iterations {iterations:6}  fsync {str(fsync):5}  "
+        f"checkpoint {elapsed / (iterations * 5) * 1e6:9.1f} us  "
+        f"journal {os.path.getsize(path) / 1024:9.1f} KiB  recovery {recovery * 1e3:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, nargs="*", default=[100, 1_000, 5_000])
+    args = parser.parse_args()
+    set_sink(NullSink())
+
+    with tempfile.TemporaryDirectory() as directory:
+        for iterations in args.iterations:
+            for fsync in (False, True):
+                bench(iterations, fsync, directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark context ids on a long context: adding items, looking up their provider messages and
+the items themselves by id, querying the latest user message, and removing items.
+
+Run from `chetan/` with `PYTHONPATH=python python benchmarks/bench_context_ids.py`.
+"""
+
+import argparse
+import random
+import time
+
+from bench_context_items import DictLM, fill
+
+from asq import query
+
+from chetan.events import NullSink, set_sink
+from chetan.types.context.agent import EntityMessage, SystemMessage
+from chetan.types.context.agent.iteration import AgentContext
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=10_000)
+    parser.add_argument("--removals", type=int, default=500)
+    args = parser.parse_args()
+    set_sink(NullSink())
+
+    context = AgentContext(_lm=DictLM())
+    start = time.perf_counter()
+    fill(context, args.iterations)
+    elapsed = time.perf_counter() - start
+    items = [
+        (item.context_id, section)
+        for iteration in context.iterations
+        for section in ("prologue", "process")
+        for item in iteration[section]
+    ]
+    print(f"add     {len(items) / elapsed / 1e3:8.1f} k items/s ({len(items)} items)")
+
+    lm = context._lm
+    keys = list(lm.chat_context)
+    start = time.perf_counter()
+    for _ in range(10):
+        for key in keys:
+            lm.chat_context[key]
+    elapsed = time.perf_counter() - start
+    print(f"lookup  {10 * len(keys) / elapsed / 1e6:8.2f} M lookups/s")
+
+    start = time.perf_counter()
+    for context_id, _ in items:
+        assert context.find(context_id) is not None
+    elapsed = time.perf_counter() - start
+    print(f"find    {len(items) / elapsed / 1e3:8.1f} k items/s (indexes built on first use)")
+
+    latest = context.latest()
+    start = time.perf_counter()
+    for _ in range(100_000):
+        latest.last(EntityMessage, "prologue", role="user")
+    indexed = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(100_000):
+        query(latest.prologue).where(
+            lambda x: isinstance(x, EntityMessage) and x.role == "user"
+        ).last_or_default(default=None)
+    scanned = time.perf_counter() - start
+    print(f"query   {100_000 / indexed / 1e3:8.1f} k/s indexed, {100_000 / scanned / 1e3:8.1f} k/s scanned")
+
+    # A context-wide query for an item type held by a single iteration, as RAG and memory modules do
+    recalled = latest.add_item(SystemMessage(content="recalled"), "prologue")
+    start = time.perf_counter()
+    for _ in range(100):
+        assert len(context.select(SystemMessage, "prologue")) == 1
+    indexed = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(100):
+        [x for iteration in context.iterations for x in iteration.prologue if isinstance(x, SystemMessage)]
+    scanned = time.perf_counter() - start
+    print(f"select  {indexed * 10:8.3f} ms indexed, {scanned * 10:8.3f} ms scanned, across the context")
+    context.remove_item(recalled, "prologue")
+
+    rng = random.Random(0)
+    victims = rng.sample(items, args.removals)
+    start = time.perf_counter()
+    for context_id, section in victims:
+        assert context.remove_item(context_id, section)
+    elapsed = time.perf_counter() - start
+    print(f"remove  {args.removals / elapsed:8.1f} items/s")
+    assert len(lm.chat_context) == len(keys) - args.removals
+
+
+if __name__ == "__main__":
+    main()
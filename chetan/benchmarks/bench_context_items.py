@@ -0,0 +1,153 @@
+"""Benchmark adding items to an agent context: items/sec and retained bytes per item.
+
+Each message goes through the item model, its `to_lm_legible()` message and the provider dict a
+language model keeps in its chat context. The language model here translates like the OpenAI
+adapter without importing it. Items are logged to a `NullSink`, except in the `--sinks` comparison.
+
+Run from `chetan/` with `PYTHONPATH=python python benchmarks/bench_context_items.py`.
+"""
+
+import argparse
+import gc
+import io
+import os
+import time
+import tracemalloc
+
+from rich.console import Console
+
+from chetan.events import JSONLinesConsumer, NullSink, QueueSink, RichConsumer, set_sink
+from chetan.lm import LanguageModel
+from chetan.tools import AgentToolCall
+from chetan.types.context.agent import (
+    AgentResponse,
+    AgentToolCallResult,
+    AgentToolCallResults,
+    EntityMessage,
+    LMLegibleMessage,
+)
+from chetan.types.context.agent.iteration import AgentContext
+
+
+class DictLM(LanguageModel):
+    def __init__(self):
+        self.chat_context = {}
+        self.chat_context_list = []
+
+    def clone(self):
+        return DictLM()
+
+    async def chat(self, ctx, *args, tools=[], **kwargs): ...
+
+    async def chat_structured(self, ctx, response_model, *args, **kwargs): ...
+
+    def clear_context_but_system(self): ...
+
+    def load_chat_context(self, ctx): ...
+
+    def translate_tools(self, *toolfunctions): ...
+
+    def translate_from_legible_message(self, item, type):
+        if type == "tool_call_result":
+            return {"role": "tool", "tool_call_id": item.tool_call_id, "content": item.content}
+        if type == "agent_response" and item.tool_calls:
+            return {
+                "role": "assistant",
+                "content": item.content,
+                "tool_calls": [
+                    {"id": call.id, "function": {"name": call.tool_name, "arguments": "{}"}, "type": "function"}
+                    for call in item.tool_calls
+                ],
+            }
+        return {"role": item.role, "content": item.content}
+
+
+def fill(context: AgentContext, iterations: int):
+    for i in range(iterations):
+        context.new()
+        context.add_item(EntityMessage(role="user", content=f"question {i} about the weather"), "prologue")
+        context.add_item(
+            AgentResponse(
+                content=f"let me check {i}",
+                tool_calls=[AgentToolCall(id=f"call_{i}", tool_name="weather.get", tool_args={"city": "Pune"})],
+            ),
+            "process",
+        )
+        context.add_item(
+            AgentToolCallResults(tool_call_results=[AgentToolCallResult(id=f"call_{i}", results="31C, sunny")]),
+            "process",
+        )
+        context.add_item(AgentResponse(content=f"It is 31C and sunny in Pune ({i})."), "process")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--sinks", action="store_true", help="compare add_item across event sinks")
+    args = parser.parse_args()
+    items = args.iterations * 4
+
+    if args.sinks:
+        devnull = open(os.devnull, "w")
+        sinks = {
+            "null": lambda: NullSink(),
+            "jsonl": lambda: QueueSink([JSONLinesConsumer(devnull)], max_pending=items),
+            "rich": lambda: QueueSink([RichConsumer(Console(file=io.StringIO()))], max_pending=items),
+        }
+        for name, make in sinks.items():
+            sink = make()
+            set_sink(sink)
+            context = AgentContext(_lm=DictLM())
+            start = time.perf_counter()
+            fill(context, args.iterations // 10)
+            emitted = time.perf_counter() - start
+            sink.flush()
+            written = time.perf_counter() - start
+            sink.close()
+            print(
+                f"add_item {name:<6} {items / 10 / emitted / 1e3:8.1f} k items/s in the loop, "
+                f"{items / 10 / written / 1e3:8.1f} k items/s including the writer"
+            )
+        return
+
+    set_sink(NullSink())
+
+    best = float("inf")
+    for _ in range(3):
+        context = AgentContext(_lm=DictLM())
+        start = time.perf_counter()
+        fill(context, args.iterations)
+        best = min(best, time.perf_counter() - start)
+    print(f"add_item         {items / best / 1e3:8.1f} k items/s")
+
+    messages = [
+        EntityMessage(role="user", content=f"question {i} about the weather") for i in range(items)
+    ]
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for message in messages:
+            message.to_lm_legible()
+        best = min(best, time.perf_counter() - start)
+    print(f"to_lm_legible    {items / best / 1e3:8.1f} k items/s")
+
+    gc.collect()
+    tracemalloc.start()
+    legible = [message.to_lm_legible() for message in messages]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"LMLegibleMessage {size / len(legible) - 8:8.1f} B/item")
+    del legible
+
+    gc.collect()
+    tracemalloc.start()
+    context = AgentContext(_lm=DictLM())
+    fill(context, args.iterations)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"context          {size / items:8.1f} B/item (item, ids and provider dict)")
+    assert isinstance(context.latest().prologue[0].to_lm_legible(), LMLegibleMessage)
+
+
+if __name__ == "__main__":
+    main()
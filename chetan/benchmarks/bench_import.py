@@ -0,0 +1,59 @@
+"""Benchmark import time of chetan's entry points, as reported by `python -X importtime`.
+
+Each import runs in a fresh interpreter `--runs` times; the median is reported. `total` is the
+cumulative time of the import, `chetan` the time spent in chetan's own modules, e.g. building
+pydantic models, and `heavy` lists optional dependencies that were imported along.
+
+Run from `chetan/` with `PYTHONPATH=python python benchmarks/bench_import.py`.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+TARGETS = ["chetan", "chetan.types.context.agent", "chetan.agent", "chetan._mgr", "chetan.modules.rag"]
+HEAVY = ["rich", "tqdm", "docstring_parser", "llama_index", "openai", "groq", "numpy"]
+
+
+def importtime(target: str) -> Tuple[Dict[str, Tuple[int, int]], List[str]]:
+    """Self and cumulative microseconds of each module imported by `import target`."""
+    check = f"import sys; print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}; {check}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(own), int(cumulative))
+    return times, [m for m in result.stdout.strip().split(",") if m]
+
+
+def measure(target: str, runs: int) -> Tuple[float, float, List[str]]:
+    totals, own, heavy = [], [], []
+    for _ in range(runs):
+        times, heavy = importtime(target)
+        totals.append(times[target][1])
+        own.append(sum(t for name, (t, _) in times.items() if name.split(".")[0] == "chetan"))
+    return statistics.median(totals) / 1e3, statistics.median(own) / 1e3, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("targets", nargs="*", default=TARGETS)
+    args = parser.parse_args()
+
+    for target in args.targets:
+        total, own, heavy = measure(target, args.runs)
+        print(f"{target:28} total {total:8.1f} ms  chetan {own:7.1f} ms  heavy {','.join(heavy) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark approximate vector search backends against exact flat search.
+
+Reports build time, queries per second and recall@k for each backend and setting on a synthetic,
+clustered corpus of normalized vectors (real embeddings are clustered, uniform noise is not).
+
+Run from `chetan/` with `PYTHONPATH=python python benchmarks/bench_rag_ann.py --sizes 100000 1000000`.
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from chetan.modules.rag.ann import FlatBackend, HNSWBackend, IVFBackend
+
+
+def make_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(16, n // 500), dim)).astype(np.float32)
+    vectors = np.empty((n, dim), dtype=np.float32)
+    for i in range(0, n, 100_000):
+        m = min(100_000, n - i)
+        vectors[i : i + m] = centers[rng.integers(len(centers), size=m)] + 0.5 * rng.normal(
+            size=(m, dim)
+        ).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def run(backend, matrix, alive, queries, k):
+    start = time.perf_counter()
+    results = [backend.search(matrix, alive, q, k)[0] for q in queries]
+    return results, len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--ef", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--skip-hnsw", action="store_true")
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        matrix = make_vectors(n, args.dim)
+        alive = np.ones(n, dtype=bool)
+        rng = np.random.default_rng(1)
+        queries = matrix[rng.choice(n, args.queries, replace=False)] + 0.1 * rng.normal(
+            size=(args.queries, args.dim)
+        ).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        truth, qps = run(FlatBackend(), matrix, alive, queries, args.k)
+        print(f"\n{n} chunks x {args.dim} dims")
+        print(f"  {'flat':<14} build {0:7.1f}s {qps:9.0f} QPS  recall@{args.k} 1.000")
+
+        def report(label, build, backend):
+            results, qps = run(backend, matrix, alive, queries, args.k)
+            recall = np.mean(
+                [len(set(r) & set(t)) / args.k for r, t in zip(results, truth)]
+            )
+            print(f"  {label:<14} build {build:7.1f}s {qps:9.0f} QPS  recall@{args.k} {recall:.3f}")
+
+        with tempfile.TemporaryDirectory() as path:
+            ivf = IVFBackend(min_rows=0)
+            start = time.perf_counter()
+            ivf.open(path, 0, matrix)
+            build = time.perf_counter() - start
+            for nprobe in args.nprobe:
+                ivf.nprobe = nprobe
+                report(f"ivf nprobe={nprobe}", build, ivf)
+            ivf.close()
+
+            if not args.skip_hnsw:
+                hnsw = HNSWBackend()
+                start = time.perf_counter()
+                hnsw.open(path, 0, matrix)
+                build = time.perf_counter() - start
+                for ef in args.ef:
+                    hnsw.ef = ef
+                    report(f"hnsw ef={ef}", build, hnsw)
+                hnsw.close()
+
+
+if __name__ == "__main__":
+    main()
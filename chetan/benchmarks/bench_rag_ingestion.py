@@ -0,0 +1,77 @@
+"""Benchmark RAG ingestion throughput against the number of workers.
+
+Uses the deterministic `HashingEmbedder` on a synthetic corpus with process workers, since both the
+splitter and the embedder are pure Python and hold the GIL.
+
+Run from `chetan/` with `PYTHONPATH=python python benchmarks/bench_rag_ingestion.py`.
+"""
+
+import argparse
+import os
+import random
+
+from llama_index.core.ingestion import IngestionPipeline
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import Document
+
+from chetan.embed import HashingEmbedder
+from chetan.modules.rag.ingest import IngestionEngine
+
+WORDS = "agent tool memory context index vector chunk token query answer model cache disk".split()
+
+
+def make_corpus(documents: int, sentences: int, duplicates: float) -> dict:
+    rng = random.Random(0)
+    corpus = {}
+    for i in range(documents):
+        if corpus and rng.random() < duplicates:
+            corpus[f"doc{i}"] = Document(text=rng.choice(list(corpus.values())).text)
+            continue
+        text = " ".join(
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))) + "."
+            for _ in range(sentences)
+        )
+        corpus[f"doc{i}"] = Document(text=text)
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=400)
+    parser.add_argument("--sentences", type=int, default=60)
+    parser.add_argument("--duplicates", type=float, default=0.1)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--executor", choices=["thread", "process"], default="process")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.documents, args.sentences, args.duplicates)
+    pipeline = IngestionPipeline(
+        transformations=[SentenceSplitter(chunk_size=128, chunk_overlap=64)]
+    )
+
+    workers = [1]
+    while workers[-1] * 2 <= (os.cpu_count() or 1):
+        workers.append(workers[-1] * 2)
+
+    baseline = None
+    for n in workers:
+        engine = IngestionEngine(
+            pipeline,
+            HashingEmbedder(),
+            batch_size=args.batch_size,
+            workers=n,
+            executor=args.executor,
+            show_progress=False,
+        )
+        engine.run({"warmup": Document(text="warm up the pool")})
+        _, report = engine.run(corpus)
+        engine.shutdown()
+        baseline = baseline or report.seconds
+        print(
+            f"workers={n:<3} {report.chunks_per_second:8.0f} chunks/s "
+            f"speedup {baseline / report.seconds:4.2f}x  ({report})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare peak RSS of syncing a RAG index from a list versus a stream of documents.
+
+Each mode runs in a fresh subprocess, since peak RSS only ever grows. The corpus is generated on
+the fly, so in streaming mode it never exists in memory as a whole.
+
+Run from `chetan/` with `PYTHONPATH=python python benchmarks/bench_rag_streaming.py`.
+"""
+
+import argparse
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+WORDS = "agent tool memory context index vector chunk token query answer model cache disk".split()
+
+
+def generate(documents: int, size: int):
+    from llama_index.core.schema import Document
+
+    rng = random.Random(0)
+    for i in range(documents):
+        words = [rng.choice(WORDS) for _ in range(size // 6)]
+        text = " ".join(f"{w}." if j % 12 == 11 else w for j, w in enumerate(words))
+        yield Document(text=text, metadata={"file_name": f"doc{i}.txt"})
+
+
+def run(mode: str, documents: int, size: int, batch: int):
+    from chetan.embed import HashingEmbedder
+    from chetan.modules.rag.llama_index import LlamaIndexRAGModule
+
+    with tempfile.TemporaryDirectory() as path:
+        if mode == "list":
+            source, batch = (lambda: list(generate(documents, size))), None
+        else:
+            source = lambda: generate(documents, size)
+        module = LlamaIndexRAGModule(
+            data_fn=source,
+            embed_model_fn=HashingEmbedder,
+            index_path=path,
+            ingest_batch_documents=batch,
+        )
+        start = time.perf_counter()
+        module.setup()
+        elapsed = time.perf_counter() - start
+        chunks = len(module.store)
+        module.ingestion.shutdown()
+        module.store.close()
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<7} {chunks:7} chunks in {elapsed:6.1f}s, peak RSS {peak:7.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=4000)
+    parser.add_argument("--size", type=int, default=4000, help="characters per document")
+    parser.add_argument("--batch", type=int, default=256)
+    parser.add_argument("--mode", choices=["list", "stream"])
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args.mode, args.documents, args.size, args.batch)
+        return
+
+    print(f"{args.documents} documents x {args.size} characters")
+    for mode in ("list", "stream"):
+        subprocess.run(
+            [sys.executable, __file__, "--mode", mode]
+            + [f"--documents={args.documents}", f"--size={args.size}", f"--batch={args.batch}"],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark JSON encoding and decoding: context persistence, tool arguments and provider messages.
+
+Compares `chetan.types.serialization` with the standard library as it was called before, with
+`default=str` and four space indents for saved contexts. The context is converted to dicts once,
+so the numbers are for the encoder alone. Provider messages hold `StringRef` contents, which the
+standard library only encodes through a `default` hook.
+
+Run from `chetan/` with `PYTHONPATH=python python benchmarks/bench_serialization.py`.
+"""
+
+import argparse
+import json
+import time
+
+from bench_context_items import DictLM, fill
+
+from chetan.events import NullSink, set_sink
+from chetan.types import serialization
+from chetan.types.context.agent.iteration import AgentContext
+from chetan.types.stringref import StringRef, StringRefJSONEncoder
+
+
+def rate(fn, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return count / (time.perf_counter() - start)
+
+
+def report(name: str, count: int, size: int, old, new):
+    old_rate, new_rate = rate(old, count), rate(new, count)
+    print(
+        f"{name:16} {size / 1024:9.1f} KiB  stdlib {old_rate:10.1f}/s  "
+        f"{serialization.orjson and 'orjson' or 'fallback':>8} {new_rate:10.1f}/s  "
+        f"x{new_rate / old_rate:.1f}"
+    )
+
+
+def bench_context(iterations: int, repeat: int):
+    context = AgentContext(_lm=DictLM())
+    fill(context, iterations)
+    data = {"iterations": [it.to_dict_with_class() for it in context.iterations]}
+
+    saved = json.dumps(data, indent=4, default=str)
+    report(
+        "save context", repeat, len(saved),
+        lambda: json.dumps(data, indent=4, default=str).encode(),
+        lambda: serialization.dumpb(data, indent=True),
+    )
+    encoded = serialization.dumpb(data, indent=True)
+    report("load context", repeat, len(encoded), lambda: json.loads(saved), lambda: serialization.loads(encoded))
+
+
+def bench_tool_args(count: int):
+    args = {
+        "city": "Pune",
+        "days": 7,
+        "units": "metric",
+        "fields": ["temperature", "humidity", "wind", "precipitation"],
+        "location": {"lat": 18.5204, "lon": 73.8567},
+    }
+    encoded = json.dumps(args)
+    report("tool args out", count, len(encoded), lambda: json.dumps(args), lambda: serialization.dumps(args))
+    report("tool args in", count, len(encoded), lambda: json.loads(encoded), lambda: serialization.loads(encoded))
+
+
+def bench_messages(messages: int, count: int):
+    payload = [
+        {"role": "user" if i % 2 else "assistant", "content": StringRef(f"message {i} " * 20)}
+        for i in range(messages)
+    ]
+    size = len(serialization.dumpb(payload))
+    report(
+        "messages",
+        count,
+        size,
+        lambda: json.dumps(payload, cls=StringRefJSONEncoder),
+        lambda: serialization.dumps(payload),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--calls", type=int, default=100_000)
+    args = parser.parse_args()
+    set_sink(NullSink())
+
+    bench_context(args.iterations, args.repeat)
+    bench_tool_args(args.calls)
+    bench_messages(100, args.calls // 100)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Micro-benchmarks of `StringRef`: allocation, memory per item, delegated string methods, and
+pydantic validation of a large context.
+
+Run from `chetan/` with `PYTHONPATH=python python benchmarks/bench_stringref.py`.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from chetan.types.context.agent import EntityMessage
+from chetan.types.stringref import StringRef
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200_000)
+    parser.add_argument("--messages", type=int, default=50_000)
+    args = parser.parse_args()
+
+    texts = [f"message number {i} from the agent" for i in range(args.items)]
+
+    elapsed = timed(lambda: [StringRef(t) for t in texts])
+    print(f"allocate        {args.items / elapsed / 1e6:8.2f} M/s")
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    refs = [StringRef(t) for t in texts]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The list's pointer array is not part of the per-item cost
+    print(f"memory per item {(after - before) / len(refs) - 8:8.1f} B (excluding the text)")
+
+    elapsed = timed(lambda: [r.startswith("message") for r in refs])
+    print(f"startswith      {len(refs) / elapsed / 1e6:8.2f} M/s")
+    elapsed = timed(lambda: [r.upper() for r in refs])
+    print(f"upper           {len(refs) / elapsed / 1e6:8.2f} M/s")
+    elapsed = timed(lambda: [r == "message number 1 from the agent" for r in refs])
+    print(f"__eq__          {len(refs) / elapsed / 1e6:8.2f} M/s")
+    del refs
+
+    raw = [
+        {"role": "user" if i % 2 else "assistant", "name": f"entity-{i % 7}", "content": texts[i % len(texts)]}
+        for i in range(args.messages)
+    ]
+    elapsed = timed(lambda: [EntityMessage.model_validate(m) for m in raw])
+    print(f"model_validate  {args.messages / elapsed / 1e3:8.1f} k messages/s")
+    messages = [EntityMessage.model_validate(m) for m in raw]
+    elapsed = timed(lambda: [m.model_dump() for m in messages])
+    print(f"model_dump      {args.messages / elapsed / 1e3:8.1f} k messages/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark tool registration and per-call argument validation across a large toolset.
+
+Run from `chetan/` with `PYTHONPATH=python python benchmarks/bench_tool_validation.py`.
+"""
+
+import argparse
+import random
+import time
+from typing import List, Literal, Optional
+
+from chetan.tools import Tool, ToolArgumentsError, toolfn
+from chetan.tools.toolbox import Toolbox
+
+
+def make_tool_class(i: int) -> type:
+    def search(self, query: str, limit: int = 10, tags: Optional[List[str]] = None) -> str:
+        """Search something.
+
+        Args:
+            query (str): The query.
+            limit (int): Maximum number of results.
+            tags (List[str]): Tags to filter on.
+        """
+        return query
+
+    def update(self, id: int, status: Literal["open", "closed"], note: str = "") -> str:
+        """Update something.
+
+        Args:
+            id (int): The id.
+            status (str): New status.
+            note (str): Optional note.
+        """
+        return status
+
+    return type(
+        f"BenchTool{i}", (Tool,), {"search": toolfn(search), "update": toolfn(update)}
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tools", type=int, default=300)
+    parser.add_argument("--calls", type=int, default=50_000)
+    args = parser.parse_args()
+
+    toolbox = Toolbox()
+    start = time.perf_counter()
+    for i in range(args.tools):
+        toolbox.register(f"ns{i % 10}.tool{i}", make_tool_class(i)())
+    registration = time.perf_counter() - start
+    print(f"registered {args.tools * 2} tool functions in {registration * 1e3:.1f} ms")
+
+    rng = random.Random(0)
+    calls = []
+    for _ in range(args.calls):
+        i = rng.randrange(args.tools)
+        if rng.random() < 0.5:
+            calls.append((f"ns{i % 10}.tool{i}.search", {"query": "abc", "limit": "5"}))
+        else:
+            calls.append((f"ns{i % 10}.tool{i}.update", {"id": 3, "status": "open"}))
+    calls[::100] = [
+        (path, {"bogus": 1}) for path, _ in calls[::100]
+    ]
+
+    resolved = [(toolbox.resolve(path)[0], raw) for path, raw in calls]
+
+    start = time.perf_counter()
+    errors = 0
+    for fn, raw in resolved:
+        try:
+            fn.validate_args(raw)
+        except ToolArgumentsError:
+            errors += 1
+    validate = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for path, raw in calls:
+        try:
+            toolbox.validate(path, raw)
+        except ToolArgumentsError:
+            pass
+    dispatch = time.perf_counter() - start
+
+    print(f"validate_args: {validate / args.calls * 1e6:.2f} us/call ({errors} rejected)")
+    print(f"resolve + validate: {dispatch / args.calls * 1e6:.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,9 +23,24 @@
 # """
 # )
 
-from ._comm_mgr import CommunicationManager
-from ._mgr import SessionManager
-from ._chetanbase import ChetanbaseClient
+from typing import TYPE_CHECKING
+
+from ._lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from ._comm_mgr import CommunicationManager
+    from ._mgr import SessionManager
+    from ._chetanbase import ChetanbaseClient
+
+# Imported on first access, so that e.g. `import chetan.types` does not build the agent loop
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "CommunicationManager": "._comm_mgr",
+        "SessionManager": "._mgr",
+        "ChetanbaseClient": "._chetanbase",
+    },
+)
 
 
 __all__ = ["SessionManager", "CommunicationManager", "ChetanbaseClient"]
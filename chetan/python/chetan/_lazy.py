@@ -0,0 +1,27 @@
+import importlib
+from typing import Callable, Dict, List, Tuple
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Tuple[Callable, Callable]:
+    """Module `__getattr__` and `__dir__` importing a package's exports on first access.
+
+    Args:
+        package (str): The package's `__name__`.
+        exports (Dict[str, str]): Exported name to the module defining it, relative to the package.
+
+    Returns:
+        Tuple[Callable, Callable]: The package's `__getattr__` and `__dir__`.
+    """
+    namespace = importlib.import_module(package).__dict__
+
+    def __getattr__(name: str):
+        if name not in exports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(exports[name], package), name)
+        namespace[name] = value  # Later lookups skip `__getattr__`
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(namespace) | set(exports))
+
+    return __getattr__, __dir__
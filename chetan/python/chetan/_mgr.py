@@ -6,13 +6,15 @@ from chetan import CommunicationManager
 from chetan.agent import AgentLoop
 from chetan.agent import Agent
 from chetan.entity import Entity
+from chetan.events import get_sink
 from chetan.entity.user import User
 from chetan.lm import LanguageModel
 from chetan.system import System
 
+from chetan.tools.approval import ApprovalManager, CLIApprover
 from chetan.tools.toolbox import Toolbox
 from chetan.types.context.agent.iteration import AgentContext
-from tqdm import tqdm
+from loguru import logger
 
 class IdDict[T](Dict[str, T]):
     def __init__(self, mgr: "SessionManager", *args, **kwargs):
@@ -23,12 +25,13 @@ class IdDict[T](Dict[str, T]):
         for item in items:
             try:
                 if isinstance(item, Agent):
-                    if item._loop is None:
-                        item._loop = self.mgr.agentloop.get("default").clone()
-
                     if item._lm is None:
                         item._lm = self.mgr.lm.get("default").clone()
 
+                    # Clones share the default loop's modules, only the language model is per agent
+                    if item._loop is None:
+                        item._loop = self.mgr.agentloop.get("default").clone(lm=item._lm)
+
                     item._loop.lm = item._lm
                     
                     item.context = AgentContext(_lm=item._lm)
@@ -50,6 +53,7 @@ class SessionManager:
     agentloop: Dict[str, AgentLoop] = {}
 
     tools: Toolbox = Toolbox()
+    approvals: ApprovalManager
     agents: IdDict[Agent]
     users: IdDict[User]
 
@@ -57,17 +61,40 @@ class SessionManager:
 
     def __init__(self, client: ChetanbaseClient = None):
         self.client = client
+        self.approvals = ApprovalManager(human=CLIApprover())
 
         self.agents = IdDict[Agent](self)
         self.users = IdDict[User](self)
 
     def setup(self):
+        from tqdm import tqdm
+
         for mod in tqdm(
             self.agentloop["default"].modules.values(), desc="Setting up modules"
         ):
             if hasattr(mod, "setup"):
                 mod.setup()
 
+    def shutdown(self, timeout: Optional[float] = None):
+        """Wait for modules to finish their background work, e.g. queued memory updates, and for
+        queued context events to be written.
+
+        Args:
+            timeout (Optional[float], optional): Seconds to wait for each module. Defaults to waiting until done.
+        """
+        modules = {
+            id(mod): mod
+            for loop in self.agentloop.values()
+            for mod in loop.modules.values()
+        }
+        for mod in modules.values():
+            if hasattr(mod, "flush"):
+                if mod.flush(timeout=timeout) is False:
+                    logger.warning(
+                        f"Module `{mod.__class__.__name__}` did not finish its background work in time"
+                    )
+        get_sink().flush(timeout=timeout)
+
     def get_entity(self, entity_id: str) -> Entity:
         if entity_id in self.agents:
             return self.agents[entity_id]
@@ -1,4 +1,5 @@
 from .agent import Agent
+from .branch import Branch
 from .loop import AgentLoop
 
-__all__ = ["Agent", "AgentLoop"]
\ No newline at end of file
+__all__ = ["Agent", "AgentLoop", "Branch"]
\ No newline at end of file
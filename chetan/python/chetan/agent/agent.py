@@ -1,9 +1,19 @@
-from typing import Optional
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Union
+from chetan.agent.branch import (
+    Branch,
+    BranchChooser,
+    BranchScorer,
+    best_scored,
+    broadcast,
+    score_branches,
+)
 from chetan.agent.loop import AgentLoop
 from chetan.entity import Entity
 from chetan.lm import LanguageModel
 from chetan.types.context.agent import EntityMessage, SystemMessage
 from chetan.types.context.agent.iteration import AgentContext
+from chetan.types.context.agent.journal import ContextJournal
 from whenever import Instant
 
 
@@ -25,6 +35,18 @@ class Agent(Entity):
             self.context.new()
         await self._loop(self.context, *args, **kwargs)
 
+    async def resume(self, journal: ContextJournal, **kwargs):
+        """Continue the agent's run from the last checkpoint in `journal`, see `AgentLoop.resume`.
+
+        Args:
+            journal (ContextJournal): The journal the agent's context was checkpointed to.
+        """
+        context, checkpoint = journal.restore(self._lm)
+        self.context = context
+        self._system_prompt_injected = len(context) > 0
+        if checkpoint is not None:
+            await self._loop(context, resume=checkpoint, **kwargs)
+
     def apply_system_prompt(self):
         """Set the system prompt for the agent."""
 
@@ -40,17 +62,13 @@ class Agent(Entity):
             )
             self._system_prompt_injected = True
 
-    async def prompt(self, prompt: str, **kwargs):
-        """Set the prompt for the agent."""
-        if len(self.context) == 0:
-            self.apply_system_prompt()
-
-        if len(self.context) == 1 and (
-            self.context.latest().process == [] and self.context.latest().epilogue == []
-        ):
-            ctx = self.context.latest()
+    def _add_prompt(self, context: AgentContext, prompt: str):
+        # Read the tip without `latest()`, which would copy it if shared with a snapshot
+        tip = context.iterations[-1] if context.iterations else None
+        if len(context) == 1 and (tip.process == [] and tip.epilogue == []):
+            ctx = context.latest()
         else:
-            ctx = self.context.new()
+            ctx = context.new()
 
         ctx.add_item(
             EntityMessage(
@@ -58,4 +76,95 @@ class Agent(Entity):
             ),
             "prologue",
         )
+
+    async def prompt(self, prompt: str, **kwargs):
+        """Set the prompt for the agent."""
+        if len(self.context) == 0:
+            self.apply_system_prompt()
+
+        self._add_prompt(self.context, prompt)
         return await self(new_iteration=False, **kwargs)
+
+    async def branch(
+        self,
+        prompts: Optional[Union[str, Sequence[Optional[str]]]] = None,
+        n: Optional[int] = None,
+        params: Optional[Union[Dict[str, Any], Sequence[Dict[str, Any]]]] = None,
+        score: Optional[BranchScorer] = None,
+        choose: Optional[BranchChooser] = None,
+        adopt: bool = True,
+        max_concurrency: Optional[int] = None,
+        **kwargs,
+    ) -> List[Branch]:
+        """Fork the conversation into branches, run them concurrently and keep the best one.
+
+        Each branch runs on a snapshot of the context, which shares the iterations so far with the
+        others, and on a fork of the language model, so every request starts with the same messages
+        and benefits from the provider's prompt caching. Modules run in every branch, so their side
+        effects, e.g. memory updates, are not limited to the chosen one.
+
+        Args:
+            prompts (Optional[Union[str, Sequence[Optional[str]]]], optional): Prompt of each branch, or one for all. Defaults to continuing the conversation.
+            n (Optional[int], optional): Number of branches. Defaults to the number of prompts or params.
+            params (Optional[Union[Dict[str, Any], Sequence[Dict[str, Any]]]], optional): Sampling parameters of each branch, or one set for all, e.g. `{"temperature": 1.0}`.
+            score (Optional[BranchScorer], optional): Scores a finished branch, may be async.
+            choose (Optional[BranchChooser], optional): Picks the branch to keep, or builds one merging several. Defaults to the highest scored branch, or the first successful one without `score`.
+            adopt (bool, optional): Continue the agent's conversation from the chosen branch. Defaults to True.
+            max_concurrency (Optional[int], optional): Branches running at once. Defaults to all.
+
+        Returns:
+            List[Branch]: The branches, in order, with the chosen one first if any.
+        """
+        if n is None:
+            sized = [
+                values
+                for values in (prompts, params)
+                if values is not None and not isinstance(values, (str, dict))
+            ]
+            if not sized:
+                raise ValueError("Pass `n`, or a sequence of prompts or params")
+            n = len(sized[0])
+        prompts = broadcast(prompts, n, "prompts")
+        params = broadcast(params, n, "params")
+
+        if len(self.context) == 0:
+            self.apply_system_prompt()
+
+        branches = []
+        for i in range(n):
+            context = self.context.snapshot()
+            if prompts[i] is not None:
+                self._add_prompt(context, prompts[i])
+            else:
+                context.new()
+            branches.append(Branch(index=i, context=context, prompt=prompts[i], params=params[i] or {}))
+
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+        async def run(branch: Branch):
+            loop = self._loop.clone(lm=branch.context._lm)
+            run_kwargs = {**kwargs, **branch.params}
+            try:
+                if semaphore is None:
+                    await loop(branch.context, **run_kwargs)
+                else:
+                    async with semaphore:
+                        await loop(branch.context, **run_kwargs)
+            except Exception as e:
+                branch.error = repr(e)
+
+        await asyncio.gather(*(run(branch) for branch in branches))
+        if not any(branch.ok for branch in branches):
+            raise RuntimeError(f"All {n} branches failed, the first with {branches[0].error}")
+
+        if score is not None:
+            await score_branches(branches, score)
+        chosen = (choose or best_scored)(branches)
+        if chosen is None:
+            return branches
+
+        if adopt:
+            self.context = chosen.context
+            self._lm = chosen.context._lm
+            self._loop.lm = self._lm
+        return [chosen] + [branch for branch in branches if branch is not chosen]
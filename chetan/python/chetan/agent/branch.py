@@ -0,0 +1,65 @@
+import asyncio
+import inspect
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, TypeVar, Union
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from chetan.types.context.agent.iteration import AgentContext
+
+T = TypeVar("T")
+
+
+class Branch(BaseModel):
+    """One branch of a forked conversation: its context, what it was run with and how it scored."""
+
+    model_config = ConfigDict(defer_build=True)
+
+    index: int
+    context: AgentContext
+    prompt: Optional[str] = None
+    params: Dict[str, Any] = Field(default_factory=dict)  # Passed on to the language model
+    score: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+BranchScorer = Callable[[Branch], Union[float, Awaitable[float]]]
+BranchChooser = Callable[[List[Branch]], Optional[Branch]]
+
+
+def broadcast(values: Optional[Union[T, Sequence[T]]], n: int, name: str) -> List[Optional[T]]:
+    """One value per branch: `values` itself for all of them, or the i-th of a sequence of `n`."""
+    if values is None or isinstance(values, (str, dict)):
+        return [values] * n
+    values = list(values)
+    if len(values) != n:
+        raise ValueError(f"Expected {n} {name}, got {len(values)}")
+    return values
+
+
+def best_scored(branches: List[Branch]) -> Optional[Branch]:
+    """The successful branch with the highest score, the first one on ties.
+
+    When no branch was scored, the first successful one.
+    """
+    succeeded = [branch for branch in branches if branch.ok]
+    scored = [branch for branch in succeeded if branch.score is not None]
+    if not scored:
+        return succeeded[0] if succeeded else None
+    return max(scored, key=lambda branch: branch.score)
+
+
+async def score_branches(branches: List[Branch], score: BranchScorer):
+    async def score_one(branch: Branch):
+        try:
+            value = score(branch)
+            if inspect.isawaitable(value):
+                value = await value
+            branch.score = float(value)
+        except Exception as e:
+            branch.error = f"Scoring failed: {e!r}"
+
+    await asyncio.gather(*(score_one(branch) for branch in branches if branch.ok))
@@ -1,8 +1,12 @@
-from typing import Callable, Dict, List, Self
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional, Self
 from chetan.agent.module import AgentLoopModule
+from chetan.events.sink import INFO, ContextEvent, get_sink
 
 from chetan.lm import LanguageModel
-from chetan.tools import AgentToolCall, Tool
+from chetan.tools import AgentToolCall, Tool, ToolArgumentsError
+from chetan.tools.approval import ApprovalManager, CLIApprover
+from chetan.tools.execution import ToolTimeoutError
 from chetan.tools.toolbox import Toolbox
 from chetan.types.context.agent import (
     AgentResponse,
@@ -13,17 +17,14 @@ from chetan.types.context.agent import (
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
-from asq import query
 from chetan.types.context.agent.iteration import AgentContext
+from chetan.types.context.agent.journal import Checkpoint, ContextJournal
+from chetan.types.serialization import dumps
 from loguru import logger
 import copy
 
-from rich.console import Console
 from whenever import Instant
 
-console = Console()
-console.is_jupyter = False
-
 
 class ProcessFunctionContext:
     def __init__(
@@ -33,6 +34,7 @@ class ProcessFunctionContext:
         tools: List[Tool] = None,
         toolbox: Toolbox = None,
         iteration_context: dict = None,
+        approvals: ApprovalManager = None,
         **kwargs,
     ):
         self.lm = lm
@@ -40,6 +42,7 @@ class ProcessFunctionContext:
         self.tools = tools
         self.toolbox = toolbox
         self.iteration_context = iteration_context
+        self.approvals = approvals or ApprovalManager(human=CLIApprover())
 
         self.kwargs = kwargs
 
@@ -53,6 +56,10 @@ class ProcessFunctionContext:
 
     async def generate_with_tool_call(self):
         """Generate a response from the language model, including tool calls."""
+        # Resumed after the response was recorded, the language model is not asked again
+        if self.iteration_context.pop("resumed", None) in ("response", "tool_result"):
+            return
+
         ctx = self.lm.chat_context_list
         start_time = Instant.now()
         if self.tools:
@@ -78,6 +85,7 @@ class ProcessFunctionContext:
                         ),
                         section="process",
                     )
+                    self.context.checkpoint("response", exit=True)
                     return
 
             self.context.add_item(
@@ -100,11 +108,13 @@ class ProcessFunctionContext:
                 ),
                 section="process",
             )
+            self.context.checkpoint("response")
 
             return
 
         # No content or tool calls, so exit the loop
         self.iteration_context["exit"] = True
+        self.context.checkpoint("response", exit=True)
 
     async def stream_generate(self):
         """Stream a textual response from the language model."""
@@ -121,40 +131,70 @@ class ProcessFunctionContext:
     # TODO
     async def execute_tool_calls(self):
         """Execute tool calls specified in the context."""
-        tool_calls: AgentResponse = (
-            query(self.context.latest().process)
-            .where(lambda x: isinstance(x, AgentResponse))
-            .first_or_default(default=None)
-        )
+        iteration = self.context.latest()
+        tool_calls = iteration.first(AgentResponse, "process")
 
         if not tool_calls or not tool_calls.tool_calls:
             return
 
+        # Calls already answered in this iteration are not run again, nor those finished before a
+        # resume whose batch was not complete
+        calls = [call for call in tool_calls.tool_calls if iteration.tool_result(call.id) is None]
+        if not calls:
+            return
+        finished = {
+            result.id: result
+            for result in self.iteration_context.pop("resumed_tool_results", [])
+        }
+
         self.iteration_context["tool_call_results"] = []
-        # Ask for approval for all tool calls first and store the approvals
-        approvals = {}
-        for call in tool_calls.tool_calls:
-            approval = input(
-                f"Tool call: {call.id} {call.tool_name}({', '.join(f'{k}={repr(v)}' for k, v in call.tool_args.items())}). Do you want to execute it? (Y/n): "
-            )
-            approvals[call.id] = (
-                (approval.lower() == "y")
-                or (approval.lower() == "yes")
-                or (approval == "")
-            )
 
-        # Execute only approved tool calls in parallel and wait for all to finish
-        async def execute_call(call):
-            if not approvals.get(call.id, False):
+        # Validate arguments up front, invalid calls are answered without running the tool
+        validated_args, invalid = {}, {}
+        for call in calls:
+            try:
+                validated_args[call.id] = self.toolbox.validate(
+                    call.tool_name, call.tool_args
+                )
+            except ToolArgumentsError as e:
+                invalid[call.id] = dumps(
+                    {"error": "invalid_arguments", "tool": call.tool_name, "details": e.errors}
+                )
+            except ValueError as e:
+                invalid[call.id] = dumps(
+                    {"error": "unknown_tool", "tool": call.tool_name, "details": str(e)}
+                )
+
+        # Each call runs as soon as it is approved, while others may still be pending
+        async def run_call(call):
+            if call.id in invalid:
+                return AgentToolCallResult(id=call.id, results=invalid[call.id])
+            if not await self.approvals.approve(call, self.context.session_id):
                 return AgentToolCallResult(
                     id=call.id,
                     results="**THE USER REFUSED TO EXECUTE THIS TOOL CALL**",
                 )
-            res = await self.toolbox.call(call.tool_name, **call.tool_args)
+            try:
+                res = await self.toolbox.call(call.tool_name, **validated_args[call.id])
+            except ToolTimeoutError as e:
+                return AgentToolCallResult(id=call.id, results=f"**TOOL CALL FAILED: {e}**")
+            except Exception as e:
+                # A failing call is reported to the model and does not take its siblings down
+                logger.opt(exception=e).warning(f"Tool call {call.tool_name} failed")
+                return AgentToolCallResult(
+                    id=call.id, results=f"**TOOL CALL FAILED: {type(e).__name__}: {e}**"
+                )
             return AgentToolCallResult(id=call.id, results=str(res))
 
+        async def execute_call(call):
+            if call.id in finished:
+                return finished[call.id]
+            result = await run_call(call)
+            self.context.checkpoint("tool_result", result=result)
+            return result
+
         start_time = Instant.now()
-        tasks = [execute_call(call) for call in tool_calls.tool_calls]
+        tasks = [execute_call(call) for call in calls]
         results = await asyncio.gather(*tasks)
         self.iteration_context["tool_call_results"].extend(results)
 
@@ -172,19 +212,58 @@ class ProcessFunctionContext:
         pass
 
 
+class ModuleRegistry:
+    """The modules of an agent loop and their prologue and epilogue functions.
+
+    Read-only and shared by the loop's clones; registering modules creates a new registry.
+    """
+
+    __slots__ = ("modules", "prologue_fns", "epilogue_fns")
+
+    def __init__(
+        self,
+        modules: Mapping[str, AgentLoopModule] = {},
+        prologue_fns: Mapping[str, Dict[str, Callable]] = {},
+        epilogue_fns: Mapping[str, Dict[str, Callable]] = {},
+    ):
+        self.modules: Mapping[str, AgentLoopModule] = MappingProxyType(dict(modules))
+        self.prologue_fns: Mapping[str, Dict[str, Callable]] = MappingProxyType(dict(prologue_fns))
+        self.epilogue_fns: Mapping[str, Dict[str, Callable]] = MappingProxyType(dict(epilogue_fns))
+
+    def with_modules(self, *modules: AgentLoopModule) -> "ModuleRegistry":
+        """A registry with `modules` added, replacing registered modules of the same class."""
+        registered = dict(self.modules)
+        prologue_fns, epilogue_fns = dict(self.prologue_fns), dict(self.epilogue_fns)
+        for module in modules:
+            name = module.__class__.__name__
+            registered[name] = module
+            prologue_fns[name] = module.functions["prologue"]
+            epilogue_fns[name] = module.functions["epilogue"]
+        return ModuleRegistry(registered, prologue_fns, epilogue_fns)
+
+
 class AgentLoop:
     _process_fn: Callable[[ProcessFunctionContext], "asyncio.Future"]
     _retrigger_fn: Callable
 
-    _prologue_fns: Dict[str, Dict[str, Callable]] = {}
-    _epilogue_fns: Dict[str, Dict[str, Callable]] = {}
-
-    modules: Dict[str, AgentLoopModule] = {}
+    _registry: ModuleRegistry = ModuleRegistry()
     lm: LanguageModel
 
     def __init__(self, mgr, *args, **kwargs):
         self.mgr = mgr
 
+    @property
+    def modules(self) -> Mapping[str, AgentLoopModule]:
+        return self._registry.modules
+
+    @property
+    def _prologue_fns(self) -> Mapping[str, Dict[str, Callable]]:
+        return self._registry.prologue_fns
+
+    @property
+    def _epilogue_fns(self) -> Mapping[str, Dict[str, Callable]]:
+        return self._registry.epilogue_fns
+
     async def _async_function_executor_base(
         self,
         functions: Dict[str, Dict[str, Callable]],
@@ -240,6 +319,7 @@ class AgentLoop:
         context: AgentContext,
         *args,
         loop: bool = True,
+        resume: Optional[Checkpoint] = None,
         **kwargs,
     ):
         """Run the agent loop with the provided context.
@@ -247,10 +327,18 @@ class AgentLoop:
         Args:
             context (AgentContext): The context for the agent loop.
             loop (bool, optional): Whether to loop the agent. Defaults to True.
+            resume (Optional[Checkpoint], optional): Continue the latest iteration after this checkpoint of it, see `resume`. Defaults to starting with the prologue.
         """
 
         exited = False
 
+        if resume is not None and resume.stage == "epilogue":
+            # The iteration was complete
+            if resume.exit or not loop:
+                return
+            context.new()
+            resume = None
+
         iteration: int = context.latest().index + 1
 
         # % TODO: Handle a way for the user to pause/resume the loop
@@ -259,29 +347,44 @@ class AgentLoop:
         # % TODO: Make it dynamic and adaptive, so that it adapts to the changes in its modules, tools, etc.
 
         while not exited:
-            console.print(
-                f"[bold green]******************** Iteration {iteration:03d} ********************[/bold green]"
-            )
+            sink = get_sink()
+            if sink.enabled(INFO):
+                sink.emit(ContextEvent("iteration", INFO, iteration=iteration))
 
             # This is storing temporary items like optimized tool calls, etc.
             iteration_context = {
                 "best_tools": self.mgr.tools.flatten(),
             }
 
-            await self.prologue_stage(
-                context=context, iteration_context=iteration_context
-            )
-
-            await self._process_fn(
-                ProcessFunctionContext(
-                    self.lm,
-                    context,
-                    tools=iteration_context.get("best_tools", []),
-                    toolbox=self.mgr.tools,
-                    iteration_context=iteration_context,
-                    **kwargs,
+            stage = None
+            if resume is not None:
+                stage = resume.stage
+                # Read by `ProcessFunctionContext`, to skip the language model and finished tool calls
+                iteration_context["resumed"] = stage
+                iteration_context["resumed_tool_results"] = resume.tool_results
+                if resume.exit:
+                    iteration_context["exit"] = True
+                resume = None
+
+            if stage is None:
+                await self.prologue_stage(
+                    context=context, iteration_context=iteration_context
                 )
-            )
+                context.checkpoint("prologue")
+
+            if stage != "process":
+                await self._process_fn(
+                    ProcessFunctionContext(
+                        self.lm,
+                        context,
+                        tools=iteration_context.get("best_tools", []),
+                        toolbox=self.mgr.tools,
+                        iteration_context=iteration_context,
+                        approvals=self.mgr.approvals,
+                        **kwargs,
+                    )
+                )
+                context.checkpoint("process", exit=bool(iteration_context.get("exit")))
 
             if "exit" in iteration_context:
                 exited = iteration_context["exit"]
@@ -311,10 +414,12 @@ class AgentLoop:
                 #             )
 
                 context.latest().end_time = Instant.now()
+                context.checkpoint("epilogue", exit=True)
 
                 logger.debug("Exiting agent loop.")
                 break
 
+            context.checkpoint("epilogue")
             context.new()
             iteration += 1
 
@@ -332,15 +437,9 @@ class AgentLoop:
         Returns:
             Self: The current instance of the agent loop.
         """
+        # Clones keep the registry they were made with
+        self._registry = self._registry.with_modules(*modules)
         for module in modules:
-            self.modules[module.__class__.__name__] = module
-
-            # register prologue items
-            self._prologue_fns[module.__class__.__name__] = module.functions["prologue"]
-            # register epilogue items
-            self._epilogue_fns[module.__class__.__name__] = module.functions["epilogue"]
-            self.modules[module.__class__.__name__] = module
-
             # Log the names of prologue and epilogue functions
             prologue_keys = list(module.functions["prologue"].keys())
             epilogue_keys = list(module.functions["epilogue"].keys())
@@ -364,6 +463,35 @@ class AgentLoop:
 
         return self
 
-    def clone(self) -> "AgentLoop":
-        """Create a deep copy of the AgentLoop instance."""
-        return copy.deepcopy(self)
+    def clone(self, lm: Optional[LanguageModel] = None) -> "AgentLoop":
+        """Create a loop sharing this one's modules, process function and manager.
+
+        Args:
+            lm (Optional[LanguageModel], optional): Language model of the clone. Defaults to a clone of this loop's.
+        """
+        clone = copy.copy(self)
+        if lm is None and getattr(self, "lm", None) is not None:
+            lm = self.lm.clone()
+        if lm is not None:
+            clone.lm = lm
+        return clone
+
+    async def resume(self, journal: ContextJournal, *args, loop: bool = True, **kwargs) -> AgentContext:
+        """Continue a run from the last checkpoint in its journal, e.g. after the process died.
+
+        The context is rebuilt from the journal and replayed into this loop's language model. The
+        run picks up after the stage it had completed: a recorded response is not requested again
+        and recorded tool results are not run again, by `ProcessFunctionContext`'s helpers. Other
+        work of the process function, and stages that had not completed, run again.
+
+        Args:
+            journal (ContextJournal): The journal the run checkpointed to, which it keeps writing to.
+            loop (bool, optional): Whether to loop the agent. Defaults to True.
+
+        Returns:
+            AgentContext: The restored context, after the run.
+        """
+        context, checkpoint = journal.restore(self.lm)
+        if checkpoint is not None:
+            await self(context, *args, loop=loop, resume=checkpoint, **kwargs)
+        return context
@@ -4,7 +4,7 @@ import functools
 import inspect
 
 # Add imports for tool registration
-from chetan.tools import Tool
+from chetan.tools import Tool, _class_attributes
 
 from loguru import logger
 
@@ -48,25 +48,35 @@ def epilogue(fn):
 class AgentLoopModule(ABC, Tool):
     functions: Dict[str, Dict[str, Callable]]
 
-    def __init__(self, *args, **kwargs):
-        # Create dictionaries to store prologue and epilogue functions
-        self.functions = {"prologue": {}, "epilogue": {}}
-        self.tool_fns = {}
-        self.tool_functions = {}
+    # Per-class cache of decorated prologue/epilogue functions, filled in `__init_subclass__`
+    __agentloop_functions__: Dict[str, Dict[str, Callable]] = {
+        "prologue": {},
+        "epilogue": {},
+    }
 
-        # Inspect class attributes to find decorated functions
-        for attr_name in dir(self.__class__):
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        functions = {"prologue": {}, "epilogue": {}}
+        for attr_name, attr in sorted(_class_attributes(cls).items()):
             if attr_name.startswith("__") and attr_name.endswith("__"):
                 continue  # Skip magic methods
 
-            attr = getattr(self.__class__, attr_name)
-            if callable(attr):
-                # Check if it's a decorated function
-                if hasattr(attr, "__agentloop_item_type__"):
-                    agent_type = attr.__agentloop_item_type__
+            # Check if it's a decorated function
+            if callable(attr) and hasattr(attr, "__agentloop_item_type__"):
+                agent_type = attr.__agentloop_item_type__
+
+                if agent_type in ["prologue", "epilogue"]:
+                    functions[agent_type][attr_name] = attr
+        cls.__agentloop_functions__ = functions
 
-                    if agent_type in ["prologue", "epilogue"]:
-                        self.functions[agent_type][attr_name] = attr
+    def __init__(self, *args, **kwargs):
+        # Copy the per-class tables so instances can add or remove functions independently
+        self.functions = {
+            agent_type: dict(fns)
+            for agent_type, fns in self.__agentloop_functions__.items()
+        }
+        self.tool_fns = {}
+        self.tool_functions = {}
 
         super().__init__(*args, **kwargs)
 
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from chetan.agent import Agent, AgentLoop, Branch
+from chetan.lm import LanguageModel
+from chetan.tools.toolbox import Toolbox
+from chetan.types.context.agent import AgentResponse, EntityMessage
+from chetan.types.context.agent.iteration import AgentContext
+
+
+class DictLM(LanguageModel):
+    def __init__(self):
+        self.chat_context = {}
+        self.chat_context_list = []
+
+    def clone(self):
+        return DictLM()
+
+    async def chat(self, ctx, *args, tools=[], **kwargs): ...
+
+    async def chat_structured(self, ctx, response_model, *args, **kwargs): ...
+
+    def clear_context_but_system(self): ...
+
+    def load_chat_context(self, ctx): ...
+
+    def translate_tools(self, *toolfunctions): ...
+
+    def translate_from_legible_message(self, item, type):
+        return {"role": item.role, "content": str(item.content)}
+
+
+class FakeManager:
+    tools = Toolbox()
+    approvals = None
+
+
+def make_agent() -> Agent:
+    loop = AgentLoop(FakeManager())
+
+    @loop.process
+    async def answer(ctx):
+        if ctx.kwargs.get("temperature", 0) > 1:
+            raise RuntimeError("too hot")
+        prompt = ctx.context.latest().last(EntityMessage, "prologue", role="user")
+        ctx.context.add_item(
+            AgentResponse(content=f"{prompt.content} at {ctx.kwargs.get('temperature', 0)}"),
+            "process",
+        )
+
+    agent = Agent(id="planner", name="Planner", description="Plans", role="assistant", system_prompt="Plan.")
+    agent._lm = DictLM()
+    agent._loop = loop.clone(lm=agent._lm)
+    agent.context = AgentContext(_lm=agent._lm)
+    agent.apply_system_prompt()
+    return agent
+
+
+def test_branch_picks_best_scored():
+    agent = make_agent()
+    asyncio.run(agent.prompt("hello", loop=False))
+    shared = list(agent.context.iterations)
+
+    branches = asyncio.run(
+        agent.branch(
+            "plan a trip",
+            params=[{"temperature": 0.2}, {"temperature": 0.9}, {"temperature": 1.5}],
+            score=lambda branch: branch.context.latest().last(AgentResponse).content.count("9"),
+            loop=False,
+        )
+    )
+
+    assert [branch.index for branch in branches] == [1, 0, 2]
+    chosen = branches[0]
+    assert isinstance(chosen, Branch) and chosen.score == 1
+    assert branches[2].error == "RuntimeError('too hot')" and branches[2].score is None
+
+    # The agent continues from the chosen branch, which shares the earlier iterations
+    assert agent.context is chosen.context and agent._loop.lm is chosen.context._lm
+    assert all(a is b for a, b in zip(agent.context.iterations, shared))
+    assert agent.context.latest().last(AgentResponse).content == "plan a trip at 0.9"
+    assert [m["content"] for m in agent._lm.chat_context_list] == [
+        "Plan.", "hello", "hello at 0", "plan a trip", "plan a trip at 0.9"
+    ]
+
+
+def test_branch_without_score_keeps_first_successful():
+    agent = make_agent()
+    branches = asyncio.run(agent.branch(["a", "b"], params=[{"temperature": 1.5}, {}], loop=False))
+    assert [branch.index for branch in branches] == [1, 0]
+    assert agent.context is branches[0].context
+    assert agent.context.latest().last(AgentResponse).content == "b at 0"
+
+
+def test_branch_without_choice_keeps_context():
+    agent = make_agent()
+    context = agent.context
+
+    branches = asyncio.run(agent.branch(["a", "b"], loop=False, adopt=False))
+    assert [branch.context.latest().last(AgentResponse).content for branch in branches] == ["a at 0", "b at 0"]
+    assert agent.context is context and len(context) == 1
+
+    with pytest.raises(ValueError):
+        asyncio.run(agent.branch(["a", "b"], params=[{}], loop=False))
+    with pytest.raises(RuntimeError):
+        asyncio.run(agent.branch("a", n=2, params={"temperature": 2}, loop=False))
@@ -0,0 +1,178 @@
+import asyncio
+
+import pytest
+
+from chetan.agent import AgentLoop
+from chetan.lm import LanguageModel
+from chetan.tools import AgentToolCall, Tool, toolfn
+from chetan.tools.approval import ApprovalManager
+from chetan.tools.toolbox import Toolbox
+from chetan.types.context.agent import AgentResponse, EntityMessage, SystemMessage, next_context_id
+from chetan.types.context.agent.iteration import AgentContext
+from chetan.types.context.agent.journal import ContextJournal
+
+
+class Crash(BaseException):
+    """Stands in for the process dying, not caught like a failing tool call."""
+
+
+class ScriptLM(LanguageModel):
+    def __init__(self, *responses: AgentResponse):
+        self.chat_context = {}
+        self.chat_context_list = []
+        self.responses = list(responses)
+        self.requests = []
+
+    def clone(self):
+        return ScriptLM()
+
+    async def chat(self, ctx, *args, tools=[], **kwargs):
+        self.requests.append(list(ctx))
+        return self.responses.pop(0)
+
+    async def chat_structured(self, ctx, response_model, *args, **kwargs): ...
+
+    def clear_context_but_system(self): ...
+
+    def load_chat_context(self, ctx): ...
+
+    def translate_tools(self, *toolfunctions): ...
+
+    def translate_from_legible_message(self, item, type):
+        if type == "agent_response" and item.tool_calls:
+            return {"role": "assistant", "calls": [call.id for call in item.tool_calls]}
+        if type == "tool_call_result":
+            return {"role": "tool", "id": item.tool_call_id, "content": str(item.content)}
+        return {"role": item.role, "content": str(item.content)}
+
+
+class Weather(Tool):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+        self.crash = True
+
+    @toolfn(execution="inline")
+    async def get(self, city: str) -> str:
+        """Get the weather in a city."""
+        self.calls.append(city)
+        if city == "Nowhere":
+            raise ValueError(f"unknown city {city}")
+        if city == "Delhi":
+            await asyncio.sleep(0.01)  # Pune finishes first
+            if self.crash:
+                raise Crash()
+        return f"sunny in {city}"
+
+
+class FakeManager:
+    def __init__(self):
+        self.tools = Toolbox()
+        self.weather = Weather()
+        self.tools.register("weather", self.weather)
+        self.approvals = ApprovalManager(default="approve")
+
+
+def make_loop(mgr: FakeManager, lm: ScriptLM) -> AgentLoop:
+    loop = AgentLoop(mgr)
+    loop.lm = lm
+
+    @loop.process
+    async def process(ctx):
+        await ctx.generate_with_tool_call()
+        await ctx.execute_tool_calls()
+
+    return loop
+
+
+def dump(context: AgentContext):
+    return [iteration.to_dict_with_class() for iteration in context.iterations]
+
+
+def tool_calls(*cities):
+    return AgentResponse(
+        tool_calls=[
+            AgentToolCall(id=f"call_{city}", tool_name="weather.get", tool_args={"city": city})
+            for city in cities
+        ]
+    )
+
+
+def test_resume_after_crash(tmp_path):
+    path = str(tmp_path / "session.jsonl")
+    mgr = FakeManager()
+    lm = ScriptLM(tool_calls("Pune", "Delhi"))
+    context = AgentContext(_lm=lm)
+    context.journal = ContextJournal(path)
+    context.new().add_item(SystemMessage(content="Be brief."), "prologue")
+    context.add_item(EntityMessage(role="user", content="Weather in Pune and Delhi?"), "prologue")
+
+    with pytest.raises(Crash):
+        asyncio.run(make_loop(mgr, lm)(context))
+    assert mgr.weather.calls == ["Pune", "Delhi"]
+
+    restored, checkpoint = ContextJournal(path).restore(ScriptLM())
+    assert checkpoint.stage == "tool_result" and not checkpoint.exit
+    assert [result.id for result in checkpoint.tool_results] == ["call_Pune"]
+    assert restored._lm.chat_context_list == lm.chat_context_list
+    assert dump(restored) == dump(context)
+    assert next_context_id() > max(item.context_id for item in restored.latest().items())
+
+    # The response is not requested again and Pune is not asked again
+    mgr.weather.crash = False
+    lm = ScriptLM(AgentResponse(content="Sunny in both.<|stop|>"))
+    resumed = asyncio.run(make_loop(mgr, lm).resume(ContextJournal(path)))
+    assert mgr.weather.calls == ["Pune", "Delhi", "Delhi"]
+    assert len(lm.requests) == 1
+    assert lm.requests[0][-2:] == [
+        {"role": "tool", "id": "call_Pune", "content": "sunny in Pune"},
+        {"role": "tool", "id": "call_Delhi", "content": "sunny in Delhi"},
+    ]
+
+    # The run completed, resuming it again does nothing
+    lm = ScriptLM()
+    again = asyncio.run(make_loop(mgr, lm).resume(ContextJournal(path)))
+    assert dump(again) == dump(resumed) and lm.requests == []
+    assert again.latest().last(AgentResponse).content == "Sunny in both."
+
+
+def test_failing_tool_call_is_reported():
+    mgr = FakeManager()
+    lm = ScriptLM(tool_calls("Nowhere", "Pune"), AgentResponse(content="Only Pune.<|stop|>"))
+    context = AgentContext(_lm=lm)
+    context.new().add_item(EntityMessage(role="user", content="Weather?"), "prologue")
+
+    asyncio.run(make_loop(mgr, lm)(context))
+    assert lm.requests[1][-2:] == [
+        {"role": "tool", "id": "call_Nowhere", "content": "**TOOL CALL FAILED: ValueError: unknown city Nowhere**"},
+        {"role": "tool", "id": "call_Pune", "content": "sunny in Pune"},
+    ]
+
+
+def test_journal_removals_resets_and_torn_writes(tmp_path):
+    path = tmp_path / "session.jsonl"
+    context = AgentContext(_lm=ScriptLM())
+    context.new().add_item(SystemMessage(content="Be brief."), "prologue")
+    context.journal = ContextJournal(str(path), fsync=False)
+    stale = context.add_item(EntityMessage(role="user", content="stale"), "prologue")
+    context.checkpoint("prologue")
+
+    context.remove_item(stale, "prologue")
+    context.new().add_item(EntityMessage(role="user", content="fresh"), "prologue")
+    context.checkpoint("prologue")
+    context.add_item(EntityMessage(role="user", content="lost"), "prologue")
+    with open(path, "ab") as f:
+        f.write(b'{"op": "add", "iter')  # The process died while writing
+
+    restored, checkpoint = ContextJournal(str(path)).restore(ScriptLM())
+    assert checkpoint.stage == "prologue" and checkpoint.iteration == 1
+    assert [m["content"] for m in restored._lm.chat_context_list] == ["Be brief.", "fresh"]
+    assert restored[0].end_time == context[0].end_time and restored.session_id == context.session_id
+    assert path.read_bytes().endswith(b'"exit":false}\n')
+
+    # Clearing is not logged item by item, the next checkpoint writes the whole context
+    restored.clear(retain_system_prompt=True)
+    restored.checkpoint("epilogue")
+    cleared, _ = ContextJournal(str(path)).restore(ScriptLM())
+    assert [m["content"] for m in cleared._lm.chat_context_list] == ["Be brief."]
+    assert len(cleared) == 1
@@ -0,0 +1,45 @@
+from chetan.agent.loop import AgentLoop
+from chetan.agent.module import AgentLoopModule, prologue
+from chetan.tools.toolbox import Toolbox
+
+
+class FakeLM:
+    def clone(self):
+        return FakeLM()
+
+
+class FakeManager:
+    tools = Toolbox()
+
+
+class Greeter(AgentLoopModule):
+    def setup(self): ...
+
+    @prologue
+    def greet(self, context, *args, **kwargs): ...
+
+
+class Farewell(AgentLoopModule):
+    def setup(self): ...
+
+    @prologue
+    def bye(self, context, *args, **kwargs): ...
+
+
+def test_loop_clone_shares_modules():
+    loop = AgentLoop(FakeManager()).use(Greeter())
+    loop.lm = FakeLM()
+
+    clone = loop.clone()
+    assert clone.modules is loop.modules and clone.mgr is loop.mgr
+    assert clone.lm is not loop.lm
+
+    lm = FakeLM()
+    assert loop.clone(lm=lm).lm is lm
+
+    # Registering modules on a clone leaves the original as it was
+    clone.use(Farewell())
+    assert list(clone.modules) == ["Greeter", "Farewell"]
+    assert list(loop.modules) == ["Greeter"]
+    assert list(loop._prologue_fns["Greeter"]) == ["greet"]
+    assert "Farewell" not in AgentLoop(FakeManager()).modules
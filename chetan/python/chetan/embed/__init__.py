@@ -0,0 +1,21 @@
+from .embedder import (
+    CallableEmbedder,
+    Embedder,
+    EmbedderLike,
+    HashingEmbedder,
+    LlamaIndexEmbedder,
+    SentenceTransformerEmbedder,
+    resolve_embedder,
+)
+from .index import VectorIndex
+
+__all__ = [
+    "Embedder",
+    "EmbedderLike",
+    "HashingEmbedder",
+    "SentenceTransformerEmbedder",
+    "LlamaIndexEmbedder",
+    "CallableEmbedder",
+    "resolve_embedder",
+    "VectorIndex",
+]
@@ -0,0 +1,123 @@
+from abc import ABC, abstractmethod
+import re
+import zlib
+from typing import Any, Callable, List, Sequence, Union
+
+import numpy as np
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize the rows of `vectors`, leaving all-zero rows untouched."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class Embedder(ABC):
+    """A local text embedding model producing L2-normalized float32 vectors."""
+
+    def load(self):
+        """Load the model weights. Called lazily before the first `embed`."""
+        pass
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed `texts` into a `(len(texts), dim)` float32 matrix with normalized rows."""
+        ...
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a search query. Override for models that embed queries and documents differently."""
+        return self.embed_one(text)
+
+
+class HashingEmbedder(Embedder):
+    """Deterministic, dependency-free embedder using signed feature hashing of word uni/bigrams.
+
+    It has no semantic understanding, but is fast, stable across processes and good at
+    matching exact identifiers, which makes it a sensible default and test double.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"\w+", text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode())
+                out[row, h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        return normalize(out)
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """Local embedder backed by `sentence-transformers`, loaded on first use."""
+
+    def __init__(self, model_name: str, **kwargs):
+        self.model_name = model_name
+        self.kwargs = kwargs
+        self.model = None
+
+    def load(self):
+        if self.model is None:
+            from sentence_transformers import SentenceTransformer
+
+            self.model = SentenceTransformer(self.model_name, **self.kwargs)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        self.load()
+        return np.asarray(
+            self.model.encode(texts, normalize_embeddings=True), dtype=np.float32
+        )
+
+
+class LlamaIndexEmbedder(Embedder):
+    """Adapter for a llama-index `BaseEmbedding`, so RAG and other modules can share one model."""
+
+    def __init__(self, model: Any):
+        self.model = model
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return normalize(
+            np.asarray(self.model.get_text_embedding_batch(texts), dtype=np.float32)
+        )
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return normalize(
+            np.asarray(self.model.get_query_embedding(text), dtype=np.float32)
+        )
+
+
+class CallableEmbedder(Embedder):
+    """Wraps a plain `texts -> vectors` function."""
+
+    def __init__(self, fn: Callable[[List[str]], Sequence[Sequence[float]]]):
+        self.fn = fn
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return normalize(np.asarray(self.fn(texts), dtype=np.float32))
+
+
+EmbedderLike = Union[str, Embedder, Callable[[List[str]], Sequence[Sequence[float]]]]
+
+
+def resolve_embedder(embedder: EmbedderLike) -> Embedder:
+    """Resolve an embedder from an instance, a `texts -> vectors` function, or a name.
+
+    The name `"hashing"` selects `HashingEmbedder`; any other name is loaded with `sentence-transformers`.
+    """
+    if isinstance(embedder, Embedder):
+        return embedder
+    if isinstance(embedder, str):
+        if embedder == "hashing":
+            return HashingEmbedder()
+        return SentenceTransformerEmbedder(embedder)
+    if callable(embedder):
+        return CallableEmbedder(embedder)
+    raise TypeError(f"Cannot use {type(embedder).__name__} as an embedder")
@@ -0,0 +1,85 @@
+import threading
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class VectorIndex:
+    """A small in-memory exact (flat) cosine-similarity index over normalized vectors."""
+
+    def __init__(self, dim: Optional[int] = None):
+        self.dim = dim
+        self.keys: List[Hashable] = []
+        self._positions: Dict[Hashable, int] = {}
+        self._matrix = np.zeros((0, dim or 0), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._positions
+
+    def upsert(self, keys: Sequence[Hashable], vectors: np.ndarray):
+        """Insert or replace vectors for `keys`."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self.dim is None or len(self.keys) == 0:
+                self.dim = vectors.shape[1]
+                self._matrix = self._matrix.reshape(0, self.dim)
+
+            new_keys, new_rows = [], []
+            for key, vector in zip(keys, vectors):
+                if key in self._positions:
+                    position = self._positions[key]
+                    if position < len(self.keys):
+                        self._matrix[position] = vector
+                    else:
+                        new_rows[position - len(self.keys)] = vector
+                else:
+                    self._positions[key] = len(self.keys) + len(new_keys)
+                    new_keys.append(key)
+                    new_rows.append(vector)
+            if new_rows:
+                self._matrix = np.vstack([self._matrix, np.stack(new_rows)])
+                self.keys.extend(new_keys)
+
+    def remove(self, keys: Sequence[Hashable]):
+        """Remove `keys` from the index, ignoring unknown keys."""
+        with self._lock:
+            drop = {self._positions[k] for k in keys if k in self._positions}
+            if not drop:
+                return
+            keep = [i for i in range(len(self.keys)) if i not in drop]
+            self._matrix = self._matrix[keep]
+            self.keys = [self.keys[i] for i in keep]
+            self._positions = {k: i for i, k in enumerate(self.keys)}
+
+    def search(
+        self,
+        vector: np.ndarray,
+        k: int = 10,
+        keys: Optional[Sequence[Hashable]] = None,
+    ) -> List[Tuple[Hashable, float]]:
+        """Return the top-`k` `(key, score)` pairs by cosine similarity.
+
+        Args:
+            vector (np.ndarray): A normalized query vector.
+            k (int, optional): Number of results. Defaults to 10.
+            keys (Sequence[Hashable], optional): Restrict the search to these keys. Defaults to None.
+        """
+        with self._lock:
+            if keys is not None:
+                rows = [self._positions[key] for key in keys if key in self._positions]
+                matrix, candidates = self._matrix[rows], [self.keys[i] for i in rows]
+            else:
+                matrix, candidates = self._matrix, self.keys
+
+        if len(candidates) == 0:
+            return []
+
+        scores = matrix @ np.asarray(vector, dtype=np.float32)
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(candidates[i], float(scores[i])) for i in top]
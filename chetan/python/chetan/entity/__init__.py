@@ -1,13 +1,17 @@
 from typing import List, Optional, Type
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 class Entity(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     id: str
     name: Optional[str] = None
     description: str
     
 
 class Connection(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     source: Entity
     target: Entity
 
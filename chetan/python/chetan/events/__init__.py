@@ -0,0 +1,40 @@
+from typing import TYPE_CHECKING
+
+from .sink import (
+    DEBUG,
+    ERROR,
+    INFO,
+    WARNING,
+    ContextEvent,
+    EventConsumer,
+    EventSink,
+    NullSink,
+    QueueSink,
+    get_sink,
+    set_sink,
+)
+from chetan._lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .consumers import JSONLinesConsumer, RichConsumer
+
+# The consumers import `rich`, which is only needed once a sink writes to them
+__getattr__, __dir__ = lazy_exports(
+    __name__, {"JSONLinesConsumer": ".consumers", "RichConsumer": ".consumers"}
+)
+
+__all__ = [
+    "DEBUG",
+    "INFO",
+    "WARNING",
+    "ERROR",
+    "ContextEvent",
+    "EventConsumer",
+    "EventSink",
+    "NullSink",
+    "QueueSink",
+    "get_sink",
+    "set_sink",
+    "JSONLinesConsumer",
+    "RichConsumer",
+]
@@ -0,0 +1,110 @@
+from typing import IO, Optional, Union
+
+from rich.console import Console
+
+from chetan.events.sink import LEVEL_NAMES, ContextEvent, EventConsumer
+from chetan.types.context.agent import (
+    AgentResponse,
+    AgentToolCallResults,
+    EntityMessage,
+    StartToEndObject,
+    SystemMessage,
+)
+from chetan.types.serialization import dumps
+
+
+def trim_content(content, max_length=100):
+    if content is None:
+        return ""
+    return content[:max_length] + "…" if len(content) > max_length else content
+
+
+class RichConsumer(EventConsumer):
+    """Pretty-prints iteration banners and context items to the console."""
+
+    def __init__(self, console: Optional[Console] = None):
+        if console is None:
+            console = Console()
+            console.is_jupyter = False
+        self.console = console
+
+    def print_item(self, title: str, content: str, color: str = "white"):
+        self.console.print(f"[{color}]{title.upper()}[/]: {content}", justify="left")
+
+    def write(self, event: ContextEvent):
+        if event.kind == "iteration":
+            self.console.print(
+                f"[bold green]******************** Iteration {event.iteration:03d} ********************[/bold green]"
+            )
+            return
+
+        item, section = event.item, event.section
+        if isinstance(item, EntityMessage):
+            self.print_item(
+                f"{item.role.upper()}{item.name and f' ({item.name})' or ''}",
+                item.content,
+                color="dodger_blue2" if item.role == "user" else "green1",
+            )
+        elif isinstance(item, AgentResponse):
+            self.print_item("self", item.to_lm_legible().content, color="orange_red1")
+
+            if item.tool_calls:
+                tool_calls = "\n".join(
+                    f"{call.id} {call.tool_name}({', '.join(f'{k}={repr(v)}' for k, v in call.tool_args.items())})"
+                    for call in item.tool_calls
+                )
+                self.print_item("tool-calls", tool_calls, color="magenta3")
+        elif isinstance(item, AgentToolCallResults):
+            tool_results = "\n".join(
+                f"{res.id}: {trim_content(res.results)}"
+                for res in item.tool_call_results
+            )
+            self.print_item("tool-call-results", tool_results, color="cyan2")
+        elif isinstance(item, SystemMessage):
+            self.print_item(
+                "system",
+                trim_content(item.to_lm_legible().content),
+                color="dark_goldenrod",
+            )
+        else:
+            legible = item.to_lm_legible() if isinstance(item, StartToEndObject) else None
+            self.print_item(
+                title=f"{section.upper()}",
+                content=trim_content(getattr(legible, "content", None) or str(item)),
+                color="white",
+            )
+
+
+class JSONLinesConsumer(EventConsumer):
+    """Writes one JSON object per event to a file or stream."""
+
+    def __init__(self, target: Union[str, IO[str]]):
+        self._owned = isinstance(target, str)
+        self.stream = open(target, "a", encoding="utf-8") if self._owned else target
+
+    def record(self, event: ContextEvent) -> dict:
+        record = {
+            "time": event.time,
+            "level": LEVEL_NAMES.get(event.level, str(event.level)),
+            "event": event.kind,
+            "iteration": event.iteration,
+        }
+        if event.kind == "item":
+            record["section"] = event.section
+            record["type"] = type(event.item).__name__
+            record["item"] = (
+                event.item.model_dump(exclude_none=True)
+                if isinstance(event.item, StartToEndObject)
+                else str(event.item)
+            )
+        return record
+
+    def write(self, event: ContextEvent):
+        self.stream.write(dumps(self.record(event)) + "\n")
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        if self._owned:
+            self.stream.close()
@@ -0,0 +1,201 @@
+from abc import ABC, abstractmethod
+import atexit
+import copy
+from dataclasses import dataclass, field
+import queue
+import random
+import threading
+import time
+from typing import Any, List, Literal, Optional, Sequence
+
+from loguru import logger
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+
+@dataclass(slots=True)
+class ContextEvent:
+    """Something that happened to an agent context, formatted only when a consumer writes it."""
+
+    kind: Literal["item", "iteration"]
+    level: int = INFO
+    section: Optional[str] = None
+    iteration: Optional[int] = None
+    # The context item. `QueueSink` swaps in a shallow copy when it queues the event, so fields
+    # reassigned later (e.g. `end_time`) are not seen by the writer; in-place changes still are.
+    item: Any = None
+    time: float = field(default_factory=time.time)
+
+
+class EventConsumer(ABC):
+    """Writes events, called from a `QueueSink`'s writer thread."""
+
+    @abstractmethod
+    def write(self, event: ContextEvent): ...
+
+    def flush(self):
+        """Called whenever the sink's queue runs empty."""
+        pass
+
+    def close(self):
+        pass
+
+
+class EventSink(ABC):
+    level: int = INFO
+
+    def enabled(self, level: int) -> bool:
+        """Whether events of `level` are kept, to skip building them otherwise."""
+        return level >= self.level
+
+    @abstractmethod
+    def emit(self, event: ContextEvent): ...
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        return True
+
+
+class NullSink(EventSink):
+    """Discards every event."""
+
+    level = ERROR + 1
+
+    def emit(self, event: ContextEvent):
+        pass
+
+
+class QueueSink(EventSink):
+    """Hands events to a background writer thread through a bounded queue; `emit` never blocks.
+
+    Events below `level` are discarded, and only a `sample_rate` fraction of those below WARNING is
+    kept. When `max_pending` events are already waiting, new ones are dropped and counted.
+
+    Queued events are written at exit unless the sink was closed before.
+    """
+
+    def __init__(
+        self,
+        consumers: Sequence[EventConsumer],
+        level: int = INFO,
+        sample_rate: float = 1.0,
+        max_pending: int = 10_000,
+        exit_timeout: Optional[float] = 2.0,
+    ):
+        self.consumers: List[EventConsumer] = list(consumers)
+        self.level = level
+        self.sample_rate = sample_rate
+        self.emitted = 0
+        self.dropped = 0
+        self.sampled_out = 0
+
+        self._queue: "queue.Queue[Optional[ContextEvent]]" = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="chetan-events", daemon=True)
+        self._thread.start()
+        self._exit_timeout = exit_timeout
+        atexit.register(self._close_at_exit)
+
+    def _close_at_exit(self):
+        self.close(timeout=self._exit_timeout)
+
+    def emit(self, event: ContextEvent):
+        if event.level < self.level or self._closed:
+            return
+        if self.sample_rate < 1.0 and event.level < WARNING and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return
+        if event.item is not None:
+            # Written on another thread while the loop carries on with the item
+            event.item = copy.copy(event.item)
+        try:
+            self._queue.put_nowait(event)
+            self.emitted += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued event has been written. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Write the queued events, then stop the writer and close the consumers."""
+        if self._closed:
+            return True
+        self._closed = True
+        atexit.unregister(self._close_at_exit)
+        flushed = self.flush(timeout)
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        return flushed
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            try:
+                if event is None:
+                    for consumer in self.consumers:
+                        consumer.flush()
+                        consumer.close()
+                    return
+                for consumer in self.consumers:
+                    try:
+                        consumer.write(event)
+                    except Exception:
+                        logger.exception(f"{consumer.__class__.__name__} failed to write an event")
+                if self._queue.empty():
+                    for consumer in self.consumers:
+                        consumer.flush()
+            finally:
+                self._queue.task_done()
+
+
+_sink: Optional[EventSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_sink() -> EventSink:
+    """The process-wide sink, by default a `QueueSink` pretty-printing to the console."""
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                from chetan.events.consumers import RichConsumer
+
+                _sink = QueueSink([RichConsumer()])
+    return _sink
+
+
+def set_sink(sink: EventSink, close: bool = True) -> Optional[EventSink]:
+    """Replace the process-wide sink.
+
+    Args:
+        sink (EventSink): The new sink.
+        close (bool, optional): Close the previous sink, writing its queued events. Pass False to put it back later. Defaults to True.
+
+    Returns:
+        Optional[EventSink]: The previous sink.
+    """
+    global _sink
+    with _sink_lock:
+        previous, _sink = _sink, sink
+    if close and previous is not None and previous is not sink:
+        previous.close()
+    return previous
@@ -0,0 +1,88 @@
+import io
+import json
+import threading
+
+from rich.console import Console
+
+from chetan.events import (
+    DEBUG,
+    WARNING,
+    ContextEvent,
+    JSONLinesConsumer,
+    NullSink,
+    QueueSink,
+    RichConsumer,
+    get_sink,
+    set_sink,
+)
+from chetan.types.context.agent import AgentResponse, EntityMessage
+from chetan.types.context.agent.iteration import AgentContext
+
+
+def test_context_items_are_written_by_the_sink():
+    stream, console = io.StringIO(), io.StringIO()
+    sink = QueueSink([JSONLinesConsumer(stream), RichConsumer(Console(file=console, width=200))])
+    previous = set_sink(sink, close=False)
+    try:
+        context = AgentContext()
+        context.new()
+        context.add_item(EntityMessage(role="user", name="asha", content="Hi there"), "prologue")
+        context.add_item(AgentResponse(content="Hello!"), "process")
+        assert sink.flush(timeout=5)
+    finally:
+        set_sink(previous, close=False)
+        sink.close()
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(r["section"], r["type"], r["iteration"]) for r in records] == [
+        ("prologue", "EntityMessage", 0),
+        ("process", "AgentResponse", 0),
+    ]
+    assert records[0]["item"]["content"] == "Hi there"
+    assert "USER (ASHA): Hi there" in console.getvalue()
+
+
+def test_levels_sampling_and_backpressure():
+    class Blocked(JSONLinesConsumer):
+        def write(self, event):
+            pass
+
+    sink = QueueSink([Blocked(io.StringIO())], sample_rate=0.0, max_pending=1)
+    sink.emit(ContextEvent("item", DEBUG))
+    sink.emit(ContextEvent("item"))
+    assert sink.sampled_out == 1 and sink.emitted == 0
+    for _ in range(1000):
+        sink.emit(ContextEvent("item", WARNING))
+    assert sink.emitted + sink.dropped == 1000
+    assert sink.close(timeout=5)
+
+    assert not NullSink().enabled(WARNING)
+    assert get_sink() is not None
+
+
+def test_set_sink_closes_the_previous_one():
+    first = QueueSink([JSONLinesConsumer(io.StringIO())])
+    previous = set_sink(first, close=False)
+    try:
+        set_sink(NullSink())
+        assert first._closed and not first._thread.is_alive()
+    finally:
+        set_sink(previous, close=False)
+
+
+def test_queued_items_are_copied():
+    release = threading.Event()
+
+    class Gated(JSONLinesConsumer):
+        def write(self, event):
+            release.wait(5)
+            super().write(event)
+
+    stream = io.StringIO()
+    sink = QueueSink([Gated(stream)])
+    response = AgentResponse(content="Hello!")
+    sink.emit(ContextEvent("item", section="process", item=response))
+    response.content = "Changed before it was written"
+    release.set()
+    assert sink.close(timeout=5)
+    assert json.loads(stream.getvalue())["item"]["content"] == "Hello!"
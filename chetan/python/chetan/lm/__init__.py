@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, List, Literal, Optional, OrderedDict, Type, TypeVar, Union
+from typing import Any, Hashable, List, Literal, Optional, OrderedDict, Type, TypeVar, Union
 
 from chetan.tools import Tool, ToolFunction
 from chetan.types.context.agent import AgentResponse, LMLegibleMessage
@@ -59,9 +59,19 @@ class LanguageModel(ABC):
 
     @abstractmethod
     def clone(self):
-        """Create a deep copy of the language model instance."""
+        """Create a language model with the same client and settings, and an empty chat context."""
         ...
 
+    def fork(self):
+        """Create a clone continuing from a copy of this chat context.
+
+        The messages themselves are shared, as they are not changed once added.
+        """
+        lm = self.clone()
+        lm.chat_context = self.chat_context.copy()
+        lm.chat_context_list = list(self.chat_context_list)
+        return lm
+
     # region Generation
     # * Chat Method
     @abstractmethod
@@ -80,8 +90,9 @@ class LanguageModel(ABC):
     # region Context
 
     def add_to_context(
-        self, item: Union[LMLegibleMessage, List[LMLegibleMessage]], id: str
+        self, item: Union[LMLegibleMessage, List[LMLegibleMessage]], id: Hashable
     ):
+        """Add messages to the chat context under `id`, with `(id, i)` keys for the i-th of a list."""
         if isinstance(item, LMLegibleMessage):
             value = self.translate_from_legible_message(item, detect_message_type(item))
             if value:
@@ -90,7 +101,7 @@ class LanguageModel(ABC):
         elif isinstance(item, list):
             # Accept a list of LMLegibleMessage
             for i, msg in enumerate(item):
-                key = f"{id}:{i}"
+                key = (id, i)
                 value = self.translate_from_legible_message(msg, detect_message_type(msg))
                 if value:
                     self.chat_context[key] = value
@@ -100,13 +111,21 @@ class LanguageModel(ABC):
                 f"Expected `LMLegibleMessage` or list of it. Got {type(item).__name__} instead."
             )
 
-    def remove_from_context(self, id: str):
-        # Remove all keys that match id or id:*
-        keys_to_remove_with_index = [
-            (k, idx)
-            for idx, k in enumerate(self.chat_context)
-            if k == id or k.startswith(f"{id}:")
-        ]
+    def remove_from_context(self, id: Hashable):
+        # Remove the keys `id` and `(id, i)`, found by hash before looking for their positions
+        targets = {id} if id in self.chat_context else set()
+        i = 0
+        while (id, i) in self.chat_context:
+            targets.add((id, i))
+            i += 1
+
+        keys_to_remove_with_index = []
+        if targets:
+            for idx, k in enumerate(self.chat_context):
+                if k in targets:
+                    keys_to_remove_with_index.append((k, idx))
+                    if len(keys_to_remove_with_index) == len(targets):
+                        break
         for k, idx in reversed(keys_to_remove_with_index):
             del self.chat_context[k]
             del self.chat_context_list[idx]
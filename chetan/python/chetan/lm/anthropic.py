@@ -181,7 +181,7 @@ class LMAnthropic(LanguageModel):
             {
                 "name": self.transform_tool_name(fn.name),
                 "description": fn.description,
-                "input_schema": fn.input.model_json_schema(),
+                "input_schema": fn.input_schema(),
             }
             for fn in toolfunctions
         ]
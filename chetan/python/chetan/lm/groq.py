@@ -1,7 +1,7 @@
-import json
 from typing import Literal
 from chetan.lm import BaseModelType, LanguageModel
 from chetan.tools import AgentToolCall
+from chetan.types.serialization import dumps, loads
 
 
 from chetan.types.context.agent import AgentResponse, LMLegibleMessage
@@ -57,7 +57,7 @@ class LMGroq(LanguageModel):
                     AgentToolCall(
                         id=call.id,
                         tool_name=call.function.name,
-                        tool_args=json.loads(call.function.arguments),
+                        tool_args=loads(call.function.arguments),
                     )
                     for call in output.choices[0].message.tool_calls
                 ]
@@ -96,7 +96,7 @@ class LMGroq(LanguageModel):
                             "id": call.id,
                             "function": {
                                 "name": call.tool_name,
-                                "arguments": json.dumps(call.tool_args),
+                                "arguments": dumps(call.tool_args),
                             },
                             "type": "function",
                         }
@@ -162,7 +162,7 @@ class LMGroq(LanguageModel):
                 function=FunctionDefinition(
                     name=fn.name,
                     description=fn.description,
-                    parameters=fn.input.model_json_schema(),
+                    parameters=fn.input_schema(),
                 ),
                 type="function",
             )
@@ -1,9 +1,9 @@
-import json
 from typing import List, Literal
 from chetan.lm import BaseModelType, LanguageModel
 from asq import query
 from chetan.tools import AgentToolCall
 from chetan.types.context.agent import AgentResponse
+from chetan.types.serialization import dumps, loads
 
 from openai.types.responses.response_function_tool_call import ResponseFunctionToolCall
 from openai.types.chat.chat_completion import ChatCompletion
@@ -52,7 +52,7 @@ class LMOpenAI(LanguageModel):
                     AgentToolCall(
                         id=call.id,
                         tool_name=call.function.name,
-                        tool_args=json.loads(call.function.arguments),
+                        tool_args=loads(call.function.arguments),
                     )
                     for call in output.choices[0].message.tool_calls
                 ]
@@ -73,7 +73,7 @@ class LMOpenAI(LanguageModel):
 
     def clone(self):
         """Create a deep copy of the language model instance."""
-        return LMOpenAI(client=self.oai_client, model=self.model)
+        return LMOpenAI(client=self.oai_client, model=self.model, api=self.api)
 
     def translate_from_legible_message(self, item, type):
         if type == "tool_call_result":
@@ -91,7 +91,7 @@ class LMOpenAI(LanguageModel):
                             "id": call.id,
                             "function": {
                                 "name": call.tool_name,
-                                "arguments": json.dumps(call.tool_args),
+                                "arguments": dumps(call.tool_args),
                             },
                             "type": "function",
                         }
@@ -156,7 +156,7 @@ class LMOpenAI(LanguageModel):
                 function=FunctionDefinition(
                     name=fn.name,
                     description=fn.description,
-                    parameters=fn.input.model_json_schema(),
+                    parameters=fn.input_schema(),
                 ),
                 type="function",
             )
@@ -194,7 +194,7 @@ class LMOpenAIResponses(LanguageModel):
                     AgentToolCall(
                         id=call.call_id,
                         tool_name=call.name,
-                        tool_args=json.loads(call.arguments),
+                        tool_args=loads(call.arguments),
                     )
                     for call in query(output.output)
                     .where(lambda x: isinstance(x, ResponseFunctionToolCall))
@@ -214,7 +214,7 @@ class LMOpenAIResponses(LanguageModel):
 
     def clone(self):
         """Create a deep copy of the language model instance."""
-        return LMOpenAI(client=self.oai_client, model=self.model)
+        return LMOpenAIResponses(client=self.oai_client, model=self.model)
 
     def translate_from_legible_message(self, item):
         if item.tool_call_id:
@@ -255,7 +255,7 @@ class LMOpenAIResponses(LanguageModel):
                 "type": "function",
                 "name": fn.name,
                 "description": fn.description or "",
-                "parameters": fn.input.model_json_schema(),
+                "parameters": fn.input_schema(),
             }
             for fn in list(toolfunctions)
         ]
@@ -1,7 +1,24 @@
-from .zep import ZepMemoryModule
-from .smriti import SmritiMemoryModule
+from .consolidation import ConsolidationWorker, IterationSnapshot
+from .engine import Memory, ScoredMemory, SmritiEngine
+from .extract import ExtractedFact, FactExtractor, HeuristicFactExtractor, LMFactExtractor
+from .zep import LocalZepClient, ZepMemoryModule
+from .smriti import MemoryRecall, SmritiMemoryModule
 
-__all__ = ["ZepMemoryModule", "SmritiMemoryModule"]
+__all__ = [
+    "ConsolidationWorker",
+    "ExtractedFact",
+    "FactExtractor",
+    "HeuristicFactExtractor",
+    "IterationSnapshot",
+    "LMFactExtractor",
+    "LocalZepClient",
+    "Memory",
+    "MemoryRecall",
+    "ScoredMemory",
+    "SmritiEngine",
+    "SmritiMemoryModule",
+    "ZepMemoryModule",
+]
 
 # from typing import Union
 # from pydantic import BaseModel
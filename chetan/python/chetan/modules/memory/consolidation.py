@@ -0,0 +1,147 @@
+import asyncio
+import inspect
+import queue
+import threading
+import time
+from typing import Awaitable, Callable, Generic, List, Literal, Optional, TypeVar, Union
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
+
+
+class IterationSnapshot(BaseModel):
+    """What a memory module needs from an iteration, copied so the context can move on."""
+
+    session_id: str
+    namespace: str = "default"
+    messages: List[str] = []  # User messages, unless `roles` says otherwise
+    roles: List[str] = []  # Role of each message, when not all are from the user
+    created_at: float = Field(default_factory=time.time)
+
+
+class ConsolidationStats(BaseModel):
+    submitted: int = 0
+    processed: int = 0
+    dropped: int = 0
+    failed: int = 0
+    batches: int = 0
+
+
+class ConsolidationWorker(Generic[T]):
+    """Runs memory work off the agent loop's critical path, in batches across agents.
+
+    Epilogues `submit` snapshots and return immediately. A background thread collects up to
+    `batch_size` snapshots, waiting at most `max_delay_ms` after the first, and hands each batch to
+    `handler` (sync or async), so LM and embedding calls are shared by every agent that finished an
+    iteration meanwhile.
+
+    At most `max_pending` snapshots wait in the queue. When it is full, `submit` blocks for up to
+    `block_timeout` seconds (`overflow="block"`) or gives up at once (`overflow="drop"`), and the
+    snapshot is dropped and counted in `stats`.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[T]], Union[None, Awaitable[None]]],
+        batch_size: int = 32,
+        max_delay_ms: float = 100,
+        max_pending: int = 1024,
+        overflow: Literal["block", "drop"] = "block",
+        block_timeout: Optional[float] = 1.0,
+        name: str = "memory-consolidation",
+    ):
+        self.handler = handler
+        self.batch_size = batch_size
+        self.max_delay_ms = max_delay_ms
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.name = name
+        self.stats = ConsolidationStats()
+
+        self._queue: "queue.Queue[Optional[T]]" = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, item: T) -> bool:
+        """Queue an item for consolidation. Returns False if it was dropped."""
+        if self._closed:
+            raise RuntimeError(f"`{self.name}` is closed")
+        try:
+            if self.overflow == "block":
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            self.stats.dropped += 1
+            logger.warning(f"`{self.name}` queue is full, dropped a snapshot")
+            return False
+        self.stats.submitted += 1
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued item has been handled. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, flush: bool = True, timeout: Optional[float] = None) -> bool:
+        """Stop the worker, by default after handling the queued items."""
+        if self._closed:
+            return True
+        flushed = self.flush(timeout) if flush else True
+        self._closed = True
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass  # Not flushed; the daemon thread dies with the process
+        self._thread.join(timeout)
+        return flushed
+
+    def _next_batch(self) -> List[Optional[T]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay_ms / 1000
+        while batch[-1] is not None and len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        # One event loop for the thread's lifetime, so async clients keep their connections
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                batch = self._next_batch()
+                items = [item for item in batch if item is not None]
+                try:
+                    if items:
+                        result = self.handler(items)
+                        if inspect.isawaitable(result):
+                            loop.run_until_complete(result)
+                        self.stats.processed += len(items)
+                        self.stats.batches += 1
+                except Exception:
+                    self.stats.failed += len(items)
+                    logger.exception(f"`{self.name}` failed to consolidate {len(items)} snapshots")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if len(items) < len(batch):
+                    return
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
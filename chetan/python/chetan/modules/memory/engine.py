@@ -0,0 +1,310 @@
+"""Local long-term memory engine behind `SmritiMemoryModule`.
+
+Memories live in a single sqlite file, one row per memory with its embedding, so every write is
+incremental. Each namespace (a user, tenant or agent) is loaded lazily into an in-memory matrix
+for recall, which ranks memories by similarity to the query, recency and importance.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from chetan.embed import EmbedderLike, resolve_embedder
+from chetan.types.serialization import dumps, loads
+
+DAY = 86400.0
+
+
+class Memory(BaseModel):
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    namespace: str = "default"
+    text: str
+    key: Optional[str] = None  # Memories with a key are recalled by it and replaced on update
+    kind: str = "fact"
+    importance: float = 0.5
+    mentions: int = 1
+    created_at: float = Field(default_factory=time.time)
+    updated_at: float = Field(default_factory=time.time)
+    accessed_at: float = Field(default_factory=time.time)
+    metadata: dict = Field(default_factory=dict)
+
+
+class ScoredMemory(BaseModel):
+    memory: Memory
+    score: float
+    similarity: float
+
+
+class _Namespace:
+    """In-memory copy of a namespace: memories and their embedding matrix, row-aligned."""
+
+    def __init__(self, memories: List[Memory], vectors: np.ndarray):
+        self.memories = memories
+        self.vectors = vectors
+        self.rows = {m.id: i for i, m in enumerate(memories)}
+
+    def put(self, memory: Memory, vector: np.ndarray):
+        row = self.rows.get(memory.id)
+        if row is None:
+            self.rows[memory.id] = len(self.memories)
+            self.memories.append(memory)
+            self.vectors = np.vstack([self.vectors.reshape(-1, len(vector)), vector[None]])
+        else:
+            self.memories[row] = memory
+            self.vectors[row] = vector
+
+    def remove(self, memory_id: str):
+        row = self.rows.pop(memory_id, None)
+        if row is None:
+            return
+        del self.memories[row]
+        self.vectors = np.delete(self.vectors, row, axis=0)
+        self.rows = {m.id: i for i, m in enumerate(self.memories)}
+
+
+class SmritiEngine:
+    """Stores, merges and recalls memories.
+
+    A new memory with the `key` of an existing one replaces it. Without a key, a memory whose embedding
+    has at least `merge_threshold` cosine similarity to an existing one is merged into it: the newer
+    text wins, and the merged memory gains a mention and importance.
+
+    Recall scores are `w_sim * similarity + w_recency * 0.5 ** (age / half_life) + w_importance * importance`,
+    where age counts from the last update or recall.
+    """
+
+    def __init__(
+        self,
+        path: str = "./temp/smriti.sqlite",
+        embedder: EmbedderLike = "hashing",
+        merge_threshold: float = 0.9,
+        half_life_days: float = 30.0,
+        weights: Tuple[float, float, float] = (0.6, 0.2, 0.2),
+    ):
+        self.path = path
+        self.embedder = resolve_embedder(embedder)
+        self.merge_threshold = merge_threshold
+        self.half_life_days = half_life_days
+        self.weights = weights
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS memories (
+                id TEXT PRIMARY KEY,
+                namespace TEXT,
+                text TEXT,
+                key TEXT,
+                kind TEXT,
+                importance REAL,
+                mentions INTEGER,
+                created_at REAL,
+                updated_at REAL,
+                accessed_at REAL,
+                metadata TEXT,
+                embedding BLOB
+            );
+            CREATE INDEX IF NOT EXISTS memories_namespace_key ON memories (namespace, key);
+            """
+        )
+        self._lock = threading.RLock()
+        self._namespaces: Dict[str, _Namespace] = {}
+
+    # region Storage
+
+    def _namespace(self, namespace: str) -> _Namespace:
+        loaded = self._namespaces.get(namespace)
+        if loaded is not None:
+            return loaded
+        memories, vectors = [], []
+        for row in self._db.execute(
+            """
+            SELECT id, namespace, text, key, kind, importance, mentions, created_at, updated_at,
+                accessed_at, metadata, embedding
+            FROM memories WHERE namespace = ? ORDER BY created_at
+            """,
+            (namespace,),
+        ):
+            *fields, metadata, embedding = row
+            memories.append(
+                Memory(
+                    **dict(zip(Memory.model_fields, fields)),
+                    metadata=loads(metadata),
+                )
+            )
+            vectors.append(np.frombuffer(embedding, dtype=np.float32))
+        loaded = _Namespace(
+            memories, np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        )
+        self._namespaces[namespace] = loaded
+        return loaded
+
+    def _write(self, memories: List[Tuple[Memory, np.ndarray]]):
+        self._db.executemany(
+            """
+            INSERT OR REPLACE INTO memories (id, namespace, text, key, kind, importance, mentions,
+                created_at, updated_at, accessed_at, metadata, embedding)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    m.id,
+                    m.namespace,
+                    m.text,
+                    m.key,
+                    m.kind,
+                    m.importance,
+                    m.mentions,
+                    m.created_at,
+                    m.updated_at,
+                    m.accessed_at,
+                    dumps(m.metadata),
+                    np.asarray(v, dtype=np.float32).tobytes(),
+                )
+                for m, v in memories
+            ],
+        )
+        self._db.commit()
+
+    # endregion
+
+    def remember(self, memories: Iterable[Memory]) -> List[Memory]:
+        """Store memories, replacing keyed ones and merging near-duplicates.
+
+        Returns:
+            List[Memory]: The stored memory for each input, merged ones included.
+        """
+        memories = list(memories)
+        if not memories:
+            return []
+        vectors = self.embedder.embed([m.text for m in memories])
+
+        stored: List[Tuple[Memory, np.ndarray]] = []
+        with self._lock:
+            for memory, vector in zip(memories, vectors):
+                space = self._namespace(memory.namespace)
+                existing = self._find_duplicate(space, memory, vector)
+                if existing is not None:
+                    memory = existing.model_copy(
+                        update={
+                            "text": memory.text,
+                            "kind": memory.kind,
+                            "importance": min(1.0, max(existing.importance, memory.importance) + 0.05),
+                            "mentions": existing.mentions + 1,
+                            "updated_at": memory.updated_at,
+                            "metadata": {**existing.metadata, **memory.metadata},
+                        }
+                    )
+                space.put(memory, vector)
+                stored.append((memory, vector))
+            self._write(stored)
+        return [m for m, _ in stored]
+
+    def _find_duplicate(
+        self, space: _Namespace, memory: Memory, vector: np.ndarray
+    ) -> Optional[Memory]:
+        if memory.key is not None:
+            return next((m for m in space.memories if m.key == memory.key), None)
+        if not space.memories:
+            return None
+        similarities = space.vectors @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.merge_threshold and space.memories[best].key is None:
+            return space.memories[best]
+        return None
+
+    def get(self, key: str, namespace: str = "default") -> Optional[Memory]:
+        """Recall a memory by key."""
+        with self._lock:
+            return next(
+                (m for m in self._namespace(namespace).memories if m.key == key), None
+            )
+
+    def memories(self, namespace: str = "default") -> List[Memory]:
+        with self._lock:
+            return list(self._namespace(namespace).memories)
+
+    def _scores(self, space: _Namespace, similarities: np.ndarray, now: float) -> np.ndarray:
+        age = np.array([now - max(m.updated_at, m.accessed_at) for m in space.memories])
+        recency = 0.5 ** (np.maximum(age, 0) / (self.half_life_days * DAY))
+        importance = np.array([m.importance for m in space.memories])
+        w_sim, w_recency, w_importance = self.weights
+        return w_sim * similarities + w_recency * recency + w_importance * importance
+
+    def recall(
+        self,
+        query: Optional[str],
+        namespace: str = "default",
+        k: int = 5,
+        min_similarity: float = 0.0,
+        now: Optional[float] = None,
+        blocking: bool = True,
+    ) -> List[ScoredMemory]:
+        """Return the top-`k` memories for `query`, or the most recent and important ones without a query.
+
+        With `blocking=False`, returns nothing instead of waiting for a concurrent write or recall.
+        """
+        now = now or time.time()
+        vector = self.embedder.embed_query(query) if query else None
+        if not self._lock.acquire(blocking=blocking):
+            return []
+        try:
+            space = self._namespace(namespace)
+            if not space.memories:
+                return []
+            if vector is not None:
+                similarities = space.vectors @ vector
+                candidates = np.flatnonzero(similarities >= min_similarity)
+            else:
+                similarities = np.zeros(len(space.memories), dtype=np.float32)
+                candidates = np.arange(len(space.memories))
+            if len(candidates) == 0:
+                return []
+
+            scores = self._scores(space, similarities, now)
+            top = candidates[np.argsort(-scores[candidates])[:k]]
+            results = [
+                ScoredMemory(
+                    memory=space.memories[row].model_copy(),
+                    score=float(scores[row]),
+                    similarity=float(similarities[row]),
+                )
+                for row in top
+            ]
+
+            # Recalled memories count as recently used
+            for row in top:
+                space.memories[row].accessed_at = now
+            self._db.executemany(
+                "UPDATE memories SET accessed_at = ? WHERE id = ?",
+                [(now, space.memories[row].id) for row in top],
+            )
+            self._db.commit()
+            return results
+        finally:
+            self._lock.release()
+
+    def forget(self, memory_ids: Iterable[str], namespace: str = "default"):
+        memory_ids = list(memory_ids)
+        with self._lock:
+            space = self._namespace(namespace)
+            for memory_id in memory_ids:
+                space.remove(memory_id)
+            self._db.executemany(
+                "DELETE FROM memories WHERE id = ? AND namespace = ?",
+                [(memory_id, namespace) for memory_id in memory_ids],
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._namespaces.clear()
+            self._db.close()
@@ -0,0 +1,122 @@
+from abc import ABC, abstractmethod
+import asyncio
+import re
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from chetan.lm import LanguageModel, LMLegibleMessage
+
+
+class ExtractedFact(BaseModel):
+    text: str
+    key: Optional[str] = None  # Stable slot such as "user.name", replaced when the fact changes
+    kind: str = "fact"
+    importance: float = 0.5
+
+
+class ExtractedFacts(BaseModel):
+    facts: List[ExtractedFact] = []
+
+
+class FactExtractor(ABC):
+    """Turns conversation messages into facts worth remembering."""
+
+    @abstractmethod
+    async def extract(self, messages: List[str]) -> List[ExtractedFact]: ...
+
+    async def extract_batch(self, conversations: List[List[str]]) -> List[List[ExtractedFact]]:
+        """Extract facts from several conversations, concurrently by default."""
+        return list(await asyncio.gather(*(self.extract(messages) for messages in conversations)))
+
+
+def _clean(value: str) -> str:
+    return re.sub(r"\s+", " ", value).strip(" ,;:'\"")
+
+
+def _third_person(verb: str) -> str:
+    """"like" -> "likes", "don't like" -> "doesn't like"."""
+    verb = re.sub(r"^do(n't| not)\b", r"does\1", verb)
+    if verb.startswith("does"):
+        return verb
+    return re.sub(r"(\w+)$", r"\1s", verb)
+
+
+def _slot(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", value.lower()).strip("_")
+
+
+class HeuristicFactExtractor(FactExtractor):
+    """Pattern-based extraction of first-person statements, with no model calls.
+
+    Recognizes explicit requests ("remember that ..."), attributes ("my name is ..."), places
+    ("I live in ...", "I work at ...") and preferences ("I prefer ...", "I don't like ...").
+    """
+
+    CLAUSE = re.compile(r"[.!?;\n]+|,?\s+(?:and|but)\s+(?=i\b|my\b)", re.I)
+    # (pattern, key, kind, importance, text template)
+    PATTERNS = [
+        (r"\b(?:please )?(?:remember|note|keep in mind) that (?P<value>.+)", None, "note", 0.9, "{value}"),
+        (r"\bmy (?P<attr>[a-z]+(?: [a-z]+)?) is (?P<value>.+)", "user.{attr}", "attribute", 0.7, "User's {attr} is {value}"),
+        (r"\bi (?:live|am based|'m based) in (?P<value>.+)", "user.location", "attribute", 0.7, "User lives in {value}"),
+        (r"\bi work (?:at|for) (?P<value>.+)", "user.workplace", "attribute", 0.7, "User works at {value}"),
+        (r"\bi (?P<verb>(?:really )?(?:like|love|prefer|enjoy|hate|dislike|don't like|do not like)) (?P<value>.+)", None, "preference", 0.6, "User {verb} {value}"),
+    ]
+
+    def __init__(self):
+        self.patterns = [
+            (re.compile(pattern, re.I), key, kind, importance, template)
+            for pattern, key, kind, importance, template in self.PATTERNS
+        ]
+
+    async def extract(self, messages: List[str]) -> List[ExtractedFact]:
+        facts = []
+        for message in messages:
+            for clause in self.CLAUSE.split(message):
+                fact = self._match(clause)
+                if fact is not None:
+                    facts.append(fact)
+        return facts
+
+    def _match(self, clause: str) -> Optional[ExtractedFact]:
+        for pattern, key, kind, importance, template in self.patterns:
+            match = pattern.search(clause)
+            if match is None or not _clean(match["value"]):
+                continue
+            groups = {name: _clean(value or "") for name, value in match.groupdict().items()}
+            groups["attr"] = groups.get("attr", "").lower()
+            groups["verb"] = _third_person(groups.get("verb", "").lower())
+            text = template.format(**groups)
+            return ExtractedFact(
+                text=text[0].upper() + text[1:],
+                key=key.format(attr=_slot(groups["attr"])) if key else None,
+                kind=kind,
+                importance=importance,
+            )
+        return None
+
+
+class LMFactExtractor(FactExtractor):
+    """Asks a language model for the durable facts in a conversation, as structured output."""
+
+    PROMPT = (
+        "Extract durable facts about the user from the conversation below: identity, preferences, "
+        "plans, and anything they asked to be remembered. Skip small talk and one-off requests. "
+        "Write each fact as a short third-person sentence. Give facts that describe a single "
+        "changeable attribute a stable `key` such as `user.name` or `user.timezone`, and rate "
+        "importance from 0 to 1.\n\nConversation:\n{conversation}"
+    )
+
+    def __init__(self, lm: LanguageModel, prompt: str = PROMPT):
+        self.lm = lm
+        self.prompt = prompt
+
+    async def extract(self, messages: List[str]) -> List[ExtractedFact]:
+        if not messages:
+            return []
+        message = LMLegibleMessage(
+            role="user", content=self.prompt.format(conversation="\n".join(messages))
+        )
+        ctx = [self.lm.translate_from_legible_message(message, "default")]
+        result = await self.lm.chat_structured(ctx, ExtractedFacts)
+        return result.facts
@@ -1,19 +1,226 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Tuple
+
 from chetan.agent.module import AgentLoopModule, prologue, epilogue
+from chetan.embed import EmbedderLike
+from chetan.lm import LMLegibleMessage
+from chetan.modules.memory.consolidation import ConsolidationWorker, IterationSnapshot
+from chetan.modules.memory.engine import Memory, ScoredMemory, SmritiEngine
+from chetan.modules.memory.extract import FactExtractor, HeuristicFactExtractor
+from chetan.types.context.agent import EntityMessage, PrologueItem
+from chetan.types.context.agent.iteration import AgentContext
+
+
+def default_namespace(context: AgentContext) -> str:
+    return context.tenant_id or "default"
+
+
+class MemoryRecall(PrologueItem):
+    item_type: str = "memory_recall"
+    memories: List[str]
+
+    def __str__(self):
+        return "Things you remember about the user:\n" + "\n".join(
+            f"- {memory}" for memory in self.memories
+        )
+
+    def to_lm_legible(self):
+        if not self.memories:
+            return []
+        return LMLegibleMessage(role="system", content=str(self))
+
+
+def inject_recall(context: AgentContext, memories: List[str]):
+    """Replace the memories recalled in earlier iterations with `memories`."""
+    for item in context.select(MemoryRecall, "prologue"):
+        context.remove_item(item.context_id, "prologue")
+    if memories:
+        context.add_item(MemoryRecall(memories=memories), "prologue")
 
 
 class SmritiMemoryModule(AgentLoopModule):
-    """Intelligent memory module for Chetan agents."""
-    
-    def __init__(self):
+    """Intelligent memory module for Chetan agents.
+
+    Runs locally on a `SmritiEngine`. The epilogue extracts facts from the user's messages and stores
+    them; the prologue recalls the memories most relevant to the latest user message, ranked by
+    similarity, recency and importance.
+
+    Recall has `recall_budget_ms` to embed the query and search. When it runs out, the prologue falls
+    back to the most recent and important memories, which need no embedding, or to none if the store
+    is busy; the late search is left to finish in the background.
+
+    With `background` on, the epilogue only queues the iteration's user messages for a
+    `ConsolidationWorker`, which extracts and stores facts for all sessions in batches, so the next
+    iteration does not wait for memory writes. Facts from an iteration may therefore be recalled a
+    little later; call `flush` (or `SessionManager.shutdown`) to wait for them.
+    """
+
+    def __init__(
+        self,
+        path: str = "./temp/smriti.sqlite",
+        embedder: EmbedderLike = "hashing",
+        extractor: Optional[FactExtractor] = None,
+        namespace_fn: Callable[[AgentContext], str] = default_namespace,
+        k: int = 5,
+        min_similarity: float = 0.1,
+        recall_budget_ms: Optional[float] = 50,
+        merge_threshold: float = 0.9,
+        half_life_days: float = 30.0,
+        background: bool = True,
+        batch_size: int = 32,
+        max_pending: int = 1024,
+    ):
+        """
+        Args:
+            path (str, optional): Sqlite file of the memory store. Defaults to "./temp/smriti.sqlite".
+            embedder (EmbedderLike, optional): Embedding model, see `resolve_embedder`. Defaults to "hashing".
+            extractor (FactExtractor, optional): Extracts facts to remember, e.g. `LMFactExtractor`.
+                Defaults to `HeuristicFactExtractor`.
+            namespace_fn (Callable[[AgentContext], str], optional): Whose memories a session reads and
+                writes. Defaults to `AgentContext.tenant_id`, or "default".
+            k (int, optional): Number of memories recalled per iteration. Defaults to 5.
+            min_similarity (float, optional): Minimum cosine similarity of a recalled memory. Defaults to 0.1.
+            recall_budget_ms (Optional[float], optional): Time budget of recall, None to wait. Defaults to 50.
+            merge_threshold (float, optional): Similarity above which memories are merged. Defaults to 0.9.
+            half_life_days (float, optional): Age at which recency counts half. Defaults to 30.
+            background (bool, optional): Consolidate memories off the loop's critical path. Defaults to True.
+            batch_size (int, optional): Iterations consolidated together in the background. Defaults to 32.
+            max_pending (int, optional): Iterations queued before the epilogue blocks. Defaults to 1024.
+        """
+        self.path = path
+        self.embedder = embedder
+        self.extractor = extractor or HeuristicFactExtractor()
+        self.namespace_fn = namespace_fn
+        self.k = k
+        self.min_similarity = min_similarity
+        self.recall_budget_ms = recall_budget_ms
+        self.merge_threshold = merge_threshold
+        self.half_life_days = half_life_days
+        self.background = background
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+
+        self.engine: Optional[SmritiEngine] = None
+        self.worker: Optional[ConsolidationWorker[IterationSnapshot]] = None
+        # (session id) -> number of iterations whose messages were already extracted
+        self._extracted: Dict[str, int] = {}
+        self._recall_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="smriti-recall")
         super().__init__()
-        
+
     def setup(self):
+        self.close()
+        self.engine = SmritiEngine(
+            self.path,
+            embedder=self.embedder,
+            merge_threshold=self.merge_threshold,
+            half_life_days=self.half_life_days,
+        )
+        self.engine.embedder.load()
+        if self.background:
+            self.worker = ConsolidationWorker(
+                self._consolidate,
+                batch_size=self.batch_size,
+                max_pending=self.max_pending,
+                name="smriti-consolidation",
+            )
+        self._extracted.clear()
         return super().setup()
 
+    def remember(self, texts: List[str], namespace: str = "default", **kwargs) -> List[Memory]:
+        """Store memories directly, e.g. facts imported from a user profile."""
+        return self.engine.remember(
+            Memory(text=text, namespace=namespace, **kwargs) for text in texts
+        )
+
+    def recall(self, text: Optional[str], namespace: str = "default") -> List[ScoredMemory]:
+        """Recall memories relevant to `text` within `recall_budget_ms`."""
+        search = self._recall_pool.submit(
+            self.engine.recall, text, namespace, self.k, self.min_similarity
+        )
+        try:
+            timeout = None if self.recall_budget_ms is None else self.recall_budget_ms / 1000
+            return search.result(timeout=timeout)
+        except FutureTimeoutError:
+            self.log(
+                f"Memory recall exceeded its {self.recall_budget_ms}ms budget, using recent memories",
+                level="warning",
+            )
+            return self.engine.recall(None, namespace, self.k, blocking=False)
+
+    def _user_messages(self, context: AgentContext, start: int) -> Tuple[List[str], int]:
+        messages = [
+            str(x.content)
+            for x in context.select(EntityMessage, "prologue", role="user", start=start)
+        ]
+        return messages, len(context.iterations)
+
     @prologue
-    def recall_memory(self, context, *args, **kwargs):
-        return
+    def recall_memory(self, context: AgentContext, *args, **kwargs):
+        """Recall memories relevant to the latest user message, replacing earlier recalls."""
+        latest = context.latest()
+        if latest is None:
+            return
+        message = latest.last(EntityMessage, "prologue", role="user")
+        if message is None:
+            return
+        user_query = str(message.content)
+
+        recalled = self.recall(user_query, self.namespace_fn(context))
+        inject_recall(context, [result.memory.text for result in recalled])
+
+    async def _consolidate(self, snapshots: List[IterationSnapshot]):
+        """Extract and store the facts of a batch of snapshots, with one embedding call."""
+        facts = await self.extractor.extract_batch([s.messages for s in snapshots])
+        stored = self.engine.remember(
+            Memory(
+                namespace=snapshot.namespace,
+                metadata={"session_id": snapshot.session_id},
+                **fact.model_dump(),
+            )
+            for snapshot, snapshot_facts in zip(snapshots, facts)
+            for fact in snapshot_facts
+        )
+        if stored:
+            self.log(
+                f"Remembered {len(stored)} facts from {len(snapshots)} iterations", level="debug"
+            )
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued memory updates to be stored. Returns False on timeout."""
+        return self.worker.flush(timeout) if self.worker is not None else True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Store queued memory updates, then stop the worker and close the store."""
+        flushed = True
+        if self.worker is not None:
+            flushed = self.worker.close(timeout=timeout)
+            self.worker = None
+        if self.engine is not None:
+            self.engine.close()
+            self.engine = None
+        return flushed
 
     @epilogue
-    def update_memory(self, context, *args, **kwargs):
-        return
+    def update_memory(self, context: AgentContext, *args, **kwargs):
+        """Queue the user messages not seen yet for fact extraction.
+
+        With `background` off, facts are extracted and stored before the epilogue returns.
+        """
+        messages, extracted = self._user_messages(
+            context, self._extracted.get(context.session_id, 0)
+        )
+        self._extracted[context.session_id] = extracted
+        if not messages:
+            return
+
+        snapshot = IterationSnapshot(
+            session_id=context.session_id,
+            namespace=self.namespace_fn(context),
+            messages=messages,
+        )
+        if self.worker is not None:
+            self.worker.submit(snapshot)
+        else:
+            asyncio.run(self._consolidate([snapshot]))
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+
+from chetan.modules.memory.consolidation import ConsolidationWorker
+from chetan.modules.memory.extract import HeuristicFactExtractor
+from chetan.modules.memory.smriti import SmritiMemoryModule
+from chetan.types.context.agent import EntityMessage
+from chetan.types.context.agent.iteration import AgentContext
+
+
+class SlowExtractor(HeuristicFactExtractor):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    async def extract_batch(self, conversations):
+        self.batches.append(len(conversations))
+        await asyncio.sleep(0.2)
+        return await super().extract_batch(conversations)
+
+
+def test_epilogue_does_not_wait_for_memory_work(tmp_path):
+    extractor = SlowExtractor()
+    module = SmritiMemoryModule(path=str(tmp_path / "memory.sqlite"), extractor=extractor)
+    module.setup()
+
+    start = time.perf_counter()
+    for i in range(8):
+        context = AgentContext(tenant_id=f"user-{i}")
+        context.new()
+        context.add_item(EntityMessage(role="user", content=f"My name is User{i}."), "prologue")
+        module.update_memory(context)
+    assert time.perf_counter() - start < 0.2
+
+    assert module.flush(timeout=5)
+    assert module.engine.get("user.name", "user-3").text == "User's name is User3"
+    # Iterations that finished while a batch was being extracted are batched together
+    assert len(extractor.batches) < 8 and sum(extractor.batches) == 8
+    module.close()
+
+
+def test_worker_backpressure_and_close():
+    release = threading.Event()
+    handled = []
+
+    def handler(items):
+        release.wait()
+        handled.extend(items)
+
+    worker = ConsolidationWorker(handler, batch_size=1, max_pending=2, overflow="drop")
+    assert worker.submit(1)
+    time.sleep(0.05)  # The worker picks up 1 and blocks in the handler
+    assert worker.submit(2) and worker.submit(3)
+    assert not worker.submit(4)
+    assert worker.stats.dropped == 1
+    assert not worker.flush(timeout=0.05)
+
+    release.set()
+    assert worker.close(timeout=5)
+    assert handled == [1, 2, 3]
+    assert worker.stats.processed == 3
+
+
+def test_async_handlers_share_the_worker_loop():
+    loops = []
+
+    async def handler(items):
+        loops.append(asyncio.get_running_loop())
+
+    worker = ConsolidationWorker(handler, batch_size=1, max_delay_ms=0)
+    for i in range(3):
+        worker.submit(i)
+        worker.flush(timeout=5)
+    assert worker.close(timeout=5)
+    assert len(loops) == 3 and len(set(loops)) == 1
@@ -0,0 +1,147 @@
+import asyncio
+import time
+
+from chetan.modules.memory.engine import DAY, Memory, SmritiEngine
+from chetan.modules.memory.extract import HeuristicFactExtractor
+from chetan.modules.memory.smriti import MemoryRecall, SmritiMemoryModule
+from chetan.modules.memory.zep import ZepMemoryModule
+from chetan.types.context.agent import AgentResponse, EntityMessage
+from chetan.types.context.agent.iteration import AgentContext
+
+
+def test_heuristic_extractor():
+    facts = asyncio.run(
+        HeuristicFactExtractor().extract(
+            [
+                "Hi! My name is Asha. I live in Pune, and I prefer window seats. What's the weather?",
+                "I don't like early flights",
+            ]
+        )
+    )
+    assert [(f.text, f.key) for f in facts] == [
+        ("User's name is Asha", "user.name"),
+        ("User lives in Pune", "user.location"),
+        ("User prefers window seats", None),
+        ("User doesn't like early flights", None),
+    ]
+
+
+def test_engine_merges_decays_and_persists(tmp_path):
+    path = str(tmp_path / "memory.sqlite")
+    engine = SmritiEngine(path)
+    now = time.time()
+    engine.remember(
+        [
+            Memory(text="User's name is Asha", key="user.name", importance=0.7),
+            Memory(text="User prefers window seats on flights"),
+            Memory(text="User prefers window seats on flights", importance=0.6),
+            Memory(text="User likes green tea", updated_at=now - 365 * DAY, accessed_at=now - 365 * DAY),
+            Memory(text="User likes black coffee"),
+            Memory(text="Other user's cat is called Tom", namespace="other"),
+        ]
+    )
+    engine.remember([Memory(text="User's name is Asha Rao", key="user.name")])
+
+    memories = engine.memories()
+    assert len(memories) == 4
+    seats = next(m for m in memories if "seats" in m.text)
+    assert seats.mentions == 2 and seats.importance > 0.6
+    assert engine.get("user.name").text == "User's name is Asha Rao"
+
+    # Equally similar, but the recent memory ranks first
+    results = engine.recall("User likes", k=2, now=now)
+    assert [r.memory.text for r in results] == ["User likes black coffee", "User likes green tea"]
+    assert all(r.memory.namespace == "default" for r in engine.recall("cat Tom", k=10))
+    engine.close()
+
+    reopened = SmritiEngine(path)
+    assert reopened.get("user.name").text == "User's name is Asha Rao"
+    assert len(reopened.memories("other")) == 1
+
+
+def test_module_remembers_across_sessions(tmp_path):
+    module = SmritiMemoryModule(path=str(tmp_path / "memory.sqlite"))
+    module.setup()
+
+    first = AgentContext(tenant_id="asha")
+    first.new()
+    first.add_item(EntityMessage(role="user", content="Remember that my passport expires in May."), "prologue")
+    module.recall_memory(first)
+    module.update_memory(first)
+    module.update_memory(first)
+    assert module.flush(timeout=5)
+    assert len(module.engine.memories("asha")) == 1
+
+    second = AgentContext(tenant_id="asha")
+    second.new()
+    second.add_item(EntityMessage(role="user", content="When does my passport expire?"), "prologue")
+    module.recall_memory(second)
+    recall = second.latest().prologue[-1]
+    assert isinstance(recall, MemoryRecall)
+    assert recall.memories == ["My passport expires in May"]
+
+    # A new recall replaces the previous one
+    second.new()
+    second.add_item(EntityMessage(role="user", content="And my passport number?"), "prologue")
+    module.recall_memory(second)
+    assert sum(isinstance(item, MemoryRecall) for it in second.iterations for item in it.prologue) == 1
+
+    stranger = AgentContext(tenant_id="someone-else")
+    stranger.new()
+    stranger.add_item(EntityMessage(role="user", content="When does my passport expire?"), "prologue")
+    module.recall_memory(stranger)
+    assert not any(isinstance(item, MemoryRecall) for item in stranger.latest().prologue)
+
+
+def test_zep_module_with_local_client(tmp_path):
+    module = ZepMemoryModule(path=str(tmp_path / "zep.sqlite"))
+    module.setup()
+    context = AgentContext()
+    context.new()
+    context.add_item(EntityMessage(role="user", content="I work at Globex."), "prologue")
+    module.update_memory(context)
+    module.flush()
+
+    context.new()
+    context.add_item(EntityMessage(role="user", content="Where do I work?"), "prologue")
+    module.recall_memory(context)
+    assert context.latest().prologue[-1].memories == ["User works at Globex"]
+
+
+class RecordingZepMemory:
+    """Stands in for an async Zep client, whose connections are bound to one event loop."""
+
+    def __init__(self):
+        self.loops = set()
+        self.added = []
+
+    async def add(self, session_id, messages):
+        self.loops.add(asyncio.get_running_loop())
+        self.added += [(m.role_type, m.content) for m in messages]
+
+    async def get(self, session_id):
+        self.loops.add(asyncio.get_running_loop())
+        return None
+
+
+def test_zep_module_uses_one_loop_and_sends_responses():
+    client = type("Client", (), {"memory": RecordingZepMemory()})()
+    for background in (True, False):
+        module = ZepMemoryModule(client=client, background=background)
+        module.setup()
+        context = AgentContext()
+        for i in range(2):
+            context.new()
+            context.add_item(EntityMessage(role="user", content=f"question {i}"), "prologue")
+            module.recall_memory(context)
+            context.add_item(AgentResponse(content=f"answer {i}"), "process")
+            module.update_memory(context)
+        module.close()
+
+    assert len(client.memory.loops) == 2  # One per setup
+    assert client.memory.added == 2 * [
+        ("user", "question 0"),
+        ("assistant", "answer 0"),
+        ("user", "question 1"),
+        ("assistant", "answer 1"),
+    ]
@@ -1,5 +1,231 @@
-from chetan.agent.module import AgentLoopModule
+import asyncio
+import threading
+from typing import Any, Callable, Coroutine, List, Optional
+
+from pydantic import BaseModel
+
+from chetan.agent.module import AgentLoopModule, prologue, epilogue
+from chetan.embed import EmbedderLike
+from chetan.modules.memory.consolidation import ConsolidationWorker, IterationSnapshot
+from chetan.modules.memory.engine import Memory, SmritiEngine
+from chetan.modules.memory.extract import FactExtractor, HeuristicFactExtractor
+from chetan.modules.memory.smriti import inject_recall
+from chetan.types.context.agent import AgentResponse, EntityMessage
+from chetan.types.context.agent.iteration import AgentContext
+
+
+# Role types Zep accepts, any other role is sent as the user's
+ZEP_ROLE_TYPES = {"user", "assistant", "system", "tool", "function", "norole"}
+
+
+def zep_role_type(role: str) -> str:
+    return role if role in ZEP_ROLE_TYPES else "user"
+
+
+class ZepMessage(BaseModel):
+    role_type: str
+    content: str
+
+
+class ZepMemory(BaseModel):
+    context: Optional[str] = None
+    relevant_facts: List[str] = []
+
+
+class LocalZepMemoryClient:
+    """The `memory.add` / `memory.get` part of the Zep client API, served by a local `SmritiEngine`.
+
+    Facts are extracted from added messages and kept per session; `get` returns those relevant to the
+    session's latest user message.
+    """
+
+    def __init__(
+        self,
+        engine: SmritiEngine,
+        extractor: Optional[FactExtractor] = None,
+        k: int = 5,
+        min_similarity: float = 0.1,
+    ):
+        self.engine = engine
+        self.extractor = extractor or HeuristicFactExtractor()
+        self.k = k
+        self.min_similarity = min_similarity
+        self._last_query = {}
+
+    async def add(self, session_id: str, messages: List[ZepMessage]):
+        user_messages = [m.content for m in messages if m.role_type == "user"]
+        if user_messages:
+            self._last_query[session_id] = user_messages[-1]
+        facts = await self.extractor.extract(user_messages)
+        await asyncio.to_thread(
+            self.engine.remember,
+            [Memory(namespace=session_id, **fact.model_dump()) for fact in facts],
+        )
+
+    async def get(self, session_id: str) -> ZepMemory:
+        recalled = await asyncio.to_thread(
+            self.engine.recall,
+            self._last_query.get(session_id),
+            session_id,
+            self.k,
+            self.min_similarity,
+        )
+        facts = [result.memory.text for result in recalled]
+        return ZepMemory(context="\n".join(facts) or None, relevant_facts=facts)
+
+
+class LocalZepClient:
+    def __init__(self, engine: SmritiEngine, **kwargs):
+        self.memory = LocalZepMemoryClient(engine, **kwargs)
+
+
+class ClientLoop:
+    """An event loop on its own thread for an async client, so its connection pool outlives each call.
+
+    Prologues, epilogues and the consolidation worker run on different threads; they all submit the
+    client's coroutines here instead of each running a fresh event loop.
+    """
+
+    def __init__(self, name: str = "zep-client"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self._thread.start()
+
+    def run(self, coro: Coroutine) -> Any:
+        """Run `coro` on the loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
 
 
 class ZepMemoryModule(AgentLoopModule):
-    pass
\ No newline at end of file
+    """Session memory through the Zep API.
+
+    Pass a Zep client (`zep_cloud.client.AsyncZep`) to use Zep. Without one, a `LocalZepClient` keeps
+    memories in a local `SmritiEngine` at `path`, so the module also works offline and in tests.
+    Each agent session maps to a Zep session with the same id.
+
+    With `background` on, new messages are sent to Zep by a `ConsolidationWorker`, concurrently for
+    all sessions, instead of in the epilogue. Every client call runs on one `ClientLoop`.
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        path: str = "./temp/zep_local.sqlite",
+        embedder: EmbedderLike = "hashing",
+        session_fn: Callable[[AgentContext], str] = lambda context: context.session_id,
+        message_fn: Callable[[str, str], Any] = ZepMessage,
+        background: bool = True,
+        max_pending: int = 1024,
+    ):
+        """
+        Args:
+            client (Any, optional): Async Zep client. Defaults to a `LocalZepClient`.
+            path (str, optional): Sqlite file of the local stand-in. Defaults to "./temp/zep_local.sqlite".
+            embedder (EmbedderLike, optional): Embedding model of the local stand-in. Defaults to "hashing".
+            session_fn (Callable[[AgentContext], str], optional): Zep session id of a context.
+                Defaults to `AgentContext.session_id`.
+            message_fn (Callable[[str, str], Any], optional): Builds a message from `role_type` and
+                `content`, e.g. `zep_cloud.types.Message`. Defaults to `ZepMessage`.
+            background (bool, optional): Send messages off the loop's critical path. Defaults to True.
+            max_pending (int, optional): Iterations queued before the epilogue blocks. Defaults to 1024.
+        """
+        self.client = client
+        self.path = path
+        self.embedder = embedder
+        self.session_fn = session_fn
+        self.message_fn = message_fn
+        self.background = background
+        self.max_pending = max_pending
+        self.worker: Optional[ConsolidationWorker[IterationSnapshot]] = None
+        self._client_loop: Optional[ClientLoop] = None
+        self._lock = threading.Lock()
+        self._added = {}
+        super().__init__()
+
+    def setup(self):
+        self.close()
+        if self.client is None:
+            self.client = LocalZepClient(SmritiEngine(self.path, embedder=self.embedder))
+        if self.background:
+            self.worker = ConsolidationWorker(
+                self._send, max_pending=self.max_pending, name="zep-consolidation"
+            )
+        self._added.clear()
+        return super().setup()
+
+    def _run(self, coro: Coroutine) -> Any:
+        with self._lock:
+            if self._client_loop is None:
+                self._client_loop = ClientLoop()
+        return self._client_loop.run(coro)
+
+    def _send(self, snapshots: List[IterationSnapshot]):
+        self._run(self._send_async(snapshots))
+
+    async def _send_async(self, snapshots: List[IterationSnapshot]):
+        await asyncio.gather(
+            *(
+                self.client.memory.add(
+                    session_id=snapshot.namespace,
+                    messages=[
+                        self.message_fn(role_type=role, content=content)
+                        for role, content in zip(snapshot.roles, snapshot.messages)
+                    ],
+                )
+                for snapshot in snapshots
+            )
+        )
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued messages to be sent. Returns False on timeout."""
+        return self.worker.flush(timeout) if self.worker is not None else True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Send queued messages, then stop the worker and the client's loop."""
+        flushed = True
+        if self.worker is not None:
+            flushed = self.worker.close(timeout=timeout)
+            self.worker = None
+        with self._lock:
+            if self._client_loop is not None:
+                self._client_loop.close()
+                self._client_loop = None
+        return flushed
+
+    @prologue
+    def recall_memory(self, context: AgentContext, *args, **kwargs):
+        """Inject the facts Zep considers relevant to the session."""
+        memory = self._run(self.client.memory.get(session_id=self.session_fn(context)))
+        facts = list(getattr(memory, "relevant_facts", None) or [])
+        inject_recall(context, [str(getattr(fact, "fact", fact)) for fact in facts])
+
+    @epilogue
+    def update_memory(self, context: AgentContext, *args, **kwargs):
+        """Send the session's new user and assistant messages to Zep."""
+        start = self._added.get(context.session_id, 0)
+        messages = []
+        for iteration in context.iterations[start:]:
+            for x in iteration.select(EntityMessage, "prologue"):
+                messages.append((zep_role_type(x.role), str(x.content)))
+            for x in iteration.select(AgentResponse, "process"):
+                if x.content:
+                    messages.append(("assistant", str(x.content)))
+        self._added[context.session_id] = len(context.iterations)
+        if not messages:
+            return
+
+        snapshot = IterationSnapshot(
+            session_id=context.session_id,
+            namespace=self.session_fn(context),
+            messages=[content for _, content in messages],
+            roles=[role for role, _ in messages],
+        )
+        if self.worker is not None:
+            self.worker.submit(snapshot)
+        else:
+            self._send([snapshot])
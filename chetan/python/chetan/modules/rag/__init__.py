@@ -1,3 +1,40 @@
-from .llama_index import LlamaIndexRAGModule
+from typing import TYPE_CHECKING
 
-__all__ = ["LlamaIndexRAGModule"]
\ No newline at end of file
+from chetan._lazy import lazy_exports
+
+from .ann import ANNBackend, FlatBackend, HNSWBackend, IVFBackend
+from .cache import RetrievalCache
+from .hybrid import CrossEncoderReranker, HybridRetriever, Reranker
+from .store import VectorStore
+
+if TYPE_CHECKING:
+    from .ingest import IngestionEngine, IngestionReport
+    from .llama_index import LlamaIndexRAGModule
+    from .tenants import MultiTenantRAGModule
+
+# These import `llama_index`, which takes longer to import than the rest of chetan
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "IngestionEngine": ".ingest",
+        "IngestionReport": ".ingest",
+        "LlamaIndexRAGModule": ".llama_index",
+        "MultiTenantRAGModule": ".tenants",
+    },
+)
+
+__all__ = [
+    "ANNBackend",
+    "CrossEncoderReranker",
+    "FlatBackend",
+    "HNSWBackend",
+    "HybridRetriever",
+    "IVFBackend",
+    "IngestionEngine",
+    "IngestionReport",
+    "LlamaIndexRAGModule",
+    "MultiTenantRAGModule",
+    "Reranker",
+    "RetrievalCache",
+    "VectorStore",
+]
@@ -0,0 +1,336 @@
+"""Nearest-neighbour search backends for `VectorStore`.
+
+The store's float32 matrix is always the source of truth. A backend keeps a derived index next to
+it, in files named `<name>.<generation>.*`, and catches up with (or rebuilds from) the matrix when
+the store is opened, so a crash can never leave the two inconsistent.
+"""
+
+from abc import ABC, abstractmethod
+import os
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+
+def _top_k(rows: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    k = min(k, len(rows))
+    if k == 0:
+        return rows[:0], scores[:0]
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return rows[top], scores[top]
+
+
+class ANNBackend(ABC):
+    """Finds the rows of a store's matrix most similar to a query vector."""
+
+    name: str
+
+    def open(self, path: str, generation: int, matrix: np.ndarray):
+        """Load the persisted index of `generation` from `path` and catch up with `matrix`."""
+        pass
+
+    def add(self, matrix: np.ndarray, start: int):
+        """Index the rows `start:` just appended to `matrix`."""
+        pass
+
+    @abstractmethod
+    def search(
+        self, matrix: np.ndarray, alive: np.ndarray, vector: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return up to `k` alive rows and their cosine scores, best first."""
+        ...
+
+    def close(self):
+        pass
+
+
+class FlatBackend(ANNBackend):
+    """Exact search over the whole matrix."""
+
+    name = "flat"
+
+    def search(self, matrix, alive, vector, k):
+        rows = np.flatnonzero(alive)
+        if len(rows) < len(matrix) // 4:
+            # Gathering the few alive rows, e.g. under a selective filter, beats scoring them all
+            return _top_k(rows, np.asarray(matrix[rows] @ vector), k)
+        scores = np.asarray(matrix @ vector)
+        return _top_k(rows, scores[rows], k)
+
+
+class IVFBackend(ANNBackend):
+    """Inverted-file index over a float16 copy of the matrix, with exact float32 reranking.
+
+    Rows are assigned to the nearest of `nlist` k-means centroids. A query scans the `nprobe`
+    closest lists in float16, then rescores the best `k * rerank` candidates against the float32
+    matrix. Raise `nprobe` for recall, lower it for latency.
+
+    Below `min_rows` rows, or before training, search is exact. The centroids are retrained when
+    the matrix has grown `retrain_growth` times since they were trained.
+    """
+
+    name = "ivf"
+
+    def __init__(
+        self,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        rerank: int = 4,
+        min_rows: int = 10_000,
+        retrain_growth: float = 4.0,
+        train_iterations: int = 10,
+    ):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self.min_rows = min_rows
+        self.retrain_growth = retrain_growth
+        self.train_iterations = train_iterations
+
+        self.path: Optional[str] = None
+        self.generation = 0
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_rows = 0
+        self._half = np.zeros((0, 0), dtype=np.float16)
+        self._lists = np.zeros(0, dtype=np.int32)
+        self._order: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+
+    def _file(self, suffix: str) -> str:
+        return os.path.join(self.path, f"{self.name}.{self.generation}.{suffix}")
+
+    # region Persistence
+
+    def open(self, path, generation, matrix):
+        self.path, self.generation = path, generation
+        self.centroids = None
+        if os.path.exists(self._file("centroids.npy")):
+            centroids = np.load(self._file("centroids.npy"))
+            if matrix.shape[1] == centroids.shape[1]:
+                self.centroids = centroids
+                self.trained_rows = int(
+                    np.load(self._file("trained.npy")) if os.path.exists(self._file("trained.npy")) else 0
+                )
+
+        if self.centroids is None:
+            self._reset()
+            self.add(matrix, 0)
+            return
+
+        # Drop rows indexed after the store's last commit, then index the ones we missed
+        rows = min(self._file_rows("f16", matrix.shape[1] * 2), self._file_rows("lists", 4))
+        for suffix, width in (("f16", matrix.shape[1] * 2), ("lists", 4)):
+            with open(self._file(suffix), "ab") as f:
+                f.truncate(min(rows, len(matrix)) * width)
+        self._map(min(rows, len(matrix)), matrix.shape[1])
+        self.add(matrix, len(self._lists))
+
+    def _file_rows(self, suffix: str, width: int) -> int:
+        path = self._file(suffix)
+        return os.path.getsize(path) // width if os.path.exists(path) else 0
+
+    def _reset(self):
+        self.centroids = None
+        self.trained_rows = 0
+        for suffix in ("centroids.npy", "trained.npy", "f16", "lists"):
+            if os.path.exists(self._file(suffix)):
+                os.remove(self._file(suffix))
+        self._half = np.zeros((0, 0), dtype=np.float16)
+        self._lists = np.zeros(0, dtype=np.int32)
+        self._order = self._offsets = None
+
+    def _map(self, rows: int, dim: int):
+        if rows == 0:
+            self._half = np.zeros((0, dim), dtype=np.float16)
+            self._lists = np.zeros(0, dtype=np.int32)
+        else:
+            self._half = np.memmap(self._file("f16"), dtype=np.float16, mode="r", shape=(rows, dim))
+            self._lists = np.memmap(self._file("lists"), dtype=np.int32, mode="r", shape=(rows,))
+        self._order = self._offsets = None
+
+    # endregion
+
+    # region Indexing
+
+    def _train(self, matrix: np.ndarray):
+        n = len(matrix)
+        nlist = self.nlist or max(16, int(4 * np.sqrt(n)))
+        rng = np.random.default_rng(0)
+        sample = np.asarray(matrix[np.sort(rng.choice(n, min(n, nlist * 64, 100_000), replace=False))])
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=nlist)
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        self._reset()
+        self.centroids = centroids
+        self.trained_rows = n
+        np.save(self._file("centroids.npy"), centroids)
+        np.save(self._file("trained.npy"), np.array(n))
+
+    def add(self, matrix, start):
+        n = len(matrix)
+        if n < self.min_rows:
+            return
+        if self.centroids is None or n >= self.trained_rows * self.retrain_growth:
+            self._train(matrix)
+            start = 0
+
+        with open(self._file("f16"), "ab") as half, open(self._file("lists"), "ab") as lists:
+            for i in range(start, n, 65536):
+                block = np.asarray(matrix[i : i + 65536])
+                half.write(block.astype(np.float16).tobytes())
+                lists.write(np.argmax(block @ self.centroids.T, axis=1).astype(np.int32).tobytes())
+        self._map(n, matrix.shape[1])
+
+    def _inverted_lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._order is None:
+            self._order = np.argsort(self._lists, kind="stable")
+            self._offsets = np.searchsorted(
+                self._lists[self._order], np.arange(len(self.centroids) + 1)
+            )
+        return self._order, self._offsets
+
+    # endregion
+
+    def search(self, matrix, alive, vector, k):
+        indexed = len(self._lists)
+        if self.centroids is None or indexed == 0:
+            return FlatBackend().search(matrix, alive, vector, k)
+
+        # Rows appended since the last `add` are not in the lists yet
+        tail = np.arange(indexed, len(matrix))
+        tail = tail[alive[tail]]
+        # Probe more lists until they hold `k` alive rows, e.g. when a filter matches few of them
+        order, offsets = self._inverted_lists()
+        ranked = np.argsort(-(self.centroids @ vector))
+        nprobe = min(self.nprobe, len(ranked))
+        while True:
+            rows = np.concatenate([order[offsets[p] : offsets[p + 1]] for p in ranked[:nprobe]])
+            rows = rows[alive[rows]]
+            if len(rows) + len(tail) >= k or nprobe == len(ranked):
+                break
+            nprobe = min(2 * nprobe, len(ranked))
+        # float16 halves memory and bandwidth, but numpy only has BLAS kernels for float32
+        approx = self._half[rows].astype(np.float32) @ vector
+        rows, _ = _top_k(rows, approx, k * self.rerank)
+
+        rows = np.sort(np.concatenate([rows, tail]))
+        return _top_k(rows, np.asarray(matrix[rows] @ vector), k)
+
+    def close(self):
+        self._half = np.zeros((0, 0), dtype=np.float16)
+        self._lists = np.zeros(0, dtype=np.int32)
+        self._order = self._offsets = None
+
+
+class HNSWBackend(ANNBackend):
+    """Graph index backed by `hnswlib`.
+
+    `ef` trades recall for latency at query time, `m` and `ef_construction` at build time. Writing
+    the index rewrites the whole graph, so it is saved on `close` and whenever the rows added since
+    the last save reach `save_growth` times the rows saved, rather than on every update. Rows the
+    saved index is missing are indexed again by `open`.
+    """
+
+    name = "hnsw"
+
+    def __init__(self, m: int = 16, ef_construction: int = 200, ef: int = 64, save_growth: float = 0.25):
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef = ef
+        self.save_growth = save_growth
+        self.index = None
+        self.file: Optional[str] = None
+        self._saved = 0  # Rows in the index file
+
+    def _new_index(self, dim: int, capacity: int):
+        import hnswlib
+
+        index = hnswlib.Index(space="ip", dim=dim)
+        index.init_index(
+            max_elements=max(capacity, 1024), M=self.m, ef_construction=self.ef_construction
+        )
+        return index
+
+    def open(self, path, generation, matrix):
+        import hnswlib
+
+        self.file = os.path.join(path, f"{self.name}.{generation}.bin")
+        self.index = None
+        self._saved = 0
+        if os.path.exists(self.file) and matrix.shape[1]:
+            index = hnswlib.Index(space="ip", dim=matrix.shape[1])
+            index.load_index(self.file)
+            if index.get_current_count() <= len(matrix):
+                self.index = index
+                self._saved = index.get_current_count()
+        if self.index is None:
+            if os.path.exists(self.file):
+                os.remove(self.file)
+            self.add(matrix, 0)
+        else:
+            self.add(matrix, self.index.get_current_count())
+
+    def add(self, matrix, start):
+        if len(matrix) <= start:
+            return
+        if self.index is None:
+            self.index = self._new_index(matrix.shape[1], 2 * len(matrix))
+        elif len(matrix) > self.index.get_max_elements():
+            self.index.resize_index(2 * len(matrix))
+        for i in range(start, len(matrix), 65536):
+            block = np.asarray(matrix[i : min(i + 65536, len(matrix))])
+            self.index.add_items(block, np.arange(i, i + len(block)))
+        if len(matrix) - self._saved >= self.save_growth * self._saved:
+            self._save()
+
+    def _save(self):
+        # Written aside and renamed, so a crash leaves the previous file intact
+        self.index.save_index(self.file + ".tmp")
+        os.replace(self.file + ".tmp", self.file)
+        self._saved = self.index.get_current_count()
+
+    def search(self, matrix, alive, vector, k):
+        count = 0 if self.index is None else self.index.get_current_count()
+        live = int(alive.sum())
+        if count == 0 or live == 0:
+            return FlatBackend().search(matrix, alive, vector, k)
+        # Tombstoned rows stay in the graph until `compact()` and filtered out rows are in it too:
+        # fetch as many neighbours as it takes to expect `k` alive ones, and more if they fall short
+        fetch = min(count, -(-k * count // live))
+        while 2 * fetch <= count:
+            self.index.set_ef(max(self.ef, fetch))
+            labels, _ = self.index.knn_query(vector, k=fetch)
+            rows = labels[0].astype(np.int64)
+            rows = np.sort(rows[alive[rows]])
+            if len(rows) >= k:
+                return _top_k(rows, np.asarray(matrix[rows] @ vector), k)
+            fetch *= 2
+        # Walking most of the graph costs more than scoring the few alive rows exactly
+        return FlatBackend().search(matrix, alive, vector, k)
+
+    def close(self):
+        if self.index is not None and self.index.get_current_count() > self._saved:
+            self._save()
+        self.index = None
+
+
+BACKENDS = {"flat": FlatBackend, "ivf": IVFBackend, "hnsw": HNSWBackend}
+
+
+def resolve_backend(backend: Union[str, ANNBackend]) -> ANNBackend:
+    """Resolve a backend instance from a name in `BACKENDS`, with its default parameters."""
+    if isinstance(backend, ANNBackend):
+        return backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown ANN backend `{backend}`, expected one of {list(BACKENDS)}")
+    return BACKENDS[backend]()
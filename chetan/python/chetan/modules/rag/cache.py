@@ -0,0 +1,112 @@
+from collections import OrderedDict
+import hashlib
+import json
+import re
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from chetan.modules.rag.store import ScoredChunk
+
+
+def query_key(query: str, filters: Optional[dict] = None) -> str:
+    """Hash of a query with case and whitespace normalized, and of its metadata filters."""
+    h = hashlib.sha1(re.sub(r"\s+", " ", query).strip().lower().encode())
+    if filters:
+        h.update(json.dumps(filters, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+class RetrievalCache:
+    """LRU caches of query embeddings and top-k results for a retriever.
+
+    Results are tagged with the store version they were computed at and are ignored once the
+    index changes. Embeddings only depend on the query and stay valid.
+
+    With `semantic_threshold` set, a query whose embedding has at least that cosine similarity to a
+    cached query's reuses its results, even if the text differs.
+    """
+
+    def __init__(self, maxsize: int = 1024, semantic_threshold: Optional[float] = None):
+        self.maxsize = maxsize
+        self.semantic_threshold = semantic_threshold
+        self.hits = 0
+        self.misses = 0
+        self._embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # (query key, k) -> (store version, query embedding, scope, results)
+        self._results: "OrderedDict[Tuple[str, int], Tuple[int, Optional[np.ndarray], str, List[ScoredChunk]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _put(self, cache: OrderedDict, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.maxsize:
+            cache.popitem(last=False)
+
+    def embedding(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._embeddings.get(key)
+            if vector is not None:
+                self._embeddings.move_to_end(key)
+            return vector
+
+    def put_embedding(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._put(self._embeddings, key, vector)
+
+    def results(self, key: str, k: int, version: int) -> Optional[List[ScoredChunk]]:
+        """Return the cached results of this exact query, if computed at `version`."""
+        with self._lock:
+            entry = self._results.get((key, k))
+            if entry is None or entry[0] != version:
+                return None
+            self._results.move_to_end((key, k))
+            self.hits += 1
+            return list(entry[3])
+
+    def similar(
+        self, vector: np.ndarray, k: int, version: int, scope: str = ""
+    ) -> Optional[List[ScoredChunk]]:
+        """Return the cached results of the most similar query above `semantic_threshold`, if any.
+
+        Only queries cached with the same `scope` (e.g. the same metadata filters) are considered.
+        """
+        if self.semantic_threshold is None:
+            return None
+        with self._lock:
+            candidates = [
+                (cache_key, cached)
+                for cache_key, (cached_version, cached, cached_scope, _) in self._results.items()
+                if cache_key[1] == k
+                and cached_version == version
+                and cached_scope == scope
+                and cached is not None
+            ]
+            if not candidates:
+                return None
+            scores = np.stack([cached for _, cached in candidates]) @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.semantic_threshold:
+                return None
+            self._results.move_to_end(candidates[best][0])
+            self.hits += 1
+            return list(self._results[candidates[best][0]][3])
+
+    def put_results(
+        self,
+        key: str,
+        k: int,
+        version: int,
+        vector: Optional[np.ndarray],
+        results: List[ScoredChunk],
+        scope: str = "",
+    ):
+        with self._lock:
+            self.misses += 1
+            self._put(self._results, (key, k), (version, vector, scope, list(results)))
+
+    def clear(self):
+        with self._lock:
+            self._embeddings.clear()
+            self._results.clear()
@@ -0,0 +1,179 @@
+from abc import ABC, abstractmethod
+import time
+from typing import Callable, Dict, List, Literal, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from chetan.embed import Embedder
+from chetan.modules.rag.cache import RetrievalCache, query_key
+from chetan.modules.rag.store import Filters, ScoredChunk, VectorStore
+
+
+class Reranker(ABC):
+    """Scores how relevant each text is to a query, higher is better."""
+
+    def load(self):
+        """Load the model weights. Called lazily before the first `score`."""
+        pass
+
+    @abstractmethod
+    def score(self, query: str, texts: List[str]) -> np.ndarray:
+        ...
+
+
+class CrossEncoderReranker(Reranker):
+    """Local cross-encoder backed by `sentence-transformers`, loaded on first use."""
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", **kwargs):
+        self.model_name = model_name
+        self.kwargs = kwargs
+        self.model = None
+
+    def load(self):
+        if self.model is None:
+            from sentence_transformers import CrossEncoder
+
+            self.model = CrossEncoder(self.model_name, **self.kwargs)
+
+    def score(self, query: str, texts: List[str]) -> np.ndarray:
+        self.load()
+        return np.asarray(self.model.predict([(query, text) for text in texts]), dtype=np.float32)
+
+
+class CallableReranker(Reranker):
+    """Wraps a plain `(query, texts) -> scores` function."""
+
+    def __init__(self, fn: Callable[[str, List[str]], Sequence[float]]):
+        self.fn = fn
+
+    def score(self, query: str, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.fn(query, texts), dtype=np.float32)
+
+
+RerankerLike = Union[str, Reranker, Callable[[str, List[str]], Sequence[float]]]
+
+
+def resolve_reranker(reranker: Optional[RerankerLike]) -> Optional[Reranker]:
+    """Resolve a reranker from an instance, a `(query, texts) -> scores` function, or a cross-encoder name."""
+    if reranker is None or isinstance(reranker, Reranker):
+        return reranker
+    if isinstance(reranker, str):
+        return CrossEncoderReranker(reranker)
+    if callable(reranker):
+        return CallableReranker(reranker)
+    raise TypeError(f"Cannot use {type(reranker).__name__} as a reranker")
+
+
+def _key(result: ScoredChunk) -> Tuple[str, str]:
+    return result.chunk.doc_id, result.chunk.id
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[ScoredChunk]], k: int = 60
+) -> List[ScoredChunk]:
+    """Merge rankings by summing `1 / (k + rank)` per chunk. The fused score replaces the original."""
+    fused: Dict[Tuple[str, str], ScoredChunk] = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking):
+            key = _key(result)
+            if key not in fused:
+                fused[key] = ScoredChunk(chunk=result.chunk, score=0.0)
+            fused[key].score += 1.0 / (k + rank + 1)
+    return sorted(fused.values(), key=lambda result: -result.score)
+
+
+class HybridRetriever:
+    """Fuses dense (embedding) and BM25 keyword results with RRF, then optionally reranks them.
+
+    Keyword search catches exact identifiers such as SKUs and error codes that embeddings blur.
+    The reranker scores fused candidates in batches, best first, until `rerank_budget_ms` is spent;
+    candidates it did not reach keep their fused order after the reranked ones.
+
+    With a `RetrievalCache`, repeated queries skip embedding, search and reranking until the store changes.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        embedder: Embedder,
+        k: int = 2,
+        mode: Literal["hybrid", "dense", "keyword"] = "hybrid",
+        candidates: int = 20,
+        rrf_k: int = 60,
+        reranker: Optional[RerankerLike] = None,
+        rerank_budget_ms: Optional[float] = 200,
+        rerank_batch_size: int = 8,
+        cache: Optional[RetrievalCache] = None,
+    ):
+        self.store = store
+        self.embedder = embedder
+        self.k = k
+        self.mode = mode
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.reranker = resolve_reranker(reranker)
+        self.rerank_budget_ms = rerank_budget_ms
+        self.rerank_batch_size = rerank_batch_size
+        self.cache = cache
+
+    def _embed_query(self, query: str, key: str) -> np.ndarray:
+        vector = self.cache.embedding(key) if self.cache else None
+        if vector is None:
+            vector = self.embedder.embed_query(query)
+            if self.cache:
+                self.cache.put_embedding(key, vector)
+        return vector
+
+    def retrieve(
+        self, query: str, k: Optional[int] = None, filters: Optional[Filters] = None
+    ) -> List[ScoredChunk]:
+        """Retrieve the top-k chunks for `query`, among those whose metadata matches `filters`."""
+        k = k or self.k
+        key, version = query_key(query, filters), self.store.version
+        scope = query_key("", filters) if filters else ""
+        if self.cache:
+            cached = self.cache.results(key, k, version)
+            if cached is not None:
+                return cached
+
+        vector = None
+        if self.mode != "keyword" or (self.cache and self.cache.semantic_threshold is not None):
+            vector = self._embed_query(query, query_key(query))
+            if self.cache:
+                cached = self.cache.similar(vector, k, version, scope)
+                if cached is not None:
+                    return cached
+
+        depth = max(k, self.candidates)
+        rankings = []
+        if self.mode != "keyword":
+            rankings.append(self.store.search(vector, k=depth, filters=filters))
+        if self.mode != "dense":
+            rankings.append(self.store.keyword_search(query, k=depth, filters=filters))
+        results = reciprocal_rank_fusion(rankings, k=self.rrf_k)
+
+        if self.reranker is not None:
+            results = self.rerank(query, results)
+        results = results[:k]
+        if self.cache:
+            self.cache.put_results(key, k, version, vector, results, scope)
+        return results
+
+    def rerank(self, query: str, results: List[ScoredChunk]) -> List[ScoredChunk]:
+        deadline = (
+            None
+            if self.rerank_budget_ms is None
+            else time.perf_counter() + self.rerank_budget_ms / 1000
+        )
+        reranked: List[ScoredChunk] = []
+        while len(reranked) < len(results):
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            batch = results[len(reranked) : len(reranked) + self.rerank_batch_size]
+            scores = self.reranker.score(query, [result.chunk.text for result in batch])
+            reranked += [
+                ScoredChunk(chunk=result.chunk, score=float(score))
+                for result, score in zip(batch, scores)
+            ]
+        reranked.sort(key=lambda result: -result.score)
+        return reranked + results[len(reranked) :]
@@ -0,0 +1,423 @@
+import asyncio
+import hashlib
+from itertools import islice
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import (
+    AsyncIterable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+from llama_index.core.ingestion import IngestionPipeline
+from llama_index.core.ingestion.pipeline import run_transformations
+from llama_index.core.schema import Document, MetadataMode
+from loguru import logger
+from pydantic import BaseModel
+from tqdm import tqdm
+
+from chetan.embed import Embedder
+from chetan.embed.embedder import normalize
+from chetan.modules.rag.store import Chunk, VectorStore, content_hash
+
+# (node_id, text, embed_text, metadata, embedding or None) for one chunk
+RawChunk = Tuple[str, str, str, dict, Optional[List[float]]]
+
+# Pipeline and embedder of a process pool worker, set once by `_init_worker`
+_worker_state: dict = {}
+
+
+def _init_worker(pipeline: IngestionPipeline, embedder: Embedder):
+    _worker_state["pipeline"] = pipeline
+    _worker_state["embedder"] = embedder
+
+
+def _chunk_documents(
+    documents: List[Document], pipeline: IngestionPipeline = None
+) -> Dict[str, List[RawChunk]]:
+    pipeline = pipeline or _worker_state["pipeline"]
+    # Only the transformations are run: the pipeline's cache would keep every node alive, and our
+    # store already dedups documents and chunks
+    chunks: Dict[str, List[RawChunk]] = {document.id_: [] for document in documents}
+    for node in run_transformations(list(documents), pipeline.transformations):
+        # Documents passed through unchanged, e.g. by a pipeline without a splitter, are their own source
+        source = node.ref_doc_id if node.ref_doc_id is not None else node.node_id
+        chunks[source].append(
+            (
+                node.node_id,
+                node.get_content(),
+                node.get_content(metadata_mode=MetadataMode.EMBED),
+                node.metadata,
+                node.embedding,
+            )
+        )
+    return chunks
+
+
+def _embed_texts(texts: List[str], embedder: Embedder = None) -> np.ndarray:
+    embedder = embedder or _worker_state["embedder"]
+    return embedder.embed(texts)
+
+
+DocumentSource = Union[Iterable[Document], AsyncIterable[Document]]
+
+
+def iter_documents(source: DocumentSource, buffer: int = 64) -> Iterator[Document]:
+    """Iterate a list, iterator or async iterator of documents, holding at most `buffer` ahead.
+
+    Async sources are consumed on an event loop in a background thread.
+    """
+    if not hasattr(source, "__aiter__"):
+        yield from source
+        return
+
+    items: queue.Queue = queue.Queue(maxsize=buffer)
+    stop = threading.Event()
+    done = object()
+
+    async def produce():
+        try:
+            async for document in source:
+                while not stop.is_set():
+                    try:
+                        items.put(document, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            items.put(done)
+        except BaseException as e:
+            items.put(e)
+
+    thread = threading.Thread(target=asyncio.run, args=(produce(),), daemon=True)
+    thread.start()
+    try:
+        while (item := items.get()) is not done:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def batched(iterable: Iterable, n: Optional[int]) -> Iterator[list]:
+    """Split an iterable into lists of `n` items, or a single list if `n` is None."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, n)):
+        yield batch
+
+
+def default_document_id(document: Document) -> str:
+    """Stable id for a document across runs: its file path (and page), falling back to `id_`."""
+    source = document.metadata.get("file_path") or document.metadata.get("file_name")
+    if source is None:
+        return document.id_
+    page = document.metadata.get("page_label")
+    return f"{source}#{page}" if page is not None else source
+
+
+def _log(message: str, level: str = "info"):
+    logger.log(level.upper(), message)
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class IngestionReport(BaseModel):
+    documents: int = 0
+    chunks: int = 0
+    unique_chunks: int = 0
+    reused: int = 0  # Embeddings found in the store
+    embedded: int = 0
+    chunk_seconds: float = 0.0
+    embed_seconds: float = 0.0
+
+    def __add__(self, other: "IngestionReport") -> "IngestionReport":
+        return IngestionReport(
+            **{name: getattr(self, name) + getattr(other, name) for name in IngestionReport.model_fields}
+        )
+
+    @property
+    def seconds(self) -> float:
+        return self.chunk_seconds + self.embed_seconds
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.documents} documents -> {self.chunks} chunks ({self.unique_chunks} unique, "
+            f"{self.reused} reused, {self.embedded} embedded) in {self.seconds:.2f}s "
+            f"[chunking {self.chunk_seconds:.2f}s, embedding {self.embed_seconds:.2f}s, "
+            f"{self.chunks_per_second:.0f} chunks/s]"
+        )
+
+
+class IngestionEngine:
+    """Chunks and embeds documents on a worker pool, in batches, embedding each distinct chunk once.
+
+    Use `executor="process"` for embedders and splitters that hold the GIL (pure Python); both are
+    then pickled once into every worker. `executor="thread"` suits embedders that release it
+    (numpy, torch, remote APIs).
+    """
+
+    def __init__(
+        self,
+        pipeline: IngestionPipeline,
+        embedder: Embedder,
+        batch_size: int = 128,
+        workers: Optional[int] = None,
+        executor: Literal["thread", "process"] = "thread",
+        show_progress: bool = True,
+    ):
+        self.pipeline = pipeline
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor
+        self.show_progress = show_progress
+        self._pool: Optional[Executor] = None
+
+    @property
+    def pool(self) -> Executor:
+        if self._pool is None:
+            if self.executor == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.pipeline, self.embedder),
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def _local_args(self, value):
+        # Threads share our objects, process workers use the copies made by `_init_worker`
+        return () if self.executor == "process" else (value,)
+
+    def chunk(self, documents: Sequence[Document]) -> Dict[str, List[RawChunk]]:
+        """Split documents into chunks on the worker pool, keyed by `Document.id_`."""
+        documents = list(documents)
+        if not documents:
+            return {}
+        size = max(1, len(documents) // (self.workers * 4))
+        futures = [
+            self.pool.submit(
+                _chunk_documents, documents[i : i + size], *self._local_args(self.pipeline)
+            )
+            for i in range(0, len(documents), size)
+        ]
+        chunks: Dict[str, List[RawChunk]] = {}
+        for future in futures:
+            chunks.update(future.result())
+        return chunks
+
+    def embed(self, texts: List[str], desc: str = "Embedding") -> np.ndarray:
+        """Embed texts in batches of `batch_size` on the worker pool, preserving order."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        futures = [
+            self.pool.submit(
+                _embed_texts,
+                texts[i : i + self.batch_size],
+                *self._local_args(self.embedder),
+            )
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        batches = []
+        with tqdm(
+            total=len(texts), desc=desc, unit="chunk", disable=not self.show_progress
+        ) as progress:
+            for future in futures:
+                batches.append(future.result())
+                progress.update(len(batches[-1]))
+        return np.concatenate(batches)
+
+    def run(
+        self,
+        documents: Dict[str, Document],
+        lookup: Callable[[List[str]], Dict[str, np.ndarray]] = None,
+    ) -> Tuple[Dict[str, Tuple[List[Chunk], np.ndarray]], IngestionReport]:
+        """Chunk and embed documents keyed by document id.
+
+        Args:
+            documents (Dict[str, Document]): Documents to ingest, keyed by document id.
+            lookup (Callable[[List[str]], Dict[str, np.ndarray]], optional): Returns known embeddings
+                by chunk hash, e.g. `VectorStore.vectors_by_hash`. Defaults to None.
+
+        Returns:
+            Tuple[Dict[str, Tuple[List[Chunk], np.ndarray]], IngestionReport]: Chunks and their
+                normalized embeddings per document id, and a report of the run.
+        """
+        report = IngestionReport(documents=len(documents))
+
+        start = time.perf_counter()
+        raw = self.chunk(documents.values())
+        report.chunk_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vectors: Dict[str, np.ndarray] = {}
+        pending: Dict[str, str] = {}
+        for chunks in raw.values():
+            for _, _, embed_text, _, embedding in chunks:
+                h = chunk_hash(embed_text)
+                report.chunks += 1
+                if embedding is not None:
+                    vectors[h] = normalize(np.asarray(embedding, dtype=np.float32))
+                else:
+                    pending.setdefault(h, embed_text)
+        report.unique_chunks = len(set(pending) | set(vectors))
+
+        if lookup is not None and pending:
+            known = lookup([h for h in pending if h not in vectors])
+            report.reused = len(known)
+            vectors.update(known)
+
+        texts = {h: text for h, text in pending.items() if h not in vectors}
+        embedded = self.embed(list(texts.values()))
+        vectors.update(zip(texts.keys(), embedded))
+        report.embedded = len(texts)
+        report.embed_seconds = time.perf_counter() - start
+
+        results: Dict[str, Tuple[List[Chunk], np.ndarray]] = {}
+        for doc_id, document in documents.items():
+            chunks = [
+                Chunk(
+                    id=node_id,
+                    doc_id=doc_id,
+                    text=text,
+                    metadata=metadata,
+                    hash=chunk_hash(embed_text),
+                )
+                for node_id, text, embed_text, metadata, _ in raw.get(document.id_, [])
+            ]
+            results[doc_id] = (
+                chunks,
+                np.stack([vectors[c.hash] for c in chunks])
+                if chunks
+                else np.zeros((0, 0), dtype=np.float32),
+            )
+        return results, report
+
+    def upsert(
+        self,
+        store: VectorStore,
+        documents: Dict[str, Document],
+        hashes: Optional[Dict[str, str]] = None,
+    ) -> IngestionReport:
+        """Chunk, embed and index documents keyed by document id into `store`, replacing previous versions."""
+        results, report = self.run(documents, lookup=store.vectors_by_hash)
+        store.upsert(
+            (
+                doc_id,
+                (hashes or {}).get(doc_id)
+                or content_hash(document.text, document.metadata),
+                *results[doc_id],
+            )
+            for doc_id, document in documents.items()
+        )
+        return report
+
+    def sync(
+        self,
+        store: VectorStore,
+        documents: DocumentSource,
+        doc_id_fn: Callable[[Document], str] = default_document_id,
+        batch_documents: Optional[int] = 256,
+        delete_missing: bool = True,
+        log: Callable[..., None] = _log,
+    ) -> IngestionReport:
+        """Bring `store` up to date with `documents`, streaming them in batches.
+
+        Only documents whose content hash changed are chunked and re-embedded. Progress is checkpointed
+        in the store after every batch: if a sync is interrupted, the next one skips the documents it had
+        already processed, so sources must yield documents in a stable order.
+
+        Readers may emit several documents per file, e.g. one per section: when `doc_id_fn` returns an
+        id again, the repeat is told apart by its position among the documents with that id, as in
+        `notes.md`, `notes.md[2]`, `notes.md[3]`.
+
+        Args:
+            store (VectorStore): The index to update.
+            documents (DocumentSource): The current documents, as a list, iterator or async iterator.
+            doc_id_fn (Callable[[Document], str], optional): Stable document id. Defaults to `default_document_id`.
+            batch_documents (int, optional): Documents ingested and committed together, None for all at once.
+                Defaults to 256.
+            delete_missing (bool, optional): Delete indexed documents that are not in `documents`. Defaults to True.
+            log (Callable[..., None], optional): `(message, level="info")` logging function.
+
+        Returns:
+            IngestionReport: Totals of the documents that were ingested.
+        """
+        seen: Dict[str, int] = {}  # Documents yielded so far per id
+
+        def unique_id(document: Document) -> str:
+            doc_id = doc_id_fn(document)
+            count = seen[doc_id] = seen.get(doc_id, 0) + 1
+            return doc_id if count == 1 else f"{doc_id}[{count}]"
+
+        position = store.begin_sync()
+        stream = iter_documents(documents)
+        if position:
+            log(f"Resuming an interrupted sync after {position} documents.")
+            for document in islice(stream, position):
+                unique_id(document)
+
+        total, changed_count = IngestionReport(), 0
+        progress = tqdm(
+            desc="Syncing", unit="doc", initial=position, disable=not self.show_progress
+        )
+        for batch in batched(stream, batch_documents):
+            hashes: Dict[str, str] = {}
+            latest: Dict[str, Document] = {}
+            for document in batch:
+                doc_id = unique_id(document)
+                hashes[doc_id] = content_hash(document.text, document.metadata)
+                latest[doc_id] = document
+
+            indexed = store.document_hashes(hashes)
+            changed = {
+                doc_id: document
+                for doc_id, document in latest.items()
+                if indexed.get(doc_id) != hashes[doc_id]
+            }
+            if changed:
+                total += self.upsert(store, changed, hashes)
+                changed_count += len(changed)
+
+            position += len(batch)
+            store.checkpoint_sync(hashes, position)
+            progress.update(len(batch))
+        progress.close()
+
+        log(f"{changed_count} of {position} documents changed since the last sync.")
+        if total.documents:
+            log(f"Ingested {total}")
+
+        missing = store.finish_sync(delete_missing)
+        if missing:
+            log(f"Deleted {len(missing)} documents from the index.")
+
+        if store.garbage_ratio > 0.5:
+            store.compact()
+        return total
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -1,42 +1,61 @@
-from typing import Callable, Literal, Sequence
 import os
-import pickle
+import warnings
+from typing import Callable, Dict, List, Literal, Optional, Sequence, Union
 
 from chetan.agent.module import AgentLoopModule
+from chetan.embed import Embedder, LlamaIndexEmbedder
 from chetan.lm import LMLegibleMessage
+from chetan.modules.rag.ann import ANNBackend
+from chetan.modules.rag.cache import RetrievalCache
+from chetan.modules.rag.hybrid import HybridRetriever, RerankerLike, resolve_reranker
+from chetan.modules.rag.ingest import (
+    DocumentSource,
+    IngestionEngine,
+    IngestionReport,
+    default_document_id,
+)
+from chetan.modules.rag.store import ScoredChunk, VectorStore
 from chetan.tools import toolfn
 from chetan.types.context.agent import EntityMessage, PrologueItem
 from chetan.agent.module import prologue
 
 from chetan.types.context.agent.iteration import AgentContext
 from llama_index.core.schema import Document
-from llama_index.core import VectorStoreIndex
-from llama_index.core.base.base_retriever import BaseRetriever
-from llama_index.core.schema import BaseNode
 from llama_index.core.ingestion import IngestionPipeline
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core.base.embeddings.base import BaseEmbedding
 
 
-from asq import query
 from pydantic import BaseModel
 
 
 class LlamaIndexItem(BaseModel):
     content: str
     source: str
+    id: Optional[str] = None
 
 
 class LlamaIndexResult(PrologueItem):
     items: list[LlamaIndexItem]
+    references: list[str] = []  # Ids of relevant chunks that are already in the context
+
+    def retrieved_ids(self) -> List[str]:
+        return [item.id for item in self.items] + self.references
 
     def __str__(self):
-        return "\n----------------------------------------n".join(
-            f"Document: {item.content}\nSource: {item.source}" for item in self.items
+        documents = "\n----------------------------------------n".join(
+            f"Document {item.id}: {item.content}\nSource: {item.source}"
+            if item.id
+            else f"Document: {item.content}\nSource: {item.source}"
+            for item in self.items
         )
+        if not self.references:
+            return documents
+        references = f"Also relevant, provided earlier: {', '.join(self.references)}"
+        return f"{documents}\n\n{references}" if documents else references
 
     def to_lm_legible(self):
-        if not self.items:
+        if not self.items and not self.references:
             return []
 
         return LMLegibleMessage(
@@ -45,97 +64,230 @@ class LlamaIndexResult(PrologueItem):
         )
 
 
+def load_embedder(
+    embed_model_fn: Optional[Callable[[], Union[BaseEmbedding, Embedder]]] = None,
+) -> Embedder:
+    """Load an embedding model, defaulting to llama-index's `Settings.embed_model`."""
+    if embed_model_fn:
+        embed_model = embed_model_fn()
+    else:
+        from llama_index.core import Settings
+
+        embed_model = Settings.embed_model
+    if isinstance(embed_model, Embedder):
+        return embed_model
+    return LlamaIndexEmbedder(embed_model)
+
+
+def prologue_query(
+    context: AgentContext, mode: Literal["userquery", "iteration"]
+) -> Optional[str]:
+    """The text to retrieve for: the latest user message, or the last complete iteration."""
+    if mode == "userquery":
+        message = context.latest().last(EntityMessage, "prologue", role="user")
+        return message.content if message is not None else None
+    iteration = context.latest_complete_iteration()
+    return iteration.flatten() if iteration is not None else None
+
+
+def inject_results(context: AgentContext, items: List[LlamaIndexItem], keep_results: int = 3):
+    """Add retrieved items to the prologue, referencing those already in the live context by id.
+
+    Earlier results none of whose chunks were retrieved by the last `keep_results` retrievals are
+    removed from the context.
+    """
+    if not items:
+        return
+
+    live = context.select(LlamaIndexResult, "prologue")
+    in_context = {item.id for result in live for item in result.items}
+    result = LlamaIndexResult(
+        items=[item for item in items if item.id not in in_context],
+        references=[item.id for item in items if item.id in in_context],
+    )
+    context.add_item(result, "prologue")
+
+    results = live + [result]
+    relevant = {id for recent in results[-keep_results:] for id in recent.retrieved_ids()}
+    for old in results[:-keep_results]:
+        if not any(item.id in relevant for item in old.items):
+            context.remove_item(old.context_id, "prologue")
+
+
+def to_items(retrieval: List[ScoredChunk]) -> List[LlamaIndexItem]:
+    return [
+        LlamaIndexItem(
+            content=item.chunk.text,
+            source=item.chunk.metadata.get("file_name", item.chunk.doc_id),
+            id=item.chunk.id,
+        )
+        for item in retrieval
+    ]
+
+
 class LlamaIndexRAGModule(AgentLoopModule):
     tool_namespace: str = "rag"
 
     def __init__(
         self,
-        data_fn: Callable[[], list[Document]],
+        data_fn: Callable[[], DocumentSource],
         mode: Literal["userquery", "iteration"] = "userquery",
         pipeline: IngestionPipeline = IngestionPipeline(
             transformations=[SentenceSplitter(chunk_size=128, chunk_overlap=64)]
         ),
-        embed_model_fn: Callable[[], BaseEmbedding] = None,
-        cache_path: str = "./temp/rag_cache.pkl",  # New argument for cache file
-        **kwargs,
+        embed_model_fn: Callable[[], Union[BaseEmbedding, Embedder]] = None,
+        index_path: str = "./temp/rag_index",
+        similarity_top_k: int = 2,
+        doc_id_fn: Callable[[Document], str] = default_document_id,
+        embed_batch_size: int = 128,
+        ingest_workers: Optional[int] = None,
+        ingest_executor: Literal["thread", "process"] = "thread",
+        ann_backend: Union[str, ANNBackend] = "flat",
+        retrieval_mode: Literal["hybrid", "dense", "keyword"] = "hybrid",
+        candidate_k: int = 20,
+        reranker: Optional[RerankerLike] = None,
+        rerank_budget_ms: Optional[float] = 200,
+        cache_size: int = 1024,
+        semantic_cache_threshold: Optional[float] = None,
+        keep_results: int = 3,
+        ingest_batch_documents: Optional[int] = 256,
+        cache_path: Optional[str] = None,
     ):
         """Initialize the LlamaIndexRAGModule with the provided data.
 
         Args:
-            data (list[Document]): A list of documents to be indexed.
+            data_fn (Callable[[], DocumentSource]): Returns the documents to be indexed, as a list, an iterator
+                or an async iterator. Iterators are ingested in a stream of bounded memory.
+            embed_model_fn (Callable[[], Union[BaseEmbedding, Embedder]], optional): Loads the embedding model.
+                Defaults to llama-index's `Settings.embed_model`.
+            index_path (str, optional): Directory of the persistent vector index. Defaults to "./temp/rag_index".
+            similarity_top_k (int, optional): Number of chunks to retrieve. Defaults to 2.
+            doc_id_fn (Callable[[Document], str], optional): Stable document id used for incremental updates.
+            embed_batch_size (int, optional): Number of chunks embedded per batch. Defaults to 128.
+            ingest_workers (int, optional): Size of the chunking and embedding pool. Defaults to the CPU count.
+            ingest_executor (Literal["thread", "process"], optional): Pool type, see `IngestionEngine`.
+                Defaults to "thread".
+            ann_backend (Union[str, ANNBackend], optional): Search backend of the index: "flat" (exact), "ivf",
+                "hnsw" or a configured `ANNBackend`. Defaults to "flat".
+            retrieval_mode (Literal["hybrid", "dense", "keyword"], optional): Fuse dense and BM25 results,
+                or use only one of them. Defaults to "hybrid".
+            candidate_k (int, optional): Candidates taken from each retriever before fusion. Defaults to 20.
+            reranker (RerankerLike, optional): Cross-encoder name, `Reranker` or `(query, texts) -> scores`
+                function used to rerank fused candidates. Defaults to None.
+            rerank_budget_ms (float, optional): Time budget of the rerank stage per query. Defaults to 200.
+            cache_size (int, optional): Number of cached query embeddings and results, 0 disables the cache.
+                Defaults to 1024.
+            semantic_cache_threshold (float, optional): Reuse the results of a cached query whose embedding
+                has at least this cosine similarity. Defaults to None (exact matches only).
+            ingest_batch_documents (int, optional): Documents chunked, embedded and committed together while
+                syncing; progress is checkpointed after each batch. None ingests everything at once. Defaults to 256.
+            keep_results (int, optional): Older prologue results are evicted from the context once none of
+                their chunks were retrieved by this many latest retrievals. Defaults to 3.
+            cache_path (str, optional): Deprecated, use `index_path`. The pickled pipeline cache this used
+                to name cannot be read; the index is kept in a directory next to it instead. Defaults to None.
         """
+        if cache_path is not None:
+            index_path = os.path.splitext(cache_path)[0]
+            warnings.warn(
+                f"`cache_path` is deprecated, use `index_path`; indexing into {index_path}",
+                DeprecationWarning,
+                stacklevel=2,
+            )
         self.data_fn = data_fn
         self.pipeline = pipeline
         self.mode = mode
         self.embed_model_fn = embed_model_fn
-        self.cache_path = cache_path
-        self._kwargs = kwargs
+        self.index_path = index_path
+        self.similarity_top_k = similarity_top_k
+        self.doc_id_fn = doc_id_fn
+        self.embed_batch_size = embed_batch_size
+        self.ingest_workers = ingest_workers
+        self.ingest_executor = ingest_executor
+        self.ann_backend = ann_backend
+        self.retrieval_mode = retrieval_mode
+        self.candidate_k = candidate_k
+        self.reranker = resolve_reranker(reranker)
+        self.rerank_budget_ms = rerank_budget_ms
+        self.keep_results = keep_results
+        self.ingest_batch_documents = ingest_batch_documents
+        self.cache = (
+            RetrievalCache(cache_size, semantic_threshold=semantic_cache_threshold)
+            if cache_size
+            else None
+        )
 
         super().__init__()
 
     def setup(self):
         self.log("Loading embedding model...")
-        self.embed_model = self.embed_model_fn() if self.embed_model_fn else None
+        self.embedder = load_embedder(self.embed_model_fn)
         self.log("Finished loading embedding model.")
+        if self.reranker is not None:
+            self.reranker.load()
+
+        if getattr(self, "ingestion", None) is not None:
+            self.ingestion.shutdown()
+        self.ingestion = IngestionEngine(
+            self.pipeline,
+            self.embedder,
+            batch_size=self.embed_batch_size,
+            workers=self.ingest_workers,
+            executor=self.ingest_executor,
+            show_progress=False,
+        )
 
-        # If cache_path is provided and file exists, load from cache
-        if self.cache_path and os.path.exists(self.cache_path):
-            self.log(f"Loading RAG pipeline state from cache: {self.cache_path}")
-            with open(self.cache_path, "rb") as f:
-                cache = pickle.load(f)
-
-            self.nodes: Sequence[BaseNode] = cache["nodes"]
-            self.log(f"Loaded {len(self.nodes)} nodes from cache.")
-            self.index: VectorStoreIndex = cache["index"]
-            self.retriever: BaseRetriever = cache["retriever"]
-            self.log("Loaded index, retriever from cache.")
-            return
+        if getattr(self, "store", None) is not None:
+            self.store.close()
+        self.store = VectorStore(self.index_path, backend=self.ann_backend)
+        self.log(f"Opened index at {self.index_path} with {len(self.store)} chunks.")
+        if self.cache is not None:
+            self.cache.clear()
+        self.retriever = HybridRetriever(
+            self.store,
+            self.embedder,
+            k=self.similarity_top_k,
+            mode=self.retrieval_mode,
+            candidates=self.candidate_k,
+            reranker=self.reranker,
+            rerank_budget_ms=self.rerank_budget_ms,
+            cache=self.cache,
+        )
 
-        self.log("Loading data...")
-        data = self.data_fn()
-        if not data:
+        self.sync(self.data_fn())
+        if len(self.store) == 0:
             raise ValueError("No data provided to the LlamaIndexRAGModule.")
-        self.log(f"Loaded {len(data)} documents.")
-
-        self.log("Running pipeline...")
-        self.nodes = self.pipeline.run(documents=self.data_fn())
-        self.log(f"Pipeline completed with {len(self.nodes)} nodes.")
-        self.log("Creating index...")
-        self.index, self.retriever = self.create_index(
-            self.nodes, embed_model=self.embed_model, **self._kwargs
-        )
-        self.log("Finished creating index.")
-
-        # Save to cache if cache_path is provided
-        if self.cache_path:
-            self.log(f"Saving RAG pipeline state to cache: {self.cache_path}")
-            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
-            with open(self.cache_path, "wb") as f:
-                pickle.dump(
-                    {
-                        "nodes": self.nodes,
-                        "index": self.index,
-                        "retriever": self.retriever,
-                    },
-                    f,
-                )
-            self.log("Saved RAG pipeline state to cache.")
-
-    def create_index(self, nodes, **kwargs):
-        """Create an index from the provided nodes.
 
-        Args:
-            nodes (Sequence[BaseNode]): A list of nodes to be indexed.
+    def sync(self, documents: DocumentSource, delete_missing: bool = True) -> IngestionReport:
+        """Bring the index up to date with `documents`, see `IngestionEngine.sync`.
 
-        Returns:
-            _type_: _description_
+        Args:
+            documents (DocumentSource): The current documents, as a list, iterator or async iterator.
+            delete_missing (bool, optional): Delete indexed documents that are not in `documents`. Defaults to True.
         """
-        index = VectorStoreIndex(nodes, **kwargs)
-        retriever = index.as_retriever(**kwargs)
-        return index, retriever
+        return self.ingestion.sync(
+            self.store,
+            documents,
+            doc_id_fn=self.doc_id_fn,
+            batch_documents=self.ingest_batch_documents,
+            delete_missing=delete_missing,
+            log=self.log,
+        )
+
+    def upsert(
+        self, documents: Dict[str, Document], hashes: Optional[Dict[str, str]] = None
+    ) -> IngestionReport:
+        """Chunk, embed and index documents keyed by their document id, replacing previous versions."""
+        return self.ingestion.upsert(self.store, documents, hashes)
+
+    def delete(self, doc_ids: Sequence[str]):
+        """Remove documents from the index."""
+        self.store.delete(doc_ids)
+
+    def _retrieve(self, query) -> List[ScoredChunk]:
+        return self.retriever.retrieve(str(query))
 
-    def _retrieve(self, query):
-        return self.retriever.retrieve(query)
+    def _to_items(self, retrieval: List[ScoredChunk]) -> List[LlamaIndexItem]:
+        return to_items(retrieval)
 
     @toolfn
     def retrieve(self, query: str) -> LlamaIndexResult:
@@ -148,44 +300,12 @@ class LlamaIndexRAGModule(AgentLoopModule):
             LlamaIndexResult: A result object containing a list of items with content and source that match the query.
         """
         retrieval = self._retrieve(query)
-        return LlamaIndexResult(
-            items=[
-                LlamaIndexItem(
-                    content=item.node.get_content(),
-                    source=item.node.metadata["file_name"],
-                )
-                for item in retrieval
-            ]
-        )
+        return LlamaIndexResult(items=self._to_items(retrieval))
 
     @prologue
     def retrieve_prologue(self, context: AgentContext, *args, **kwargs):
         """Retrieve relevant documents from the index based on the query."""
-        if self.mode == "userquery":
-            retrieve_query = (
-                query(context.latest().prologue)
-                .where(lambda x: isinstance(x, EntityMessage) and x.role == "user")
-                .select(lambda x: x.content)
-                .last_or_default(default=None)
-            )
-
-            if retrieve_query is None:
-                return
-
-        if self.mode == "iteration":
-            retrieve_query = context.latest_complete_iteration().flatten()
-
-        retrieval = self._retrieve(retrieve_query)
-
-        context.add_item(
-            LlamaIndexResult(
-                items=[
-                    LlamaIndexItem(
-                        content=item.node.get_content(),
-                        source=item.node.metadata["file_name"],
-                    )
-                    for item in retrieval
-                ]
-            ),
-            "prologue",
-        )
+        retrieve_query = prologue_query(context, self.mode)
+        if retrieve_query is None:
+            return
+        inject_results(context, self._to_items(self._retrieve(retrieve_query)), self.keep_results)
@@ -0,0 +1,493 @@
+"""Durable, incrementally updatable vector store for RAG modules.
+
+On-disk layout of a store directory (format version 1):
+
+- `embeddings.<generation>.f32`: row-major float32 embedding matrix, memory-mapped for search.
+  Rows are append-only, deleted rows are tombstoned until `compact()` writes the next generation.
+- `<backend>.<generation>.*`: optional derived nearest-neighbour index, see `chetan.modules.rag.ann`.
+- `docstore.sqlite`: `documents(doc_id, hash)`, `chunks(row, chunk_id, doc_id, text, metadata, deleted, hash)`,
+  its BM25 full-text index `chunks_fts` and a `meta` key-value table holding the format version,
+  dimension, matrix generation and index version.
+
+Vectors are appended and flushed before the sqlite transaction that references them is committed,
+so a crash leaves at most some unreferenced trailing rows, which are truncated on the next open.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from chetan.modules.rag.ann import ANNBackend, resolve_backend
+from chetan.types.serialization import dumps, loads
+
+FORMAT_VERSION = 1
+MAX_QUERY_TERMS = 64
+
+
+class Chunk(BaseModel):
+    id: str
+    doc_id: str
+    text: str
+    metadata: dict = Field(default_factory=dict)
+    hash: Optional[str] = None  # Hash of the embedded text, used to reuse embeddings
+
+
+class ScoredChunk(BaseModel):
+    chunk: Chunk
+    score: float
+
+
+Filters = Dict[str, Any]
+
+
+def _filter_sql(filters: Optional[Filters]) -> Tuple[str, list]:
+    """SQL condition on `chunks.metadata` matching every key of `filters`, a list value matches any of its items."""
+    clauses, params = [], []
+    for key, value in (filters or {}).items():
+        path = '$."' + key.replace('"', '\\"') + '"'
+        if isinstance(value, (list, tuple, set)):
+            values = list(value)
+            clauses.append(
+                f"json_extract(chunks.metadata, ?) IN ({','.join('?' * len(values))})"
+            )
+            params += [path, *values]
+        else:
+            clauses.append("json_extract(chunks.metadata, ?) = ?")
+            params += [path, value]
+    return " AND ".join(f"({c})" for c in clauses) or "1", params
+
+
+def content_hash(text: str, metadata: Optional[dict] = None) -> str:
+    """Stable hash of a document's or chunk's content and metadata."""
+    h = hashlib.sha256(text.encode())
+    if metadata:
+        h.update(json.dumps(metadata, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+class VectorStore:
+    """A cosine-similarity vector store persisted in `path`, with per-document upserts and deletes.
+
+    Search is exact by default; pass `backend="ivf"` or `"hnsw"` (or a configured `ANNBackend`)
+    for approximate search over large indexes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dim: Optional[int] = None,
+        backend: Union[str, ANNBackend] = "flat",
+    ):
+        self.path = path
+        self.backend = resolve_backend(backend)
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.RLock()
+
+        self._db = sqlite3.connect(
+            os.path.join(path, "docstore.sqlite"), check_same_thread=False
+        )
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS documents (doc_id TEXT PRIMARY KEY, hash TEXT);
+            CREATE TABLE IF NOT EXISTS chunks (
+                row INTEGER PRIMARY KEY,
+                chunk_id TEXT,
+                doc_id TEXT,
+                text TEXT,
+                metadata TEXT,
+                deleted INTEGER DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS chunks_doc_id ON chunks (doc_id);
+            CREATE TABLE IF NOT EXISTS sync_seen (doc_id TEXT PRIMARY KEY);
+            """
+        )
+        columns = {name for _, name, *_ in self._db.execute("PRAGMA table_info(chunks)")}
+        if "hash" not in columns:
+            self._db.execute("ALTER TABLE chunks ADD COLUMN hash TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS chunks_hash ON chunks (hash)")
+        # BM25 keyword index over the chunk texts, kept in sync in the same transactions
+        if not self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'chunks_fts'"
+        ).fetchone():
+            self._db.execute(
+                "CREATE VIRTUAL TABLE chunks_fts USING fts5(text, content='chunks', content_rowid='row')"
+            )
+            self._db.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('rebuild')")
+            self._db.commit()
+
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        if int(meta.get("format", FORMAT_VERSION)) != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported vector store format {meta['format']} at {path}"
+            )
+        self.dim: Optional[int] = int(meta["dim"]) if "dim" in meta else dim
+        self.version: int = int(meta.get("version", 0))
+        self.generation: int = int(meta.get("generation", 0))
+
+        self._load()
+
+    @property
+    def _matrix_path(self) -> str:
+        return os.path.join(self.path, f"embeddings.{self.generation}.f32")
+
+    # region Loading
+
+    def _load(self):
+        rows = self._db.execute(
+            "SELECT COALESCE(MAX(row) + 1, 0) FROM chunks"
+        ).fetchone()[0]
+        self._rows = rows
+
+        if self.dim is not None and os.path.exists(self._matrix_path):
+            # Drop vectors written by a transaction that never committed
+            expected = rows * self.dim * 4
+            if os.path.getsize(self._matrix_path) > expected:
+                with open(self._matrix_path, "r+b") as f:
+                    f.truncate(expected)
+
+        # Remove matrices and indexes of other generations left behind by an interrupted `compact()`
+        for name in os.listdir(self.path):
+            match = re.match(r"^\w+\.(\d+)\.", name)
+            if match and int(match.group(1)) != self.generation:
+                os.remove(os.path.join(self.path, name))
+
+        self._alive = np.zeros(rows, dtype=bool)
+        alive = [r for (r,) in self._db.execute("SELECT row FROM chunks WHERE deleted = 0")]
+        self._alive[alive] = True
+        self._map()
+        self.backend.open(self.path, self.generation, self._matrix)
+
+    def _map(self):
+        if self.dim is None or self._rows == 0:
+            self._matrix = np.zeros((0, self.dim or 0), dtype=np.float32)
+        else:
+            self._matrix = np.memmap(
+                self._matrix_path, dtype=np.float32, mode="r", shape=(self._rows, self.dim)
+            )
+
+    # endregion
+
+    def __len__(self) -> int:
+        return int(self._alive.sum())
+
+    @property
+    def garbage_ratio(self) -> float:
+        """Fraction of rows in the matrix that are tombstoned."""
+        return 0.0 if self._rows == 0 else 1 - len(self) / self._rows
+
+    def document_hashes(self, doc_ids: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """Content hashes of all indexed documents, or of `doc_ids` only."""
+        with self._lock:
+            if doc_ids is None:
+                return dict(self._db.execute("SELECT doc_id, hash FROM documents"))
+            doc_ids = list(doc_ids)
+            hashes = {}
+            for start in range(0, len(doc_ids), 500):
+                batch = doc_ids[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                hashes.update(
+                    self._db.execute(
+                        f"SELECT doc_id, hash FROM documents WHERE doc_id IN ({placeholders})",
+                        batch,
+                    )
+                )
+            return hashes
+
+    # region Sync checkpoints
+
+    def begin_sync(self) -> int:
+        """Start a sync, or resume an interrupted one.
+
+        Returns:
+            int: Number of source documents the interrupted sync had already processed, 0 for a new sync.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM meta WHERE key = 'sync_position'"
+            ).fetchone()
+            if row is not None:
+                return int(row[0])
+            self._db.execute("DELETE FROM sync_seen")
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('sync_position', '0')"
+            )
+            self._db.commit()
+            return 0
+
+    def checkpoint_sync(self, doc_ids: Iterable[str], position: int):
+        """Record that the first `position` source documents, including `doc_ids`, are indexed."""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO sync_seen (doc_id) VALUES (?)",
+                [(doc_id,) for doc_id in doc_ids],
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('sync_position', ?)",
+                (str(position),),
+            )
+            self._db.commit()
+
+    def finish_sync(self, delete_missing: bool = True) -> List[str]:
+        """End the current sync, deleting documents it did not see if `delete_missing`.
+
+        Returns:
+            List[str]: The deleted document ids.
+        """
+        with self._lock:
+            missing = []
+            if delete_missing:
+                missing = [
+                    doc_id
+                    for (doc_id,) in self._db.execute(
+                        "SELECT doc_id FROM documents WHERE doc_id NOT IN (SELECT doc_id FROM sync_seen)"
+                    )
+                ]
+                self._tombstone(missing)
+                if missing:
+                    self._bump_version()
+            self._db.execute("DELETE FROM sync_seen")
+            self._db.execute("DELETE FROM meta WHERE key = 'sync_position'")
+            self._db.commit()
+            return missing
+
+    # endregion
+
+    def _bump_version(self):
+        self.version += 1
+        self._db.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [
+                ("format", str(FORMAT_VERSION)),
+                ("dim", str(self.dim)),
+                ("generation", str(self.generation)),
+                ("version", str(self.version)),
+            ],
+        )
+
+    def _tombstone(self, doc_ids: Sequence[str]):
+        for doc_id in doc_ids:
+            rows = [
+                r
+                for (r,) in self._db.execute(
+                    "SELECT row FROM chunks WHERE doc_id = ? AND deleted = 0", (doc_id,)
+                )
+            ]
+            self._alive[rows] = False
+            self._db.execute("UPDATE chunks SET deleted = 1 WHERE doc_id = ?", (doc_id,))
+            self._db.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+
+    def upsert(
+        self,
+        documents: Iterable[Tuple[str, str, List[Chunk], np.ndarray]],
+    ):
+        """Insert or replace documents, given as `(doc_id, hash, chunks, vectors)` tuples.
+
+        Previous chunks of each document are tombstoned. All documents are committed together.
+        """
+        documents = list(documents)
+        if not documents:
+            return
+
+        for doc_id, _, chunks, v in documents:
+            if len(chunks) != len(v):
+                raise ValueError(
+                    f"Document `{doc_id}` has {len(chunks)} chunks but {len(v)} vectors"
+                )
+
+        with self._lock:
+            vectors = [np.asarray(v, dtype=np.float32) for _, _, _, v in documents]
+            vectors = [v for v in vectors if len(v)]
+            if vectors:
+                if self.dim is None:
+                    self.dim = vectors[0].shape[1]
+                with open(self._matrix_path, "ab") as f:
+                    for v in vectors:
+                        f.write(np.ascontiguousarray(v).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            try:
+                self._tombstone([doc_id for doc_id, _, _, _ in documents])
+                row = start = self._rows
+                for doc_id, doc_hash, chunks, _ in documents:
+                    self._db.executemany(
+                        "INSERT INTO chunks (row, chunk_id, doc_id, text, metadata, hash) VALUES (?, ?, ?, ?, ?, ?)",
+                        [
+                            (row + i, c.id, doc_id, c.text, dumps(c.metadata), c.hash)
+                            for i, c in enumerate(chunks)
+                        ],
+                    )
+                    row += len(chunks)
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO documents (doc_id, hash) VALUES (?, ?)",
+                        (doc_id, doc_hash),
+                    )
+                self._db.execute(
+                    "INSERT INTO chunks_fts (rowid, text) SELECT row, text FROM chunks WHERE row >= ?",
+                    (start,),
+                )
+                self._bump_version()
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                self._load()
+                raise
+
+            self._alive = np.concatenate(
+                [self._alive, np.ones(row - self._rows, dtype=bool)]
+            )
+            self._rows = row
+            self._map()
+            self.backend.add(self._matrix, start)
+
+    def delete(self, doc_ids: Iterable[str]):
+        """Delete documents and their chunks."""
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return
+        with self._lock:
+            self._tombstone(doc_ids)
+            self._bump_version()
+            self._db.commit()
+
+    def vectors_by_hash(self, hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Look up stored embeddings by chunk hash, so unchanged chunks are not embedded again."""
+        hashes = list(hashes)
+        found: Dict[str, int] = {}
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                found.update(
+                    self._db.execute(
+                        f"SELECT hash, row FROM chunks WHERE hash IN ({placeholders})", batch
+                    )
+                )
+            matrix = self._matrix
+        return {h: np.array(matrix[row]) for h, row in found.items() if row < len(matrix)}
+
+    def chunks(self, rows: Sequence[int]) -> List[Chunk]:
+        """Fetch chunks by matrix row, in the given order."""
+        if not len(rows):
+            return []
+        with self._lock:
+            placeholders = ",".join("?" * len(rows))
+            found = {
+                row: Chunk(
+                    id=chunk_id,
+                    doc_id=doc_id,
+                    text=text,
+                    metadata=loads(metadata),
+                    hash=chunk_hash,
+                )
+                for row, chunk_id, doc_id, text, metadata, chunk_hash in self._db.execute(
+                    f"SELECT row, chunk_id, doc_id, text, metadata, hash FROM chunks WHERE row IN ({placeholders})",
+                    [int(r) for r in rows],
+                )
+            }
+        return [found[int(r)] for r in rows]
+
+    def matching(self, filters: Filters) -> np.ndarray:
+        """Boolean mask of the alive rows whose metadata matches `filters`."""
+        condition, params = _filter_sql(filters)
+        with self._lock:
+            mask = np.zeros(self._rows, dtype=bool)
+            rows = [
+                r
+                for (r,) in self._db.execute(
+                    f"SELECT row FROM chunks WHERE deleted = 0 AND {condition}", params
+                )
+            ]
+        mask[rows] = True
+        return mask
+
+    def search(
+        self, vector: np.ndarray, k: int = 2, filters: Optional[Filters] = None
+    ) -> List[ScoredChunk]:
+        """Return the top-`k` chunks by cosine similarity to a normalized query vector.
+
+        Only chunks whose metadata matches `filters` are considered, if given.
+        """
+        with self._lock:
+            if len(self._matrix) == 0:
+                return []
+            alive = self._alive if not filters else self._alive & self.matching(filters)
+            rows, scores = self.backend.search(
+                self._matrix, alive, np.asarray(vector, dtype=np.float32), k
+            )
+        return [
+            ScoredChunk(chunk=chunk, score=float(score))
+            for score, chunk in zip(scores, self.chunks(rows))
+        ]
+
+    def keyword_search(
+        self, text: str, k: int = 2, filters: Optional[Filters] = None
+    ) -> List[ScoredChunk]:
+        """Return the top-`k` chunks by BM25 relevance to the words of `text`, matching any of them."""
+        terms = list(dict.fromkeys(re.findall(r"\w+", text.lower())))[:MAX_QUERY_TERMS]
+        if not terms or k <= 0:
+            return []
+        condition, params = _filter_sql(filters)
+        with self._lock:
+            # `bm25()` is lower for better matches
+            found = self._db.execute(
+                f"""
+                SELECT chunks_fts.rowid, -bm25(chunks_fts) AS score FROM chunks_fts
+                JOIN chunks ON chunks.row = chunks_fts.rowid
+                WHERE chunks_fts MATCH ? AND chunks.deleted = 0 AND {condition}
+                ORDER BY score DESC LIMIT ?
+                """,
+                (" OR ".join(f'"{term}"' for term in terms), *params, k),
+            ).fetchall()
+        return [
+            ScoredChunk(chunk=chunk, score=score)
+            for (_, score), chunk in zip(found, self.chunks([row for row, _ in found]))
+        ]
+
+    def compact(self):
+        """Write a new matrix generation without tombstoned rows and renumber the remaining chunks."""
+        with self._lock:
+            keep = np.flatnonzero(self._alive)
+            old_path = self._matrix_path
+            self.generation += 1
+            with open(self._matrix_path, "wb") as f:
+                for start in range(0, len(keep), 65536):
+                    rows = keep[start : start + 65536]
+                    f.write(np.ascontiguousarray(self._matrix[rows]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            try:
+                self._db.execute("DELETE FROM chunks WHERE deleted = 1")
+                # Ascending order never moves a row onto one that is still occupied
+                self._db.executemany(
+                    "UPDATE chunks SET row = ? WHERE row = ?",
+                    [(new, int(old)) for new, old in enumerate(keep) if new != old],
+                )
+                self._db.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('rebuild')")
+                self._bump_version()
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                os.remove(self._matrix_path)
+                self.generation -= 1
+                raise
+
+            # The new generation is committed, the old matrix is garbage from here on
+            self._matrix = np.zeros((0, self.dim or 0), dtype=np.float32)
+            os.remove(old_path)
+            self._load()
+
+    def close(self):
+        with self._lock:
+            self._matrix = np.zeros((0, self.dim or 0), dtype=np.float32)
+            self.backend.close()
+            self._db.close()
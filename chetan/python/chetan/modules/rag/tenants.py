@@ -0,0 +1,315 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import copy
+import os
+import re
+import shutil
+import threading
+from typing import Callable, Dict, Iterator, List, Literal, Optional, Union
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.ingestion import IngestionPipeline
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import Document
+
+from chetan.agent.module import AgentLoopModule, prologue
+from chetan.embed import Embedder
+from chetan.modules.rag.ann import ANNBackend, resolve_backend
+from chetan.modules.rag.cache import RetrievalCache
+from chetan.modules.rag.hybrid import HybridRetriever, RerankerLike, resolve_reranker
+from chetan.modules.rag.ingest import (
+    DocumentSource,
+    IngestionEngine,
+    IngestionReport,
+    default_document_id,
+)
+from chetan.modules.rag.llama_index import (
+    inject_results,
+    load_embedder,
+    prologue_query,
+    to_items,
+)
+from chetan.modules.rag.store import Filters, ScoredChunk, VectorStore
+from chetan.types.context.agent.iteration import AgentContext
+
+TENANT_ID = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]*$")
+
+
+def default_tenant(context: AgentContext) -> Optional[str]:
+    return context.tenant_id
+
+
+class TenantIndex:
+    """A tenant's open vector store and retriever, with a count of the operations using it."""
+
+    def __init__(self, tenant_id: str, store: VectorStore, retriever: HybridRetriever):
+        self.tenant_id = tenant_id
+        self.store = store
+        self.retriever = retriever
+        self.leases = 0
+
+
+class MultiTenantRAGModule(AgentLoopModule):
+    """Retrieval over per-tenant indexes that share one embedding model and ingestion worker pool.
+
+    Every tenant has its own `VectorStore` directory under `index_root`, so one tenant's chunks can
+    never be retrieved for another. Indexes are opened on first use and the least recently used ones
+    are closed once more than `max_loaded_tenants` are open; each open tenant holds at most
+    `cache_size` cached queries on top of its memory-mapped matrix. A tenant's index is opened and
+    closed outside the module-wide lock, so a slow one (e.g. an HNSW rebuild) only holds up the
+    sessions of that tenant.
+
+    The prologue retrieves for the tenant returned by `tenant_fn` (`AgentContext.tenant_id` by default)
+    and retrieves nothing for sessions without one. Unlike `LlamaIndexRAGModule`, no retrieval tool is
+    exposed, since tool calls carry no tenant.
+    """
+
+    def __init__(
+        self,
+        index_root: str = "./temp/rag_tenants",
+        embed_model_fn: Callable[[], Union[BaseEmbedding, Embedder]] = None,
+        pipeline: IngestionPipeline = IngestionPipeline(
+            transformations=[SentenceSplitter(chunk_size=128, chunk_overlap=64)]
+        ),
+        mode: Literal["userquery", "iteration"] = "userquery",
+        tenant_fn: Callable[[AgentContext], Optional[str]] = default_tenant,
+        filters_fn: Callable[[AgentContext], Optional[Filters]] = None,
+        max_loaded_tenants: int = 32,
+        similarity_top_k: int = 2,
+        retrieval_mode: Literal["hybrid", "dense", "keyword"] = "hybrid",
+        candidate_k: int = 20,
+        reranker: Optional[RerankerLike] = None,
+        rerank_budget_ms: Optional[float] = 200,
+        cache_size: int = 256,
+        ann_backend: Union[str, ANNBackend] = "flat",
+        doc_id_fn: Callable[[Document], str] = default_document_id,
+        embed_batch_size: int = 128,
+        ingest_workers: Optional[int] = None,
+        ingest_executor: Literal["thread", "process"] = "thread",
+        ingest_batch_documents: Optional[int] = 256,
+        keep_results: int = 3,
+    ):
+        """
+        Args:
+            index_root (str, optional): Directory holding one index directory per tenant.
+                Defaults to "./temp/rag_tenants".
+            embed_model_fn (Callable[[], Union[BaseEmbedding, Embedder]], optional): Loads the embedding model
+                shared by all tenants. Defaults to llama-index's `Settings.embed_model`.
+            tenant_fn (Callable[[AgentContext], Optional[str]], optional): Tenant of a session.
+                Defaults to `AgentContext.tenant_id`.
+            filters_fn (Callable[[AgentContext], Optional[Filters]], optional): Metadata filters applied to
+                the prologue retrieval of a session. Defaults to None.
+            max_loaded_tenants (int, optional): Number of tenant indexes kept open. Defaults to 32.
+            cache_size (int, optional): Cached queries per open tenant, 0 disables the cache. Defaults to 256.
+            ann_backend (Union[str, ANNBackend], optional): Search backend of the tenant indexes, see
+                `LlamaIndexRAGModule`. Every tenant gets its own instance; a configured `ANNBackend` is copied
+                before it is opened. Defaults to "flat".
+
+        The other arguments are the same as `LlamaIndexRAGModule`'s.
+        """
+        self.index_root = index_root
+        self.embed_model_fn = embed_model_fn
+        self.pipeline = pipeline
+        self.mode = mode
+        self.tenant_fn = tenant_fn
+        self.filters_fn = filters_fn
+        self.max_loaded_tenants = max_loaded_tenants
+        self.similarity_top_k = similarity_top_k
+        self.retrieval_mode = retrieval_mode
+        self.candidate_k = candidate_k
+        self.reranker = resolve_reranker(reranker)
+        self.rerank_budget_ms = rerank_budget_ms
+        self.cache_size = cache_size
+        self.ann_backend = ann_backend
+        self.doc_id_fn = doc_id_fn
+        self.embed_batch_size = embed_batch_size
+        self.ingest_workers = ingest_workers
+        self.ingest_executor = ingest_executor
+        self.ingest_batch_documents = ingest_batch_documents
+        self.keep_results = keep_results
+
+        self._tenants: "OrderedDict[str, TenantIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._tenant_locks: Dict[str, threading.Lock] = {}  # Held while a tenant's index opens or closes
+
+        super().__init__()
+
+    def setup(self):
+        self.log("Loading embedding model...")
+        self.embedder = load_embedder(self.embed_model_fn)
+        self.log("Finished loading embedding model.")
+        if self.reranker is not None:
+            self.reranker.load()
+
+        self.close()
+        self.ingestion = IngestionEngine(
+            self.pipeline,
+            self.embedder,
+            batch_size=self.embed_batch_size,
+            workers=self.ingest_workers,
+            executor=self.ingest_executor,
+            show_progress=False,
+        )
+        os.makedirs(self.index_root, exist_ok=True)
+
+    # region Tenant indexes
+
+    def _path(self, tenant_id: str) -> str:
+        if not TENANT_ID.match(tenant_id):
+            raise ValueError(f"Invalid tenant id `{tenant_id}`")
+        return os.path.join(self.index_root, tenant_id)
+
+    def tenants(self) -> List[str]:
+        """Ids of all tenants with an index on disk."""
+        return sorted(
+            name
+            for name in os.listdir(self.index_root)
+            if os.path.isdir(os.path.join(self.index_root, name))
+        )
+
+    def loaded(self) -> List[str]:
+        """Ids of the open tenant indexes, least recently used first."""
+        with self._lock:
+            return list(self._tenants)
+
+    def _backend(self) -> ANNBackend:
+        if isinstance(self.ann_backend, ANNBackend):
+            return copy.deepcopy(self.ann_backend)
+        return resolve_backend(self.ann_backend)
+
+    def _open(self, tenant_id: str) -> TenantIndex:
+        store = VectorStore(self._path(tenant_id), backend=self._backend())
+        self.log(f"Opened index of tenant `{tenant_id}`", level="debug")
+        return TenantIndex(
+            tenant_id,
+            store,
+            HybridRetriever(
+                store,
+                self.embedder,
+                k=self.similarity_top_k,
+                mode=self.retrieval_mode,
+                candidates=self.candidate_k,
+                reranker=self.reranker,
+                rerank_budget_ms=self.rerank_budget_ms,
+                cache=RetrievalCache(self.cache_size) if self.cache_size else None,
+            ),
+        )
+
+    def _lease(self, tenant_id: str) -> Optional[TenantIndex]:
+        # Called with `_lock` held
+        index = self._tenants.get(tenant_id)
+        if index is not None:
+            self._tenants.move_to_end(tenant_id)
+            index.leases += 1
+        return index
+
+    @contextmanager
+    def tenant(self, tenant_id: str) -> Iterator[TenantIndex]:
+        """Use a tenant's index, opening it if needed. It is not evicted while in use."""
+        self._path(tenant_id)  # Validates the id
+        evicted = []
+        with self._lock:
+            index = self._lease(tenant_id)
+            tenant_lock = self._tenant_locks.setdefault(tenant_id, threading.Lock())
+        if index is None:
+            # Only sessions of this tenant wait for its index to open, or to finish closing
+            with tenant_lock:
+                with self._lock:
+                    index = self._lease(tenant_id)
+                if index is None:
+                    index = self._open(tenant_id)
+                    with self._lock:
+                        self._tenants[tenant_id] = index
+                        index.leases += 1
+                        evicted = self._evict()
+            self._close(evicted)
+        try:
+            yield index
+        finally:
+            with self._lock:
+                index.leases -= 1
+                evicted = self._evict()
+            self._close(evicted)
+
+    def _evict(self) -> List[TenantIndex]:
+        """Drop least recently used indexes that are not in use, down to `max_loaded_tenants`.
+
+        Called with `_lock` held; the dropped indexes are returned to be closed after releasing it.
+        """
+        evicted = []
+        excess = len(self._tenants) - self.max_loaded_tenants
+        for tenant_id, index in list(self._tenants.items()):
+            if excess <= 0:
+                break
+            if index.leases == 0:
+                del self._tenants[tenant_id]
+                evicted.append(index)
+                excess -= 1
+        return evicted
+
+    def _close(self, indexes: List[TenantIndex]):
+        for index in indexes:
+            with self._tenant_locks[index.tenant_id]:
+                index.store.close()
+            self.log(f"Closed index of tenant `{index.tenant_id}`", level="debug")
+
+    def close(self):
+        """Close all open tenant indexes."""
+        with self._lock:
+            indexes = list(self._tenants.values())
+            self._tenants.clear()
+        self._close(indexes)
+
+    # endregion
+
+    def ingest(
+        self, tenant_id: str, documents: DocumentSource, delete_missing: bool = True
+    ) -> IngestionReport:
+        """Bring a tenant's index up to date with `documents`, see `IngestionEngine.sync`."""
+        with self.tenant(tenant_id) as index:
+            return self.ingestion.sync(
+                index.store,
+                documents,
+                doc_id_fn=self.doc_id_fn,
+                batch_documents=self.ingest_batch_documents,
+                delete_missing=delete_missing,
+                log=lambda message, level="info": self.log(f"[{tenant_id}] {message}", level),
+            )
+
+    def delete_tenant(self, tenant_id: str):
+        """Delete a tenant's index from disk."""
+        path = self._path(tenant_id)
+        with self._lock:
+            index = self._tenants.get(tenant_id)
+            if index is not None:
+                if index.leases:
+                    raise RuntimeError(f"Index of tenant `{tenant_id}` is in use")
+                del self._tenants[tenant_id]
+            tenant_lock = self._tenant_locks.setdefault(tenant_id, threading.Lock())
+        with tenant_lock:
+            if index is not None:
+                index.store.close()
+            shutil.rmtree(path, ignore_errors=True)
+
+    def retrieve_for(
+        self, tenant_id: str, query: str, filters: Optional[Filters] = None
+    ) -> List[ScoredChunk]:
+        """Retrieve chunks of one tenant's index only."""
+        if not os.path.isdir(self._path(tenant_id)):
+            return []
+        with self.tenant(tenant_id) as index:
+            return index.retriever.retrieve(query, filters=filters)
+
+    @prologue
+    def retrieve_prologue(self, context: AgentContext, *args, **kwargs):
+        """Retrieve relevant documents from the index of the session's tenant."""
+        tenant_id = self.tenant_fn(context)
+        if tenant_id is None:
+            return
+        retrieve_query = prologue_query(context, self.mode)
+        if retrieve_query is None:
+            return
+
+        filters = self.filters_fn(context) if self.filters_fn else None
+        results = self.retrieve_for(tenant_id, str(retrieve_query), filters=filters)
+        inject_results(context, to_items(results), self.keep_results)
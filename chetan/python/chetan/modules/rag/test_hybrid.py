@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+
+from chetan.embed import CallableEmbedder, Embedder
+from chetan.modules.rag.cache import RetrievalCache
+from chetan.modules.rag.hybrid import HybridRetriever, reciprocal_rank_fusion
+from chetan.modules.rag.store import Chunk, ScoredChunk, VectorStore
+
+
+def scored(*ids):
+    return [ScoredChunk(chunk=Chunk(id=i, doc_id="d", text=i), score=0.0) for i in ids]
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([scored("a", "b", "c"), scored("c", "b")])
+    assert [r.chunk.id for r in fused] == ["c", "b", "a"]
+
+
+class CountingEmbedder(Embedder):
+    """Embeds every query to the same direction, so any two queries are semantically identical."""
+
+    def __init__(self):
+        self.embedded = 0
+
+    def embed(self, texts):
+        self.embedded += len(texts)
+        return np.ones((len(texts), 8), dtype=np.float32) / np.sqrt(8)
+
+
+def make_store(tmp_path, texts):
+    # An embedder that knows nothing, so only keyword search can find identifiers
+    embedder = CallableEmbedder(lambda texts: np.ones((len(texts), 8)))
+    store = VectorStore(str(tmp_path))
+    store.upsert(
+        (f"d{i}", "h", [Chunk(id=str(i), doc_id=f"d{i}", text=text)], embedder.embed([text]))
+        for i, text in enumerate(texts)
+    )
+    return store, embedder
+
+
+def test_hybrid_finds_exact_identifiers(tmp_path):
+    texts = ["Widget SKU-1234 ships in blue.", "Error E42 means the disk is full.", "Returns take 30 days."]
+    store, embedder = make_store(tmp_path, texts)
+    retriever = HybridRetriever(store, embedder, k=1)
+
+    assert retriever.retrieve("what does E42 mean?")[0].chunk.doc_id == "d1"
+    assert retriever.retrieve("sku-1234")[0].chunk.doc_id == "d0"
+
+    store.upsert([("d1", "h2", [Chunk(id="x", doc_id="d1", text="Error E43.")], embedder.embed(["x"]))])
+    assert store.keyword_search("E42") == []
+    store.compact()
+    assert store.keyword_search("E43")[0].chunk.id == "x"
+
+
+def test_rerank_respects_budget(tmp_path):
+    store, embedder = make_store(tmp_path, [f"error code {i}" for i in range(40)])
+
+    def slow(query, texts):
+        time.sleep(0.02)
+        return [float(t.endswith(" 39")) for t in texts]
+
+    retriever = HybridRetriever(
+        store, embedder, k=3, candidates=40, reranker=slow, rerank_budget_ms=30, rerank_batch_size=4
+    )
+    start = time.perf_counter()
+    results = retriever.retrieve("error code")
+    assert time.perf_counter() - start < 0.2
+    assert len(results) == 3
+
+    retriever.rerank_budget_ms = None
+    assert retriever.retrieve("error code")[0].chunk.text == "error code 39"
+
+
+def test_cache_is_invalidated_by_store_changes(tmp_path):
+    store, _ = make_store(tmp_path, ["alpha beta", "gamma delta"])
+    embedder = CountingEmbedder()
+    retriever = HybridRetriever(store, embedder, k=1, cache=RetrievalCache(semantic_threshold=0.9))
+
+    first = retriever.retrieve("Alpha  beta")
+    assert retriever.retrieve(" alpha beta") == first
+    assert embedder.embedded == 1 and retriever.cache.hits == 1
+
+    assert retriever.retrieve("alpha beta please") == first
+    assert embedder.embedded == 2 and retriever.cache.hits == 2
+
+    store.delete(["d0"])
+    assert retriever.retrieve("alpha beta")[0].chunk.doc_id == "d1"
+    assert embedder.embedded == 2 and retriever.cache.misses == 2
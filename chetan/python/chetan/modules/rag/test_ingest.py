@@ -0,0 +1,43 @@
+import numpy as np
+from llama_index.core.ingestion import IngestionPipeline
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import Document
+
+from chetan.embed import HashingEmbedder
+from chetan.modules.rag.ingest import IngestionEngine
+from chetan.modules.rag.store import VectorStore
+
+
+def test_engine_embeds_each_distinct_chunk_once():
+    embedder = HashingEmbedder()
+    pipeline = IngestionPipeline(transformations=[SentenceSplitter(chunk_size=32, chunk_overlap=0)])
+    engine = IngestionEngine(pipeline, embedder, batch_size=4, workers=2, show_progress=False)
+
+    text = " ".join(f"Sentence number {i} about widgets." for i in range(40))
+    documents = {"a": Document(text=text), "b": Document(text=text), "c": Document(text="Short note.")}
+    results, report = engine.run(documents)
+    engine.shutdown()
+
+    chunks, vectors = results["a"]
+    assert report.chunks == 2 * len(chunks) + 1
+    assert report.embedded == report.unique_chunks == len(chunks) + 1
+    assert np.allclose(vectors, embedder.embed([c.text for c in chunks]), atol=1e-6)
+
+    reused, report = engine.run(documents, lookup=lambda hashes: {h: vectors[0] for h in hashes})
+    assert report.embedded == 0 and report.reused == report.unique_chunks
+
+
+
+def test_sync_without_splitter_or_progress(tmp_path, capsys):
+    engine = IngestionEngine(IngestionPipeline(transformations=[]), HashingEmbedder(), show_progress=False)
+    documents = [
+        Document(text="Whole document.", metadata={"file_name": "a"}),
+        Document(text="Another one.", metadata={"file_name": "b"}),
+    ]
+    store = VectorStore(str(tmp_path))
+    report = engine.sync(store, documents)
+    engine.shutdown()
+
+    # Documents passed through unchanged are their own single chunk
+    assert report.chunks == 2 and len(store) == 2
+    assert "Syncing" not in capsys.readouterr().err
@@ -0,0 +1,239 @@
+import numpy as np
+import pytest
+from llama_index.core.schema import Document
+
+from chetan.embed import HashingEmbedder
+from chetan.modules.rag.llama_index import LlamaIndexRAGModule
+from chetan.modules.rag.ann import HNSWBackend, IVFBackend
+from chetan.modules.rag.store import Chunk, VectorStore
+from chetan.types.context.agent import EntityMessage
+from chetan.types.context.agent.iteration import AgentContext
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__()
+        self.embedded = 0
+
+    def embed(self, texts):
+        self.embedded += len(texts)
+        return super().embed(texts)
+
+
+def make_documents(**texts):
+    return [Document(text=text, metadata={"file_name": name}) for name, text in texts.items()]
+
+
+def test_store_upsert_delete_and_reopen(tmp_path):
+    embedder = HashingEmbedder()
+    store = VectorStore(str(tmp_path))
+
+    def doc(doc_id, *texts):
+        chunks = [Chunk(id=f"{doc_id}-{i}", doc_id=doc_id, text=t) for i, t in enumerate(texts)]
+        return doc_id, doc_id + "-hash", chunks, embedder.embed(list(texts))
+
+    store.upsert([doc("a", "apple pie", "banana split"), doc("b", "car engine")])
+    store.upsert([doc("a", "cherry tart")])
+    store.delete(["b"])
+    assert len(store) == 1
+    version = store.version
+    store.close()
+
+    store = VectorStore(str(tmp_path))
+    assert store.version == version
+    assert store.document_hashes() == {"a": "a-hash"}
+    store.compact()
+    assert store.garbage_ratio == 0
+    [result] = store.search(embedder.embed_query("cherry tart"), k=5)
+    assert result.chunk.text == "cherry tart"
+    assert np.isclose(result.score, 1.0)
+
+
+def test_module_only_reembeds_changed_documents(tmp_path):
+    documents = make_documents(a="The SKU-1234 widget is blue.", b="Error E42 means the disk is full.")
+    embedder = CountingEmbedder()
+    module = LlamaIndexRAGModule(
+        data_fn=lambda: documents,
+        embed_model_fn=lambda: embedder,
+        index_path=str(tmp_path),
+    )
+    module.setup()
+    first = embedder.embedded
+    assert first > 0
+
+    module.setup()
+    assert embedder.embedded == first
+
+    documents[1] = Document(text="Error E42 means the network is down.", metadata={"file_name": "b"})
+    documents.append(Document(text="Returns are accepted for 30 days.", metadata={"file_name": "c"}))
+    module.setup()
+    assert 0 < embedder.embedded - first < first + 2
+
+    del documents[0]
+    module.setup()
+    assert set(module.store.document_hashes()) == {"b", "c"}
+    assert "network" in module.retrieve("E42 network").items[0].content
+
+
+def test_ivf_backend_is_persisted_and_close_to_flat(tmp_path):
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 32))
+    vectors = centers[rng.integers(20, size=3000)] + 0.3 * rng.normal(size=(3000, 32))
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+    chunks = [Chunk(id=str(i), doc_id=f"d{i // 100}", text=str(i)) for i in range(3000)]
+
+    store = VectorStore(str(tmp_path), backend=IVFBackend(nlist=20, nprobe=4, min_rows=1000))
+    store.upsert(
+        (f"d{d}", "h", chunks[d * 100 : (d + 1) * 100], vectors[d * 100 : (d + 1) * 100])
+        for d in range(30)
+    )
+    store.delete(["d0"])
+    assert store.backend.centroids is not None
+    store.close()
+
+    store = VectorStore(str(tmp_path), backend=IVFBackend(nlist=20, nprobe=4, min_rows=1000))
+    exact = VectorStore(str(tmp_path / "exact"))
+    exact.upsert((f"d{d}", "h", chunks[d * 100 : (d + 1) * 100], vectors[d * 100 : (d + 1) * 100]) for d in range(1, 30))
+
+    recall = []
+    for query in vectors[::97]:
+        got = {r.chunk.id for r in store.search(query, k=10)}
+        expected = {r.chunk.id for r in exact.search(query, k=10)}
+        assert not any(int(i) < 100 for i in got)
+        recall.append(len(got & expected) / 10)
+    assert np.mean(recall) > 0.9
+
+
+def selective_batches():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(2000, 16))
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+    chunks = [
+        Chunk(id=str(i), doc_id=f"d{i // 100}", text=str(i), metadata={"rare": i % 50 == 0})
+        for i in range(2000)
+    ]
+    batches = [(f"d{d}", "h", chunks[d * 100 : (d + 1) * 100], vectors[d * 100 : (d + 1) * 100]) for d in range(20)]
+    return batches, vectors
+
+
+def rare_results(store, queries):
+    # 2% of the rows match, approximate backends still find `k` of them
+    return [[r.chunk.id for r in store.search(query, k=5, filters={"rare": True})] for query in queries]
+
+
+def test_selective_filters(tmp_path):
+    batches, vectors = selective_batches()
+    flat = VectorStore(str(tmp_path / "flat"))
+    ivf = VectorStore(str(tmp_path / "ivf"), backend=IVFBackend(nlist=20, nprobe=2, min_rows=1000))
+    for store in (flat, ivf):
+        for batch in batches:
+            store.upsert([batch])
+
+    for exact, approximate in zip(rare_results(flat, vectors[:20]), rare_results(ivf, vectors[:20])):
+        assert len(exact) == len(approximate) == 5
+        assert all(int(i) % 50 == 0 for i in approximate)
+
+
+def test_hnsw_persistence_and_selective_filters(tmp_path):
+    pytest.importorskip("hnswlib")
+    batches, vectors = selective_batches()
+    flat = VectorStore(str(tmp_path / "flat"))
+    hnsw = VectorStore(str(tmp_path / "hnsw"), backend="hnsw")
+    for store in (flat, hnsw):
+        for batch in batches:
+            store.upsert([batch])
+    # The rows of the last upsert are not saved yet, `close` does it
+    assert 0 < hnsw.backend._saved < 2000
+    hnsw.close()
+    hnsw = VectorStore(str(tmp_path / "hnsw"), backend=HNSWBackend())
+    assert hnsw.backend._saved == 2000
+
+    assert rare_results(hnsw, vectors[:20]) == rare_results(flat, vectors[:20])
+
+
+def test_prologue_references_injected_chunks_and_evicts_superseded(tmp_path):
+    documents = make_documents(a="Error E42 means the disk is full.", b="Returns are accepted for 30 days.")
+    module = LlamaIndexRAGModule(
+        data_fn=lambda: documents,
+        embed_model_fn=HashingEmbedder,
+        index_path=str(tmp_path),
+        similarity_top_k=1,
+        keep_results=1,
+    )
+    module.setup()
+    context = AgentContext()
+
+    def ask(text):
+        context.new()
+        context.add_item(EntityMessage(role="user", content=text), "prologue")
+        module.retrieve_prologue(context)
+        return context.latest().prologue[-1]
+
+    first = ask("what is error E42?")
+    assert len(first.items) == 1 and not first.references
+    second = ask("error E42 again")
+    assert not second.items and second.references == [first.items[0].id]
+    assert first in context[0].prologue
+
+    third = ask("how many days for returns?")
+    assert "30 days" in third.items[0].content
+    assert first not in context[0].prologue
+
+
+def test_sync_streams_async_sources_and_resumes(tmp_path):
+    documents = make_documents(**{f"doc{i}": f"Document number {i} mentions code X{i}." for i in range(10)})
+    embedder = CountingEmbedder()
+    module = LlamaIndexRAGModule(
+        data_fn=lambda: iter(documents),
+        embed_model_fn=lambda: embedder,
+        index_path=str(tmp_path),
+        ingest_batch_documents=3,
+    )
+
+    def crashing():
+        for i, document in enumerate(documents):
+            if i == 7:
+                raise RuntimeError("crash")
+            yield document
+
+    module.data_fn = crashing
+    with pytest.raises(RuntimeError):
+        module.setup()
+    assert len(module.store.document_hashes()) == 6
+    embedded = embedder.embedded
+
+    async def stream():
+        for document in documents[:-1]:
+            yield document
+
+    module.data_fn = stream
+    module.setup()
+    assert embedder.embedded - embedded == 3
+    assert set(module.store.document_hashes()) == {f"doc{i}" for i in range(9)}
+    assert module.store.begin_sync() == 0
+
+
+def test_sync_keeps_documents_sharing_a_file(tmp_path):
+    # Readers like MarkdownReader emit one document per section, all with the same file name
+    sections = [
+        Document(text=f"Section {i} covers topic T{i}.", metadata={"file_name": "notes.md"})
+        for i in range(3)
+    ]
+    module = LlamaIndexRAGModule(
+        data_fn=lambda: sections,
+        embed_model_fn=CountingEmbedder,
+        index_path=str(tmp_path),
+        ingest_batch_documents=2,
+    )
+    module.setup()
+    assert set(module.store.document_hashes()) == {"notes.md", "notes.md[2]", "notes.md[3]"}
+    assert len(module.store) == 3
+
+
+def test_module_arguments(tmp_path):
+    with pytest.warns(DeprecationWarning):
+        module = LlamaIndexRAGModule(data_fn=list, cache_path=str(tmp_path / "rag_cache.pkl"))
+    assert module.index_path == str(tmp_path / "rag_cache")
+
+    with pytest.raises(TypeError):
+        LlamaIndexRAGModule(data_fn=list, index_dir=str(tmp_path))
@@ -0,0 +1,89 @@
+import threading
+
+from llama_index.core.schema import Document
+
+from chetan.embed import HashingEmbedder
+from chetan.modules.rag.ann import IVFBackend
+from chetan.modules.rag.tenants import MultiTenantRAGModule
+from chetan.types.context.agent import EntityMessage
+from chetan.types.context.agent.iteration import AgentContext
+
+
+class CountingEmbedder(HashingEmbedder):
+    loads = 0
+
+    def __init__(self):
+        super().__init__()
+        CountingEmbedder.loads += 1
+
+
+def test_tenants_are_isolated_and_evicted(tmp_path):
+    module = MultiTenantRAGModule(
+        index_root=str(tmp_path), embed_model_fn=CountingEmbedder, max_loaded_tenants=2
+    )
+    module.setup()
+    for tenant in ["acme", "globex", "initech"]:
+        module.ingest(
+            tenant,
+            [
+                Document(text=f"The {tenant} refund code is R-{tenant}.", metadata={"file_name": "faq", "lang": "en"}),
+                Document(text=f"Le code {tenant} est F-{tenant}.", metadata={"file_name": "faq-fr", "lang": "fr"}),
+            ],
+        )
+    assert CountingEmbedder.loads == 1
+    assert module.tenants() == ["acme", "globex", "initech"]
+    assert module.loaded() == ["globex", "initech"]
+
+    for tenant in module.tenants():
+        results = module.retrieve_for(tenant, "refund code R-acme")
+        assert results and all(tenant in r.chunk.text for r in results)
+        french = module.retrieve_for(tenant, "code", filters={"lang": "fr"})
+        assert [r.chunk.metadata["lang"] for r in french] == ["fr"]
+    assert module.retrieve_for("unknown", "refund code") == []
+    assert len(module.loaded()) == 2
+
+    context = AgentContext()
+    context.new()
+    context.add_item(EntityMessage(role="user", content="refund code?"), "prologue")
+    module.retrieve_prologue(context)
+    assert len(context.latest().prologue) == 1
+
+    context.tenant_id = "globex"
+    module.retrieve_prologue(context)
+    assert "R-globex" in context.latest().prologue[-1].items[0].content
+
+    module.delete_tenant("acme")
+    assert module.tenants() == ["globex", "initech"]
+
+
+def test_tenant_backends_and_slow_opens(tmp_path):
+    template = IVFBackend(nprobe=2)
+    module = MultiTenantRAGModule(
+        index_root=str(tmp_path), embed_model_fn=HashingEmbedder, ann_backend=template
+    )
+    module.setup()
+    with module.tenant("acme") as acme, module.tenant("globex") as globex:
+        backends = [acme.store.backend, globex.store.backend]
+    assert backends[0] is not backends[1] and template not in backends
+    assert backends[0].nprobe == 2
+
+    # Opening a tenant's index does not hold up the others
+    opening, release = threading.Event(), threading.Event()
+    open_index = module._open
+
+    def slow_open(tenant_id):
+        if tenant_id == "slow":
+            opening.set()
+            release.wait(5)
+        return open_index(tenant_id)
+
+    module._open = slow_open
+    thread = threading.Thread(target=lambda: module.retrieve_for("slow", "anything"))
+    (tmp_path / "slow").mkdir()
+    thread.start()
+    assert opening.wait(5)
+    with module.tenant("initech"):
+        assert "slow" not in module.loaded()
+    release.set()
+    thread.join(5)
+    assert "slow" in module.loaded()
@@ -0,0 +1,45 @@
+from pydantic import create_model
+
+from chetan.tools import ToolFunction, ToolInformation
+from chetan.modules.recommender.tool import ToolRecommenderModule
+
+
+def make_tool(name: str, description: str, matchers=None) -> ToolFunction:
+    return ToolFunction(
+        name=name,
+        description=description,
+        input=create_model(f"{name}Input"),
+        output=str,
+        info=ToolInformation(
+            id=name, description=description, tags=[], matchers=matchers or []
+        )
+        if matchers
+        else None,
+    )
+
+
+def test_recommend_top_k():
+    tools = [make_tool(f"misc.tool_{i}", f"Unrelated utility number {i}") for i in range(20)]
+    tools.append(make_tool("weather.forecast", "Get the weather forecast for a city"))
+    tools.append(make_tool("orders.lookup", "Look up an order", matchers=["SKU-"]))
+
+    module = ToolRecommenderModule(k=3, always=["misc.tool_7"])
+    selected = [fn.name for fn in module.recommend(tools, "what is the weather forecast in Pune for SKU-1234")]
+
+    assert "weather.forecast" in selected
+    assert "orders.lookup" in selected
+    assert "misc.tool_7" in selected
+    assert len(selected) <= 5
+
+
+def test_tools_are_embedded_once():
+    tools = [make_tool(f"misc.tool_{i}", f"Utility {i}") for i in range(5)]
+    module = ToolRecommenderModule(k=2)
+    module.recommend(tools, "utility")
+    assert len(module.index) == 5
+
+    calls = []
+    embed = module.embedder.embed
+    module.embedder.embed = lambda texts: calls.append(texts) or embed(texts)
+    module.recommend(tools, "utility")
+    assert calls == [["utility"]]
@@ -1,12 +1,115 @@
-from chetan.agent.module import AgentLoopModule
+import hashlib
+from typing import List, Optional
+
+
+from chetan.agent.module import AgentLoopModule, prologue
+from chetan.embed import EmbedderLike, VectorIndex, resolve_embedder
+from chetan.tools import ToolFunction
+from chetan.types.context.agent import EntityMessage
+from chetan.types.context.agent.iteration import AgentContext
+
+
+def tool_document(fn: ToolFunction) -> str:
+    """Build the text that is embedded for a tool function."""
+    parts = [fn.name.replace(".", " ").replace("_", " "), fn.description or ""]
+    if fn.info is not None:
+        parts += [fn.info.description, " ".join(fn.info.tags)]
+    parts += list(fn.input_schema().get("properties", {}).keys())
+    return "\n".join(part for part in parts if part)
 
 
 class ToolRecommenderModule(AgentLoopModule):
-    def __init__(self, embedder: str):
+    """Narrows `iteration_context["best_tools"]` down to the tools most relevant to the conversation.
+
+    Tool descriptions are embedded once into an in-memory `VectorIndex`, then each prologue ranks
+    them against the latest user message and the last complete iteration and keeps the top-k.
+    Tools whose `ToolInformation.matchers` appear in the query are always kept.
+    """
+
+    def __init__(
+        self,
+        embedder: EmbedderLike = "hashing",
+        k: int = 10,
+        always: Optional[List[str]] = None,
+    ):
+        """
+        Args:
+            embedder (EmbedderLike, optional): A local embedding model, a `texts -> vectors` function
+                or a model name. Defaults to "hashing".
+            k (int, optional): Number of tools to recommend. Defaults to 10.
+            always (List[str], optional): Tool name prefixes that are always recommended. Defaults to None.
+        """
+        self.embedder = resolve_embedder(embedder)
+        self.k = k
+        self.always = always or []
+        self.index = VectorIndex()
+        self._tool_hashes = {}
+
         super().__init__()
-    
+
     def setup(self):
-        # TODO: Setup tool recommender embedding model
-        pass
-    
-    # TODO: Add epilogue memory snapshots
+        self.log("Loading tool embedding model...")
+        self.embedder.load()
+
+    def index_tools(self, tools: List[ToolFunction]):
+        """Embed tools that are new, or whose description changed since they were indexed."""
+        stale, documents = [], []
+        for fn in tools:
+            document = tool_document(fn)
+            digest = hashlib.sha1(document.encode()).hexdigest()
+            if self._tool_hashes.get(fn.name) != digest:
+                self._tool_hashes[fn.name] = digest
+                stale.append(fn.name)
+                documents.append(document)
+
+        if stale:
+            self.index.upsert(stale, self.embedder.embed(documents))
+            self.log(f"Indexed {len(stale)} tools", level="debug")
+
+    def recommend(self, tools: List[ToolFunction], text: str) -> List[ToolFunction]:
+        """Rank `tools` against `text` and return the top-k, plus pinned and matched tools."""
+        if len(tools) <= self.k:
+            return tools
+
+        self.index_tools(tools)
+        by_name = {fn.name: fn for fn in tools}
+
+        lowered = text.lower()
+        pinned = [
+            fn.name
+            for fn in tools
+            if any(fn.name.startswith(prefix) for prefix in self.always)
+            or (
+                fn.info is not None
+                and any(m.lower() in lowered for m in fn.info.matchers)
+            )
+        ]
+
+        ranked = self.index.search(
+            self.embedder.embed_query(text), k=self.k, keys=list(by_name)
+        )
+        selected = dict.fromkeys(pinned + [name for name, _ in ranked])
+        return [by_name[name] for name in selected]
+
+    @prologue
+    def recommend_tools(
+        self, context: AgentContext, iteration_context: dict = None, *args, **kwargs
+    ):
+        """Replace `best_tools` with the tools relevant to the latest user message and iteration."""
+        if iteration_context is None or not iteration_context.get("best_tools"):
+            return
+
+        message = context.latest().last(EntityMessage, "prologue", role="user")
+        user_message = str(message.content) if message is not None else ""
+        last_iteration = context.latest_complete_iteration()
+        text = "\n".join(
+            part
+            for part in [user_message, last_iteration and last_iteration.flatten()]
+            if part
+        )
+        if not text:
+            return
+
+        iteration_context["best_tools"] = self.recommend(
+            iteration_context["best_tools"], text
+        )
@@ -0,0 +1,49 @@
+import subprocess
+import sys
+
+# Milliseconds, the best of a few runs in a fresh interpreter
+BUDGETS = {"chetan": 100, "chetan.agent": 400}
+# Milliseconds spent in chetan's own modules, e.g. building pydantic models
+OWN_BUDGET = 60
+HEAVY = ["rich", "tqdm", "docstring_parser", "llama_index", "openai", "groq", "numpy"]
+
+
+def import_in_subprocess(statement: str):
+    """Cumulative microseconds of each imported module, and the heavy modules that were imported."""
+    check = f"import sys; print(','.join(m for m in {HEAVY + ['pydantic']!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"{statement}; {check}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            own, cumulative, name = line[len("import time:"):].split("|")
+            times[name.strip()] = (int(own), int(cumulative))
+    return times, set(filter(None, result.stdout.strip().split(",")))
+
+
+def test_import_is_lazy():
+    _, imported = import_in_subprocess("import chetan")
+    assert not imported  # Not even pydantic
+
+    _, imported = import_in_subprocess("from chetan import SessionManager")
+    assert imported == {"pydantic"}
+
+    _, imported = import_in_subprocess("from chetan.modules.rag import VectorStore")
+    assert "llama_index" not in imported
+
+
+def test_import_time_budget():
+    for target, budget in BUDGETS.items():
+        runs = [import_in_subprocess(f"import {target}")[0] for _ in range(3)]
+        best = min(times[target][1] for times in runs) / 1e3
+        assert best < budget, f"`import {target}` took {best:.1f} ms, budget {budget} ms"
+        if target == "chetan.agent":
+            own = min(
+                sum(t for name, (t, _) in times.items() if name.split(".")[0] == "chetan")
+                for times in runs
+            ) / 1e3
+            assert own < OWN_BUDGET, f"chetan modules took {own:.1f} ms, budget {OWN_BUDGET} ms"
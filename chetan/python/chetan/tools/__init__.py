@@ -1,38 +1,73 @@
 from typing import Callable, Dict, List, Optional, Type, Any
-from functools import wraps
+from functools import lru_cache, wraps
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
 import inspect
 from typing import get_type_hints
-from docstring_parser import parse
+
+from chetan.tools.execution import ExecutionPolicy, ResourceLimits
 
 
 class AgentToolCall(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     id: str
     tool_name: str
     tool_args: dict
 
 
 class ToolInformation(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     id: str
     description: str
     tags: List[str]
 
     matchers: List[str] = []
 
+    @field_validator("tags", mode="before")
+    @classmethod
+    def _split_tags(cls, value):
+        # Allow comma-separated tags, e.g. "search, web"
+        if isinstance(value, str):
+            return [tag.strip() for tag in value.split(",") if tag.strip()]
+        return value
 
-def toolfn(fn: Callable) -> Callable:
+
+def toolfn(
+    fn: Callable = None,
+    *,
+    execution: ExecutionPolicy = "auto",
+    timeout: Optional[float] = None,
+    limits: Optional[ResourceLimits] = None,
+) -> Callable:
     """
     Decorator to register a function as a tool function.
+
+    Can be used bare (`@toolfn`) or with options (`@toolfn(execution="process", timeout=10)`).
+
+    Args:
+        execution (ExecutionPolicy, optional): Where the function runs when called through a `Toolbox`.
+            `auto` runs coroutine functions inline and sync functions in a thread pool. Defaults to "auto".
+        timeout (float, optional): Per-call timeout in seconds. Defaults to None.
+        limits (ResourceLimits, optional): Resource limits for the `subprocess` policy. Defaults to None.
     """
 
-    @wraps(fn)
-    def wrapper(*args, **kwargs):
-        return fn(*args, **kwargs)
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            return fn(*args, **kwargs)
+
+        wrapper.is_tool = True
+        wrapper.execution = execution
+        wrapper.timeout = timeout
+        wrapper.limits = limits
+        wrapper.__doc__ = fn.__doc__ or ""
+        return wrapper
 
-    wrapper.is_tool = True
-    wrapper.__doc__ = fn.__doc__ or ""
-    return wrapper
+    if fn is not None:
+        return decorator(fn)
+    return decorator
 
 
 def get_tool_type_hints(func: Callable, attr: str, self_type: type) -> dict:
@@ -57,6 +92,7 @@ def build_input_model(
     from docstring_parser import parse as parse_docstring
 
     fields: dict = {}
+    accepts_kwargs = False
     # Parse docstring for parameter descriptions
     docstring = func.__doc__ or ""
     param_docs = {}
@@ -70,10 +106,10 @@ def build_input_model(
         if param_name == "self":
             continue
         # Skip *args and **kwargs
-        if (
-            param.kind == inspect.Parameter.VAR_POSITIONAL
-            or param.kind == inspect.Parameter.VAR_KEYWORD
-        ):
+        if param.kind == inspect.Parameter.VAR_KEYWORD:
+            accepts_kwargs = True
+            continue
+        if param.kind == inspect.Parameter.VAR_POSITIONAL:
             continue
         # Get type hint or default to Any, fallback to __annotations__
         if param_name in type_hints:
@@ -92,7 +128,13 @@ def build_input_model(
             fields[param_name] = (field_type, Field(..., description=field_desc))
     from pydantic import create_model
 
-    return create_model(f"{attr}Input", **fields)
+    # Forbid unknown arguments so hallucinated parameters are reported back to the LM, unless
+    # the function takes them through `**kwargs`
+    return create_model(
+        f"{attr}Input",
+        __config__=ConfigDict(extra="allow" if accepts_kwargs else "forbid"),
+        **fields,
+    )
 
 
 def get_return_type(type_hints: dict) -> Optional[Type]:
@@ -103,21 +145,97 @@ def get_return_type(type_hints: dict) -> Optional[Type]:
     return return_type
 
 
+@lru_cache(maxsize=None)
+def input_json_schema(model: Type[BaseModel]) -> dict:
+    """Cached `model_json_schema()` of a tool input model. Treat the result as read-only."""
+    return model.model_json_schema()
+
+
+class ToolArgumentsError(ValueError):
+    """Raised when tool call arguments do not match the tool's input model."""
+
+    def __init__(self, name: str, errors: List[dict]):
+        self.name = name
+        self.errors = errors
+        super().__init__(
+            f"Invalid arguments for tool '{name}': "
+            + "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in errors)
+        )
+
+
 class ToolFunction(BaseModel):
     """
     Represents a tool function with its name and arguments.
     """
 
+    model_config = ConfigDict(defer_build=True)
+
     name: str
     description: str
     input: Type[BaseModel]
     output: Optional[Type]
     fn: Callable = Field(default=None, exclude=True)
+    info: Optional[ToolInformation] = Field(default=None, exclude=True)
+
+    execution: ExecutionPolicy = "auto"
+    timeout: Optional[float] = None
+    limits: Optional[ResourceLimits] = None
+
+    def input_schema(self) -> dict:
+        """JSON schema of the input model, built on first use and cached per model."""
+        return input_json_schema(self.input)
+
+    def validate_args(self, args: dict) -> dict:
+        """Validate and coerce raw LM tool call arguments against the input model.
+
+        Uses the input model's core validator, which pydantic compiles once when the model is created.
+
+        Returns:
+            dict: Keyword arguments for the tool function.
+
+        Raises:
+            ToolArgumentsError: If the arguments are invalid.
+        """
+        try:
+            validated = self.input.__pydantic_validator__.validate_python(args)
+        except ValidationError as e:
+            raise ToolArgumentsError(
+                self.name,
+                [
+                    {"loc": list(err["loc"]), "msg": err["msg"], "type": err["type"]}
+                    for err in e.errors(include_url=False)
+                ],
+            )
+        # Only the arguments the call gave, omitted ones keep the function's (or MCP server's) defaults.
+        # Iterating the model also yields the extra arguments of models that allow them.
+        given = validated.model_fields_set
+        return {name: value for name, value in validated if name in given}
+
+
+def _class_attributes(cls: type) -> Dict[str, Any]:
+    """Collect the attributes of a class and its bases, without touching any instance."""
+    attrs = {}
+    for klass in reversed(cls.__mro__):
+        attrs.update(vars(klass))
+    return attrs
 
 
 class Tool:
     tool_info: ToolInformation = None
 
+    # Per-class introspection cache, see `__init_subclass__` and `_tool_specs`
+    __tool_names__: List[str] = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Only record which methods are tools here. Signatures, type hints and input models
+        # are built on first use and shared by every instance of the class.
+        cls.__tool_names__ = sorted(
+            name
+            for name, attr in _class_attributes(cls).items()
+            if callable(attr) and getattr(attr, "is_tool", False)
+        )
+
     def __init__(self, *args, **kwargs):
         """
         Initialize the tool with any necessary arguments.
@@ -125,22 +243,50 @@ class Tool:
         self.tool_functions: Dict[str, ToolFunction] = {}
         self._register_tool_functions()
 
+    def __getstate__(self):
+        # `tool_functions` holds input models built at runtime, which can't be pickled. It is rebuilt
+        # from the class's specs on unpickling, e.g. for `process` and `subprocess` tool calls.
+        state = self.__dict__.copy()
+        state.pop("tool_functions", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.tool_functions = {}
+        self._register_tool_functions()
+
+    @classmethod
+    def _tool_specs(cls) -> Dict[str, dict]:
+        """Introspect the tool functions of this class once, and cache the result on the class."""
+        if "_tool_specs_cache" in cls.__dict__:
+            return cls._tool_specs_cache
+
+        from docstring_parser import parse
+
+        specs = {}
+        for attr in cls.__tool_names__:
+            func = getattr(cls, attr)
+            docstring = func.__doc__ or ""
+            sig = inspect.signature(func)
+            type_hints = get_tool_type_hints(func, attr, cls)
+            specs[attr] = dict(
+                name=attr,
+                description=parse(docstring).description,
+                input=build_input_model(sig, type_hints, func, attr),
+                output=get_return_type(type_hints),
+                execution=getattr(func, "execution", "auto"),
+                timeout=getattr(func, "timeout", None),
+                limits=getattr(func, "limits", None),
+            )
+        cls._tool_specs_cache = specs
+        return specs
+
     def _register_tool_functions(self):
-        for attr in dir(self):
-            func = getattr(self, attr)
-            if hasattr(func, "is_tool") and callable(func):
-                docstring = func.__doc__ or ""
-                sig = inspect.signature(func)
-                type_hints = get_tool_type_hints(func, attr, type(self))
-                input_model = build_input_model(sig, type_hints, func, attr)
-                return_type = get_return_type(type_hints)
-                self.tool_functions[attr] = ToolFunction(
-                    name=attr,
-                    description=parse(docstring).description,
-                    input=input_model,
-                    output=return_type,
-                    fn=getattr(self, attr),
-                )
+        for attr, spec in self._tool_specs().items():
+            # The spec was validated when it was built, skip re-validation per instance
+            self.tool_functions[attr] = ToolFunction.model_construct(
+                **spec, fn=getattr(self, attr), info=self.tool_info
+            )
 
     async def __call__(self, mcp_toolfunction_name: str, **kwargs):
         return await self.tool_functions[mcp_toolfunction_name].fn(self, **kwargs)
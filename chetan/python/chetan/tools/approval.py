@@ -0,0 +1,283 @@
+import asyncio
+import fnmatch
+import sys
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, List, Literal, Optional, Tuple, Union
+
+from loguru import logger
+
+from chetan.tools import AgentToolCall
+from chetan.types.serialization import dumps
+
+# `always`/`never` are remembered for the tool for the rest of the session,
+# `approve`/`deny` only for identical calls.
+Decision = Literal["approve", "deny", "always", "never"]
+
+
+def _as_decision(value: Union[bool, str, None]) -> Optional[Decision]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "approve" if value else "deny"
+    return value
+
+
+def format_call(call: AgentToolCall) -> str:
+    args = ", ".join(f"{k}={repr(v)}" for k, v in call.tool_args.items())
+    return f"{call.id} {call.tool_name}({args})"
+
+
+class ApprovalPolicy(ABC):
+    """A rule that approves or denies a tool call, or returns None to defer to the next policy."""
+
+    @abstractmethod
+    def decide(self, call: AgentToolCall) -> Optional[Decision]: ...
+
+
+class AllowList(ApprovalPolicy):
+    """Auto-approve tool paths matching any of the glob patterns, e.g. `rag.*`."""
+
+    def __init__(self, *patterns: str):
+        self.patterns = patterns
+
+    def decide(self, call):
+        if any(fnmatch.fnmatchcase(call.tool_name, p) for p in self.patterns):
+            return "approve"
+        return None
+
+
+class DenyList(ApprovalPolicy):
+    """Deny tool paths matching any of the glob patterns."""
+
+    def __init__(self, *patterns: str):
+        self.patterns = patterns
+
+    def decide(self, call):
+        if any(fnmatch.fnmatchcase(call.tool_name, p) for p in self.patterns):
+            return "deny"
+        return None
+
+
+class RulePolicy(ApprovalPolicy):
+    """Decide with a function of the call, e.g. `lambda call: call.tool_args.get("path", "").startswith("/tmp")`."""
+
+    def __init__(self, rule: Callable[[AgentToolCall], Union[bool, Decision, None]]):
+        self.rule = rule
+
+    def decide(self, call):
+        return _as_decision(self.rule(call))
+
+
+class HumanApprover(ABC):
+    """Asks a human to approve a tool call, without blocking the event loop."""
+
+    @abstractmethod
+    async def ask(self, call: AgentToolCall, session_id: str) -> Decision: ...
+
+
+class CLIApprover(HumanApprover):
+    """Prompts on the terminal, one prompt at a time per event loop.
+
+    Answers are read from stdin by a single daemon thread, which is never interrupted. A prompt that
+    times out only stops waiting: a line typed while no prompt is waiting is dropped, it does not
+    answer a later one.
+    """
+
+    def __init__(self):
+        # Made in each running loop, an asyncio lock is bound to the first loop that waits on it
+        self._locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._waiting: Deque[asyncio.Future] = deque()
+        self._guard = threading.Lock()
+        self._reader: Optional[threading.Thread] = None
+
+    def _lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        with self._guard:
+            if loop not in self._locks:
+                self._locks[loop] = asyncio.Lock()
+            return self._locks[loop]
+
+    def _read(self):
+        while True:
+            line = sys.stdin.readline()
+            with self._guard:
+                while self._waiting and self._waiting[0].done():
+                    self._waiting.popleft()
+                future = self._waiting.popleft() if self._waiting else None
+            if future is not None:
+                # End of input answers `None`, i.e. deny
+                try:
+                    future.get_loop().call_soon_threadsafe(
+                        lambda f=future, a=line or None: f.done() or f.set_result(a)
+                    )
+                except RuntimeError:
+                    pass  # Its loop is closed
+            if not line:
+                with self._guard:
+                    self._reader = None
+                return
+
+    async def ask(self, call, session_id):
+        async with self._lock():
+            future = asyncio.get_running_loop().create_future()
+            with self._guard:
+                self._waiting.append(future)
+                if self._reader is None:
+                    self._reader = threading.Thread(target=self._read, name="chetan-approval", daemon=True)
+                    self._reader.start()
+            print(
+                f"Tool call: {format_call(call)}. Do you want to execute it? (Y/n/always/never): ",
+                end="",
+                flush=True,
+            )
+            try:
+                answer = await future
+            finally:
+                future.cancel()
+        if answer is None:
+            return "deny"
+        answer = answer.strip().lower()
+        if answer in ("", "y", "yes"):
+            return "approve"
+        if answer in ("always", "never"):
+            return answer
+        return "deny"
+
+
+class CallbackApprover(HumanApprover):
+    """Delegates to an async callback, e.g. one that sends the request over a websocket."""
+
+    def __init__(
+        self, callback: Callable[[AgentToolCall, str], Awaitable[Union[bool, Decision]]]
+    ):
+        self.callback = callback
+
+    async def ask(self, call, session_id):
+        return _as_decision(await self.callback(call, session_id))
+
+
+class ApprovalRequest:
+    """A pending approval, resolved by whoever consumes the `QueueApprover`."""
+
+    def __init__(self, call: AgentToolCall, session_id: str):
+        self.call = call
+        self.session_id = session_id
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def resolve(self, decision: Union[bool, Decision]):
+        """Resolve the request. Safe to call from any thread."""
+
+        def set_result():
+            if not self.future.done():
+                self.future.set_result(_as_decision(decision))
+
+        self.future.get_loop().call_soon_threadsafe(set_result)
+
+
+class QueueApprover(HumanApprover):
+    """Publishes `ApprovalRequest`s on an asyncio queue for an external UI or server to resolve.
+
+    Example:
+        async for request in approver:
+            request.resolve(await ask_user_somehow(request.call))
+    """
+
+    def __init__(self):
+        self._queue: "Optional[asyncio.Queue[ApprovalRequest]]" = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def queue(self) -> "asyncio.Queue[ApprovalRequest]":
+        """The queue of the running event loop, made on first use in it."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._queue, self._loop = asyncio.Queue(), loop
+        return self._queue
+
+    async def ask(self, call, session_id):
+        request = ApprovalRequest(call, session_id)
+        await self.queue.put(request)
+        return await request.future
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ApprovalRequest:
+        return await self.queue.get()
+
+
+class ApprovalManager:
+    """Decides whether tool calls may run.
+
+    Policies are checked in order, the first non-None decision wins. Calls no policy decides on go to
+    the human approver, or get `default` if there is none or it does not answer within `timeout`.
+    The approver's decisions are cached per session, for the `max_cached` most recently used calls
+    and tools, and only consulted for calls no policy decides on.
+    """
+
+    def __init__(
+        self,
+        policies: Optional[List[ApprovalPolicy]] = None,
+        human: Optional[HumanApprover] = None,
+        default: Decision = "deny",
+        timeout: Optional[float] = None,
+        max_cached: int = 4096,
+    ):
+        self.policies = policies or []
+        self.human = human
+        self.default = default
+        self.timeout = timeout
+        self.max_cached = max_cached
+        self._cache: "OrderedDict[Tuple, Decision]" = OrderedDict()
+
+    def _keys(self, call: AgentToolCall, session_id: str) -> Tuple[Tuple, Tuple]:
+        args = dumps(call.tool_args, sort_keys=True)
+        return (session_id, call.tool_name), (session_id, call.tool_name, args)
+
+    def cached(self, call: AgentToolCall, session_id: str) -> Optional[Decision]:
+        for key in self._keys(call, session_id):
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def remember(self, call: AgentToolCall, session_id: str, decision: Decision):
+        tool_key, call_key = self._keys(call, session_id)
+        self._cache[tool_key if decision in ("always", "never") else call_key] = decision
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+
+    def forget(self, session_id: str):
+        """Drop all cached decisions for a session."""
+        self._cache = OrderedDict((k, v) for k, v in self._cache.items() if k[0] != session_id)
+
+    async def approve(self, call: AgentToolCall, session_id: str = "default") -> bool:
+        """Return whether `call` may run."""
+        # Policies first, so a cached "always" can't override a policy added later in the session
+        decision = None
+        for policy in self.policies:
+            decision = policy.decide(call)
+            if decision is not None:
+                break
+
+        if decision is None:
+            decision = self.cached(call, session_id)
+
+        if decision is None and self.human is not None:
+            try:
+                decision = await asyncio.wait_for(
+                    self.human.ask(call, session_id), self.timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Approval for `{call.tool_name}` timed out")
+                decision = None
+            if decision is not None:
+                self.remember(call, session_id, decision)
+
+        decision = decision or self.default
+        return decision in ("approve", "always")
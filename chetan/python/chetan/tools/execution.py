@@ -0,0 +1,230 @@
+import asyncio
+import inspect
+import pickle
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Literal, Optional
+
+from loguru import logger
+from pydantic import BaseModel, ConfigDict
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+ExecutionPolicy = Literal["auto", "inline", "thread", "process", "subprocess"]
+
+
+class ResourceLimits(BaseModel):
+    """Resource limits applied to `subprocess` sandboxed tool calls (POSIX only)."""
+
+    model_config = ConfigDict(defer_build=True)
+
+    cpu_seconds: Optional[int] = None
+    memory_bytes: Optional[int] = None
+    open_files: Optional[int] = None
+
+
+class ToolTimeoutError(TimeoutError):
+    """Raised when a tool call exceeds its timeout."""
+
+    def __init__(self, name: str, timeout: float):
+        super().__init__(f"Tool '{name}' timed out after {timeout}s")
+        self.name = name
+        self.timeout = timeout
+
+
+class ToolSandboxError(RuntimeError):
+    """Raised when a sandboxed tool process dies without returning a result."""
+
+
+# Executed by `python -c` in the sandbox process. Reads a pickled (fn, args, kwargs)
+# triple from stdin and writes a pickled (ok, value) pair to the original stdout. While `fn`
+# runs, stdout is pointed at stderr, so whatever the tool prints cannot corrupt the result.
+_SANDBOX_BOOTSTRAP = """
+import os, pickle, sys
+fn, args, kwargs = pickle.load(sys.stdin.buffer)
+result = os.fdopen(os.dup(1), "wb")
+sys.stdout.flush()
+os.dup2(2, 1)
+try:
+    out = (True, fn(*args, **kwargs))
+except BaseException as e:
+    out = (False, e)
+sys.stdout.flush()
+try:
+    data = pickle.dumps(out)
+except BaseException as e:
+    data = pickle.dumps((False, RuntimeError(f"Could not pickle the tool's result: {e!r}")))
+result.write(data)
+result.close()
+"""
+
+
+def _apply_limits(limits: ResourceLimits):
+    def preexec():
+        import resource
+
+        if limits.cpu_seconds is not None:
+            resource.setrlimit(
+                resource.RLIMIT_CPU, (limits.cpu_seconds, limits.cpu_seconds)
+            )
+        if limits.memory_bytes is not None:
+            resource.setrlimit(
+                resource.RLIMIT_AS, (limits.memory_bytes, limits.memory_bytes)
+            )
+        if limits.open_files is not None:
+            resource.setrlimit(
+                resource.RLIMIT_NOFILE, (limits.open_files, limits.open_files)
+            )
+
+    return preexec
+
+
+class ToolExecutor:
+    """Runs tool functions according to their execution policy, off the event loop where needed.
+
+    - `inline`: call directly on the event loop thread.
+    - `thread`: run in a shared thread pool.
+    - `process`: run in a shared process pool. The function and its arguments must be picklable by reference (importable).
+    - `subprocess`: run in a fresh interpreter with optional `ResourceLimits`, killed on timeout or cancellation.
+    - `auto`: coroutine functions run `inline`, sync functions run in a `thread`.
+    """
+
+    def __init__(self, max_threads: Optional[int] = None, max_processes: Optional[int] = None):
+        self.max_threads = max_threads
+        self.max_processes = max_processes
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional["ProcessPoolExecutor"] = None
+
+    @property
+    def thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.max_threads, thread_name_prefix="chetan-tool"
+            )
+        return self._thread_pool
+
+    @property
+    def process_pool(self) -> "ProcessPoolExecutor":
+        if self._process_pool is None:
+            # Imported on first use, it pulls in `multiprocessing`
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Forking a process with running threads (the event loop's, the thread pool's) can
+            # deadlock the child, so workers come from a fork server where there is one
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else None)
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.max_processes, mp_context=context
+            )
+        return self._process_pool
+
+    async def run(
+        self,
+        fn: Callable,
+        *args,
+        name: str = None,
+        execution: ExecutionPolicy = "auto",
+        timeout: Optional[float] = None,
+        limits: Optional[ResourceLimits] = None,
+        **kwargs,
+    ) -> Any:
+        """Run `fn(*args, **kwargs)` with the given policy and timeout.
+
+        Raises:
+            ToolTimeoutError: If the call does not finish within `timeout` seconds.
+        """
+        name = name or getattr(fn, "__name__", repr(fn))
+
+        if execution == "auto":
+            execution = "inline" if _is_async(fn) else "thread"
+
+        if execution == "inline":
+            call = self._run_inline(fn, *args, **kwargs)
+        elif execution == "thread":
+            call = self._run_in_pool(self.thread_pool, fn, *args, **kwargs)
+        elif execution == "process":
+            call = self._run_in_pool(self.process_pool, fn, *args, **kwargs)
+        elif execution == "subprocess":
+            call = self._run_in_subprocess(fn, *args, limits=limits, **kwargs)
+        else:
+            raise ValueError(f"Unknown execution policy: {execution}")
+
+        if timeout is None:
+            return await call
+
+        try:
+            return await asyncio.wait_for(call, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Tool '{name}' timed out after {timeout}s ({execution})")
+            raise ToolTimeoutError(name, timeout)
+
+    async def _run_inline(self, fn: Callable, *args, **kwargs):
+        result = fn(*args, **kwargs)
+        if inspect.isawaitable(result):
+            return await result
+        return result
+
+    async def _run_in_pool(self, pool, fn: Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        future = pool.submit(fn, *args, **kwargs)
+        try:
+            result = await asyncio.wrap_future(future, loop=loop)
+        except asyncio.CancelledError:
+            # Drops queued calls; calls already running cannot be interrupted
+            future.cancel()
+            raise
+        if inspect.isawaitable(result):
+            return await result
+        return result
+
+    async def _run_in_subprocess(
+        self, fn: Callable, *args, limits: Optional[ResourceLimits] = None, **kwargs
+    ):
+        payload = pickle.dumps((fn, args, kwargs))
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-c",
+            _SANDBOX_BOOTSTRAP,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            preexec_fn=_apply_limits(limits) if limits else None,
+        )
+        try:
+            stdout, stderr = await proc.communicate(payload)
+        except asyncio.CancelledError:
+            proc.kill()
+            await proc.wait()
+            raise
+
+        if not stdout:
+            raise ToolSandboxError(
+                f"Sandboxed tool exited with code {proc.returncode}: "
+                f"{stderr.decode(errors='replace').strip()}"
+            )
+
+        try:
+            ok, value = pickle.loads(stdout)
+        except Exception as e:
+            raise ToolSandboxError(f"Could not read the sandboxed tool's result: {e!r}") from e
+        if not ok:
+            raise value
+        return value
+
+    def shutdown(self, wait: bool = True):
+        """Shut down the worker pools."""
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=wait)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait)
+            self._process_pool = None
+
+
+def _is_async(fn: Callable) -> bool:
+    fn = getattr(fn, "__func__", fn)
+    return inspect.iscoroutinefunction(fn) or inspect.iscoroutinefunction(
+        getattr(fn, "__wrapped__", None)
+    )
@@ -4,10 +4,10 @@ from mcp.client.sse import sse_client
 import humps
 from loguru import logger
 
-from typing import Dict, Union
+from typing import Dict, Optional, Union
 
 from chetan.tools import Tool, ToolFunction
-from pydantic import create_model
+from pydantic import ConfigDict, create_model
 
 
 def create_model_from_json_schema(schema_name, schema_json):
@@ -19,11 +19,16 @@ def create_model_from_json_schema(schema_name, schema_json):
         # Add other mappings as needed
     }
     fields = {}
+    required = set(schema_json.get("required", []))
     for field_name, field_schema in schema_json.get("properties", {}).items():
         field_type = field_schema.get("type")
         if field_type and field_type in type_mapping:
-            fields[field_name] = (type_mapping[field_type], ...)
-    return create_model(schema_name, **fields)
+            if field_name in required:
+                fields[field_name] = (type_mapping[field_type], ...)
+            else:
+                fields[field_name] = (Optional[type_mapping[field_type]], None)
+    # Unmapped properties are passed through to the server as-is
+    return create_model(schema_name, __config__=ConfigDict(extra="allow"), **fields)
 
 
 def check_remote(path: Union[str, StdioServerParameters]):
@@ -0,0 +1,124 @@
+import asyncio
+import queue
+import sys
+import time
+
+from .._mgr import SessionManager
+from ..tools import AgentToolCall
+from ..tools.approval import (
+    AllowList,
+    ApprovalManager,
+    CLIApprover,
+    DenyList,
+    QueueApprover,
+    RulePolicy,
+)
+
+
+def make_call(tool_name: str, **tool_args) -> AgentToolCall:
+    return AgentToolCall(id=f"call_{tool_name}", tool_name=tool_name, tool_args=tool_args)
+
+
+def test_policies():
+    manager = ApprovalManager(
+        policies=[
+            DenyList("fs.delete"),
+            AllowList("rag.*", "fs.*"),
+            RulePolicy(lambda call: call.tool_args.get("n", 0) < 10),
+        ]
+    )
+
+    async def run():
+        assert await manager.approve(make_call("rag.retrieve", query="x"))
+        assert not await manager.approve(make_call("fs.delete", path="/"))
+        assert await manager.approve(make_call("math.add", n=1))
+        assert not await manager.approve(make_call("math.add", n=100))
+
+    asyncio.run(run())
+
+
+def test_queue_approver_caches_per_session():
+    approver = QueueApprover()
+    manager = ApprovalManager(human=approver)
+
+    async def run():
+        pending = asyncio.ensure_future(
+            manager.approve(make_call("shell.run", cmd="ls"), "session-a")
+        )
+        request = await approver.__anext__()
+        assert request.call.tool_name == "shell.run"
+        request.resolve("always")
+        assert await pending
+
+        # Cached for the tool in this session, other sessions still ask
+        assert await manager.approve(make_call("shell.run", cmd="pwd"), "session-a")
+        pending = asyncio.ensure_future(
+            manager.approve(make_call("shell.run", cmd="ls"), "session-b")
+        )
+        (await approver.__anext__()).resolve(False)
+        assert not await pending
+
+    asyncio.run(run())
+
+
+def test_policies_override_cached_decisions():
+    approver = QueueApprover()
+    manager = ApprovalManager(human=approver)
+
+    async def run():
+        pending = asyncio.ensure_future(manager.approve(make_call("fs.delete", path="/tmp/a")))
+        (await approver.__anext__()).resolve("always")
+        assert await pending
+
+        manager.policies.append(DenyList("fs.delete"))
+        assert not await manager.approve(make_call("fs.delete", path="/tmp/b"))
+
+    asyncio.run(run())
+
+
+def test_timeout_uses_default():
+    manager = ApprovalManager(human=QueueApprover(), default="deny", timeout=0.01)
+    assert not asyncio.run(manager.approve(make_call("shell.run")))
+
+
+def test_approvers_work_across_event_loops(monkeypatch):
+    lines = queue.Queue()
+    monkeypatch.setattr(sys, "stdin", type("Stdin", (), {"readline": staticmethod(lines.get)})())
+    manager = ApprovalManager(human=CLIApprover(), timeout=0.05)
+
+    # Nobody answers in time, and the late answer does not approve the next call
+    assert not asyncio.run(manager.approve(make_call("shell.run", cmd="ls")))
+    lines.put("y\n")
+    time.sleep(0.05)
+
+    async def answer(call, text):
+        pending = asyncio.ensure_future(manager.approve(call))
+        await asyncio.sleep(0.01)
+        lines.put(text)
+        return await pending
+
+    manager.timeout = None
+    assert not asyncio.run(answer(make_call("shell.run", cmd="rm"), "n\n"))
+    assert asyncio.run(answer(make_call("shell.run", cmd="pwd"), "y\n"))
+    lines.put("")  # End of input stops the reader
+
+    approver = QueueApprover()
+    manager = ApprovalManager(human=approver)
+
+    async def resolve(decision):
+        pending = asyncio.ensure_future(manager.approve(make_call("shell.run", cmd=decision)))
+        (await approver.__anext__()).resolve(decision)
+        return await pending
+
+    assert asyncio.run(resolve("approve"))
+    assert not asyncio.run(resolve("deny"))
+
+
+def test_cache_is_bounded_and_managers_are_per_session_manager():
+    manager = ApprovalManager(max_cached=2)
+    for cmd in ("a", "b", "c"):
+        manager.remember(make_call("shell.run", cmd=cmd), "session", "approve")
+    assert manager.cached(make_call("shell.run", cmd="a"), "session") is None
+    assert manager.cached(make_call("shell.run", cmd="c"), "session") == "approve"
+
+    assert SessionManager().approvals is not SessionManager().approvals
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ..tools import Tool, toolfn
+from ..tools.execution import ToolExecutor, ToolTimeoutError
+from ..tools.toolbox import Toolbox
+
+
+class ExecutionTool(Tool):
+    @toolfn
+    def thread_name(self) -> str:
+        """Return the name of the thread the call runs on."""
+        return threading.current_thread().name
+
+    @toolfn(execution="inline")
+    def inline_thread_name(self) -> str:
+        """Return the name of the thread the call runs on."""
+        return threading.current_thread().name
+
+    @toolfn(timeout=0.05)
+    def slow(self) -> str:
+        """Sleep longer than the timeout."""
+        time.sleep(0.5)
+        return "done"
+
+    @toolfn
+    async def coro(self, value: int) -> int:
+        """Double a value."""
+        return value * 2
+
+
+class ArithmeticTool(Tool):
+    def __init__(self, offset: int = 0):
+        super().__init__()
+        self.offset = offset
+
+    @toolfn(execution="process")
+    def add(self, a: int, b: int) -> int:
+        """Add two numbers and the offset."""
+        return a + b + self.offset
+
+    @toolfn(execution="subprocess")
+    def multiply(self, a: int, b: int) -> int:
+        """Multiply two numbers and add the offset."""
+        return a * b + self.offset
+
+
+def test_toolfn_options():
+    tool = ExecutionTool()
+    assert tool.tool_functions["thread_name"].execution == "auto"
+    assert tool.tool_functions["inline_thread_name"].execution == "inline"
+    assert tool.tool_functions["slow"].timeout == 0.05
+
+
+def test_toolbox_execution_policies():
+    toolbox = Toolbox()
+    toolbox.register("exec", ExecutionTool())
+
+    async def run():
+        main = threading.current_thread().name
+        assert await toolbox.call("exec.thread_name") != main
+        assert await toolbox.call("exec.inline_thread_name") == main
+        assert await toolbox.call("exec.coro", value=21) == 42
+        with pytest.raises(ToolTimeoutError):
+            await toolbox.call("exec.slow")
+
+    asyncio.run(run())
+
+
+def test_subprocess_timeout_kills_process():
+    executor = ToolExecutor()
+
+    async def run():
+        assert await executor.run(sum, [1, 2, 3], execution="subprocess") == 6
+        # Printing goes to stderr instead of mixing with the pickled result
+        assert await executor.run(print, "hello", execution="subprocess") is None
+        with pytest.raises(RuntimeError, match="Could not pickle"):
+            await executor.run(threading.Lock, execution="subprocess")
+        with pytest.raises(ToolTimeoutError):
+            await executor.run(time.sleep, 5, execution="subprocess", timeout=0.5)
+
+    asyncio.run(run())
+
+
+def test_tool_methods_run_in_other_processes():
+    toolbox = Toolbox()
+    toolbox.register("math", ArithmeticTool(offset=1))
+
+    async def run():
+        assert await toolbox.call("math.add", a=2, b=3) == 6
+        assert await toolbox.call("math.multiply", a=2, b=3) == 7
+
+    try:
+        asyncio.run(run())
+    finally:
+        toolbox.executor.shutdown()
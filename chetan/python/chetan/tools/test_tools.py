@@ -1,6 +1,8 @@
 from ..tools.toolbox import Toolbox
 from pydantic import BaseModel, Field
-from ..tools import Tool, ToolFunction, ToolInformation, toolfn
+import pytest
+
+from ..tools import Tool, ToolArgumentsError, ToolFunction, ToolInformation, toolfn
 
 class SampleTool(Tool):
     tool_info = ToolInformation(
@@ -47,3 +49,40 @@ def test_tool():
     )
     assert tool.tool_functions[0].output is str
     assert tool.tool_functions[0].fn("test") == "TEST"
+
+
+def test_validate_args():
+    tool = SampleTool()
+    fn = tool.tool_functions["uppercasify"]
+    assert fn.validate_args({"input": "abc"}) == {"input": "abc"}
+
+    with pytest.raises(ToolArgumentsError) as e:
+        fn.validate_args({"input": 1, "extra": True})
+    assert {tuple(err["loc"]) for err in e.value.errors} == {("input",), ("extra",)}
+
+
+class SearchTool(Tool):
+    @toolfn
+    def search(self, query: str, limit: int = 10, **options) -> str:
+        """Search for a query."""
+        return query
+
+
+def test_validate_args_passes_only_given_arguments():
+    fn = SearchTool().tool_functions["search"]
+    # Omitted optional arguments are left to the function's defaults
+    assert fn.validate_args({"query": "q"}) == {"query": "q"}
+    # Functions taking `**kwargs` accept extra arguments
+    assert fn.validate_args({"query": "q", "limit": "3", "lang": "en"}) == {
+        "query": "q",
+        "limit": 3,
+        "lang": "en",
+    }
+
+
+def test_tool_introspection_is_shared():
+    first, second = SampleTool(), SampleTool()
+    assert SampleTool.__tool_names__ == ["uppercasify"]
+    assert first.tool_functions["uppercasify"].input is second.tool_functions["uppercasify"].input
+    assert first.tool_functions["uppercasify"].fn.__self__ is first
+    assert first.tool_functions["uppercasify"].input_schema() is second.tool_functions["uppercasify"].input_schema()
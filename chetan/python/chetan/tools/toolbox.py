@@ -1,6 +1,6 @@
-from typing import Dict, List, Union, Optional, TYPE_CHECKING
+from typing import Dict, List, Tuple, Union, Optional, TYPE_CHECKING
 from chetan.tools import Tool, ToolFunction
-import inspect
+from chetan.tools.execution import ToolExecutor
 
 if TYPE_CHECKING:
     ToolNamespaceType = 'ToolNamespace'
@@ -131,8 +131,11 @@ class Toolbox(ToolNamespace):
     Root namespace for all tools.
     """
 
-    def __init__(self, max_depth: Optional[int] = None):
+    def __init__(
+        self, max_depth: Optional[int] = None, executor: Optional[ToolExecutor] = None
+    ):
         super().__init__(name=None, max_depth=max_depth, depth=0)
+        self.executor = executor or ToolExecutor()
 
     def register(self, path: str, obj: Union[Tool, ToolNamespace, ToolFunction]):
         """
@@ -184,33 +187,57 @@ class Toolbox(ToolNamespace):
                     return None
         return node
 
-    async def call(self, path: str, **kwargs):
+    def resolve(self, path: str) -> Tuple[ToolFunction, Optional[Tool]]:
         """
-        Call a tool function by dot-separated path, e.g. 'utility.terminal.execute'.
+        Resolve a dot-separated path to its ToolFunction and the Tool that owns it, if any.
         """
         parts = path.split(".")
         tool_path = ".".join(parts[:-1])
         func_name = parts[-1]
-        tool = self.get(tool_path)
+        tool = self.get(tool_path) if tool_path else None
         if isinstance(tool, Tool):
             if func_name not in tool.tool_functions:
                 raise ValueError(f"Function '{func_name}' not found in tool '{tool_path}'")
-            fn = tool.tool_functions[func_name].fn
-            # If fn is a bound method, __self__ is set; otherwise, it's unbound and needs self
-            if hasattr(fn, "__self__") and fn.__self__ is not None:
-                result = fn(**kwargs)
-            else:
-                result = fn(tool, **kwargs)
-            if inspect.iscoroutine(result):
-                return await result
-            else:
-                return result
-        elif isinstance(tool, ToolFunction):
-            fn = tool.fn
-            result = fn(**kwargs)
-            if inspect.iscoroutine(result):
-                return await result
-            else:
-                return result
-        else:
-            raise ValueError(f"Tool not found at path: {tool_path}")
+            return tool.tool_functions[func_name], tool
+
+        tool_function = self.get(path)
+        if not isinstance(tool_function, ToolFunction):
+            raise ValueError(f"Tool not found at path: {path}")
+        return tool_function, None
+
+    def validate(self, path: str, args: dict) -> dict:
+        """
+        Validate raw tool call arguments for the tool function at `path`.
+
+        Raises:
+            ToolArgumentsError: If the arguments are invalid.
+        """
+        tool_function, _ = self.resolve(path)
+        return tool_function.validate_args(args)
+
+    async def call(self, path: str, **kwargs):
+        """
+        Call a tool function by dot-separated path, e.g. 'utility.terminal.execute'.
+
+        The function runs according to its execution policy and timeout (see `toolfn`).
+
+        Raises:
+            ToolTimeoutError: If the call exceeds its timeout.
+        """
+        tool_function, tool = self.resolve(path)
+
+        fn = tool_function.fn
+        # If fn is a bound method, __self__ is set; otherwise, it's unbound and needs self
+        args = ()
+        if tool is not None and getattr(fn, "__self__", None) is None:
+            args = (tool,)
+
+        return await self.executor.run(
+            fn,
+            *args,
+            name=path,
+            execution=tool_function.execution,
+            timeout=tool_function.timeout,
+            limits=tool_function.limits,
+            **kwargs,
+        )
@@ -1,28 +1,73 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+import itertools
+import threading
 from typing import List, Literal, Optional, TypeVar, Union
 from chetan.tools import AgentToolCall
 from chetan.types.stringref import StringRef
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, StrictInt
 
 from whenever import Instant
 
 
-class LMLegibleMessage(BaseModel):
+@dataclass(slots=True)
+class LMLegibleMessage:
+    """A context item as a language model sees it, translated by each adapter to its own format.
+
+    Built for every item added to a context and dropped right after translation, so it is a slotted
+    dataclass rather than a model: its fields come from items that were already validated.
+    """
+
     role: Literal["user", "assistant", "system", "tool"] = "user"
-    content: Optional[StringRef] = None
+    content: Optional[Union[StringRef, str]] = None
 
-    name: Optional[StringRef] = None
+    name: Optional[Union[StringRef, str]] = None
 
     tool_calls: Optional[List[AgentToolCall]] = None
-    tool_call_id: Optional[StringRef] = None
+    tool_call_id: Optional[Union[StringRef, str]] = None
+
+    def __post_init__(self):
+        # Provider SDKs encode messages with the standard library `json`, which can't encode StringRef
+        if isinstance(self.content, StringRef):
+            self.content = str(self.content)
+        if isinstance(self.name, StringRef):
+            self.name = str(self.name)
+        if isinstance(self.tool_call_id, StringRef):
+            self.tool_call_id = str(self.tool_call_id)
+
+
+# Items get increasing integer ids, unique within the process. Contexts saved before used uuid
+# strings, which are kept as they are when loaded.
+ContextId = Union[StrictInt, StringRef]
+
+_context_ids = itertools.count(1)
+_context_ids_lock = threading.Lock()
+
+
+def next_context_id() -> int:
+    # Under the lock, so no id is drawn from a counter `reserve_context_ids` is replacing
+    with _context_ids_lock:
+        return next(_context_ids)
+
+
+def reserve_context_ids(*ids: ContextId):
+    """Make sure ids handed out from now on are above the integer ids among `ids`, e.g. of a loaded context."""
+    global _context_ids
+    highest = max((i for i in ids if isinstance(i, int)), default=0)
+    with _context_ids_lock:
+        current = next(_context_ids)
+        _context_ids = itertools.count(max(current, highest + 1))
 
 
 class StartToEndObject(BaseModel, ABC):
+    # Schemas of all context items are built on first use rather than at import
+    model_config = ConfigDict(defer_build=True)
+
     start_time: Optional[Instant] = None
     end_time: Optional[Instant] = None
 
     metadata: Optional[dict] = None
-    context_id: Optional[StringRef] = None  # Unique id for LM sync
+    context_id: Optional[ContextId] = None  # Unique id for LM sync
 
     def is_complete(self) -> bool:
         """Check if the object has a complete start and end time."""
@@ -82,6 +127,8 @@ class AgentResponse(ProcessItem):
 
 
 class AgentToolCallResult(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     id: str
     results: Optional[StringRef] = None
 
@@ -105,5 +152,3 @@ class EpilogueItem(StartToEndObject, ABC):
 
 
 ItemTypes = TypeVar("ItemTypes", bound=Literal["prologue", "process", "epilogue"])
-
-StartToEndObject.model_rebuild()
@@ -0,0 +1,212 @@
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, Hashable, Iterable, List, Optional, Tuple, Type, TypeVar
+
+from chetan.tools import AgentToolCall
+from chetan.types.context.agent import (
+    AgentResponse,
+    AgentToolCallResult,
+    AgentToolCallResults,
+    StartToEndObject,
+)
+
+if TYPE_CHECKING:
+    from chetan.types.context.agent.iteration import ContextIteration
+
+Item = TypeVar("Item", bound=StartToEndObject)
+GroupKey = Tuple[str, type, Optional[str]]
+
+SECTIONS = ("prologue", "process", "epilogue")
+
+
+def role_of(item: StartToEndObject) -> Optional[str]:
+    # Fields live in `__dict__`; a missing attribute goes through pydantic's slow `__getattr__`
+    return item.__dict__.get("role")
+
+
+def group_key(item: StartToEndObject, section: str) -> GroupKey:
+    return (section, type(item), role_of(item))
+
+
+def matches(key: GroupKey, cls: type, section: Optional[str], role: Optional[str]) -> bool:
+    return (
+        (section is None or key[0] == section)
+        and (role is None or key[2] == role)
+        and issubclass(key[1], cls)
+    )
+
+
+class ItemIndex:
+    """Secondary indexes over the items of one iteration.
+
+    Items are grouped by (section, type, role), so a query touches only the groups it matches, and
+    looked up by `context_id` and by tool-call id in constant time.
+    """
+
+    __slots__ = ("by_id", "groups", "sections", "tool_calls", "tool_results", "shape")
+
+    def __init__(self, sections: Dict[str, List[StartToEndObject]]):
+        self.by_id: Dict[Hashable, Tuple[str, StartToEndObject]] = {}
+        self.groups: Dict[GroupKey, List[StartToEndObject]] = defaultdict(list)
+        self.tool_calls: Dict[str, AgentToolCall] = {}
+        self.tool_results: Dict[str, AgentToolCallResult] = {}
+        self.sections = sections
+        self.shape: tuple = ()  # Identity and length of the indexed section lists
+
+    @classmethod
+    def build(cls, sections: Dict[str, List[StartToEndObject]]) -> "ItemIndex":
+        index = cls(sections)
+        for section in SECTIONS:
+            for item in sections[section]:
+                index.add(item, section)
+        return index
+
+    def __deepcopy__(self, memo):
+        # Copies rebuild their own index on first use
+        return None
+
+    def add(self, item: StartToEndObject, section: str):
+        if item.context_id is not None:
+            self.by_id[item.context_id] = (section, item)
+        self.groups[group_key(item, section)].append(item)
+        if isinstance(item, AgentResponse) and item.tool_calls:
+            for call in item.tool_calls:
+                self.tool_calls[call.id] = call
+        elif isinstance(item, AgentToolCallResults):
+            for result in item.tool_call_results:
+                self.tool_results[result.id] = result
+
+    def remove(self, item: StartToEndObject, section: str):
+        self.by_id.pop(item.context_id, None)
+        group = self.groups.get(group_key(item, section))
+        if group is not None:
+            for i, other in enumerate(group):
+                if other is item:
+                    del group[i]
+                    break
+        if isinstance(item, AgentResponse) and item.tool_calls:
+            for call in item.tool_calls:
+                self.tool_calls.pop(call.id, None)
+        elif isinstance(item, AgentToolCallResults):
+            for result in item.tool_call_results:
+                self.tool_results.pop(result.id, None)
+
+    def select(
+        self,
+        cls: Type[Item] = StartToEndObject,
+        section: Optional[str] = None,
+        role: Optional[str] = None,
+    ) -> List[Item]:
+        """Items that are instances of `cls`, optionally in one section or with one role, in order."""
+        keys = [key for key, group in self.groups.items() if group and matches(key, cls, section, role)]
+        if not keys:
+            return []
+        if len(keys) == 1:
+            return list(self.groups[keys[0]])
+        # Several groups match: keep the order of the sections
+        matching = {(key[1], key[2]) for key in keys}
+        return [
+            item
+            for name in ([section] if section is not None else SECTIONS)
+            for item in self.sections[name]
+            if (type(item), role_of(item)) in matching
+        ]
+
+
+class ContextIndex:
+    """Secondary indexes over the iterations of one context.
+
+    Records which iterations hold items of each (section, type, role), so context-wide queries visit
+    only those, and which iteration holds each `context_id` and each tool-call result. Iterations
+    report their changes to the index of the context they belong to.
+    """
+
+    __slots__ = (
+        "holders", "members", "order", "locations", "tool_results", "shape", "changes", "_seq"
+    )
+
+    def __init__(self):
+        # key -> id(iteration) -> iteration holding items of that key
+        self.holders: Dict[GroupKey, Dict[int, "ContextIteration"]] = defaultdict(dict)
+        self.members: Dict[int, Dict[GroupKey, int]] = {}  # id(iteration) -> its items per key
+        self.order: Dict[int, int] = {}  # id(iteration) -> position among the context's iterations
+        # Lookups are verified against the iteration, entries may outlive their item
+        self.locations: Dict[Hashable, "ContextIteration"] = {}
+        self.tool_results: Dict[str, "ContextIteration"] = {}
+        self.shape: tuple = ()  # Identity and length of the indexed iterations list
+        # Items added and removed through the iterations, collected while a journal is attached
+        self.changes: Optional[List[Tuple[str, "ContextIteration", StartToEndObject, str]]] = None
+        self._seq = 0
+
+    @classmethod
+    def build(cls, iterations: Iterable["ContextIteration"]) -> "ContextIndex":
+        index = cls()
+        for iteration in iterations:
+            index.attach(iteration)
+        return index
+
+    def __deepcopy__(self, memo):
+        return None
+
+    def attach(self, iteration: "ContextIteration"):
+        """Index `iteration` after the others and have it report its changes here."""
+        iteration.__pydantic_private__["_context_index"] = self
+        self.order[id(iteration)] = self._seq
+        self._seq += 1
+        self.refresh(iteration)
+
+    def replace(self, old: "ContextIteration", new: "ContextIteration"):
+        """Index `new` in place of `old`, a copy of it about to be written to."""
+        self.order[id(new)] = self.order.pop(id(old))
+        counts = self.members.pop(id(old), None)
+        if counts:
+            for key in counts:
+                self.holders[key].pop(id(old), None)
+        new.__pydantic_private__["_context_index"] = self
+        self.refresh(new)
+
+    def refresh(self, iteration: "ContextIteration"):
+        """Re-index the items of `iteration`, after its sections changed behind the index's back."""
+        counts = self.members.pop(id(iteration), None)
+        if counts:
+            for key in counts:
+                self.holders[key].pop(id(iteration), None)
+        for section in SECTIONS:
+            for item in iteration[section]:
+                self.add(iteration, item, section)
+
+    def add(self, iteration: "ContextIteration", item: StartToEndObject, section: str):
+        key = group_key(item, section)
+        counts = self.members.get(id(iteration))
+        if counts is None:
+            counts = self.members[id(iteration)] = {}
+        counts[key] = counts.get(key, 0) + 1
+        self.holders[key][id(iteration)] = iteration
+        if item.context_id is not None:
+            self.locations[item.context_id] = iteration
+        if isinstance(item, AgentToolCallResults):
+            for result in item.tool_call_results:
+                self.tool_results[result.id] = iteration
+
+    def remove(self, iteration: "ContextIteration", item: StartToEndObject, section: str):
+        key = group_key(item, section)
+        counts = self.members.get(id(iteration))
+        if counts and key in counts:
+            counts[key] -= 1
+            if not counts[key]:
+                del counts[key]
+                self.holders[key].pop(id(iteration), None)
+        if self.locations.get(item.context_id) is iteration:
+            del self.locations[item.context_id]
+
+    def holding(
+        self,
+        cls: type = StartToEndObject,
+        section: Optional[str] = None,
+        role: Optional[str] = None,
+    ) -> List["ContextIteration"]:
+        """Iterations holding items that are instances of `cls`, oldest first."""
+        found: Dict[int, "ContextIteration"] = {}
+        for key, holders in self.holders.items():
+            if holders and matches(key, cls, section, role):
+                found.update(holders)
+        return sorted(found.values(), key=lambda iteration: self.order[id(iteration)])
@@ -1,8 +1,8 @@
 import importlib
-import json
 import pickle
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional, Type
 
+from chetan.events.sink import INFO, ContextEvent, get_sink
 from chetan.types.context.agent import (
     AgentResponse,
     EpilogueItem,
@@ -14,20 +14,24 @@ from chetan.types.context.agent import (
     SystemMessage,
     EntityMessage,
     LMLegibleMessage,
+    AgentToolCallResult,
+    ContextId,
+    next_context_id,
+    reserve_context_ids,
 )
-from chetan.types.stringref import StringRef
-from pydantic import BaseModel, Field, SerializeAsAny
+from chetan.types.context.agent.index import ContextIndex, Item, ItemIndex
+from chetan.types.serialization import dumpb, loads
+from chetan.tools import AgentToolCall
+from pydantic import BaseModel, ConfigDict, Field, SerializeAsAny
 
 import uuid
 
 from chetan.lm import LanguageModel
 
-from rich.console import Console
-
 from whenever import Instant
 
-console = Console()
-console.is_jupyter = False
+if TYPE_CHECKING:
+    from chetan.types.context.agent.journal import ContextJournal, Stage
 
 
 def to_dict_with_class(obj: StartToEndObject):
@@ -52,12 +56,99 @@ class ContextIteration(StartToEndObject):
     epilogue: List[SerializeAsAny[EpilogueItem]] = Field(default_factory=list)
 
     _lm: LanguageModel = None
+    _index: Optional[ItemIndex] = None
+    _context_index: Optional[ContextIndex] = None  # Of the context this iteration belongs to
+    _owner: Optional[object] = None  # Token of the context that may write to it in place
 
     def __init__(self, index: int, *args, _lm: LanguageModel = None, **kwargs):
         super().__init__(*args, **kwargs)
         self._lm = _lm
         self.index = index
 
+    def _shape(self) -> tuple:
+        return (
+            id(self.prologue), len(self.prologue),
+            id(self.process), len(self.process),
+            id(self.epilogue), len(self.epilogue),
+        )
+
+    @property
+    def item_index(self) -> ItemIndex:
+        """Secondary indexes over this iteration's items.
+
+        Built on the first query, then kept up to date by `add_item` and `remove_item`, and rebuilt
+        when a section list was replaced or changed length behind their back; the context's index
+        is refreshed along with it.
+        """
+        # Private attributes are read through pydantic's slow `__getattr__`, this runs on every query
+        private = self.__pydantic_private__
+        index, shape = private.get("_index"), self._shape()
+        if index is None or index.shape != shape:
+            index = private["_index"] = ItemIndex.build(
+                {"prologue": self.prologue, "process": self.process, "epilogue": self.epilogue}
+            )
+            index.shape = shape
+            context_index = private.get("_context_index")
+            if context_index is not None:
+                context_index.refresh(self)
+        return index
+
+    def copy_for_write(self, owner: Optional[object] = None) -> "ContextIteration":
+        """A copy with its own section lists, sharing the items, which are not changed once added."""
+        copy = self.model_copy()
+        copy.prologue, copy.process, copy.epilogue = (
+            list(self.prologue), list(self.process), list(self.epilogue)
+        )
+        private = copy.__pydantic_private__
+        private["_index"] = private["_context_index"] = None
+        private["_owner"] = owner
+        return copy
+
+    def find(self, context_id: ContextId) -> Optional[StartToEndObject]:
+        """The item with `context_id`, or None."""
+        found = self.item_index.by_id.get(context_id)
+        return found[1] if found is not None else None
+
+    def section_of(self, context_id: ContextId) -> Optional[ItemTypes]:
+        """The section holding the item with `context_id`, or None."""
+        found = self.item_index.by_id.get(context_id)
+        return found[0] if found is not None else None
+
+    def select(
+        self,
+        cls: Type[Item] = StartToEndObject,
+        section: Optional[ItemTypes] = None,
+        role: Optional[str] = None,
+    ) -> List[Item]:
+        """Items that are instances of `cls`, optionally restricted to a section and a role, in order."""
+        return self.item_index.select(cls, section, role)
+
+    def first(
+        self,
+        cls: Type[Item] = StartToEndObject,
+        section: Optional[ItemTypes] = None,
+        role: Optional[str] = None,
+    ) -> Optional[Item]:
+        items = self.select(cls, section, role)
+        return items[0] if items else None
+
+    def last(
+        self,
+        cls: Type[Item] = StartToEndObject,
+        section: Optional[ItemTypes] = None,
+        role: Optional[str] = None,
+    ) -> Optional[Item]:
+        items = self.select(cls, section, role)
+        return items[-1] if items else None
+
+    def tool_call(self, call_id: str) -> Optional[AgentToolCall]:
+        """The tool call with `call_id` requested in this iteration, or None."""
+        return self.item_index.tool_calls.get(call_id)
+
+    def tool_result(self, call_id: str) -> Optional[AgentToolCallResult]:
+        """The result of the tool call with `call_id`, if it was recorded in this iteration."""
+        return self.item_index.tool_results.get(call_id)
+
     def items(self) -> List[StartToEndObject]:
         """Return all items across all sections."""
         return self.prologue + self.process + self.epilogue
@@ -72,70 +163,33 @@ class ContextIteration(StartToEndObject):
         else:
             raise ValueError(f"Invalid section: {section}")
 
-    def _log_item(self, item: StartToEndObject, section: ItemTypes):
-        def trim_content(content, max_length=100):
-            if content is None:
-                return ""
-            return content[:max_length] + "…" if len(content) > max_length else content
-
-        def print_item(title: str, content: str, color: str = "white"):
-            console.print(f"[{color}]{title.upper()}[/]: {content}", justify="left")
-            pass
-
-        if isinstance(item, EntityMessage):
-            print_item(
-                f"{item.role.upper()}{item.name and f' ({item.name})' or ''}",
-                item.content,
-                color="dodger_blue2" if item.role == "user" else "green1",
-            )
-        elif isinstance(item, AgentResponse):
-            print_item("self", item.to_lm_legible().content, color="orange_red1")
-
-            if item.tool_calls:
-                tool_calls = "\n".join(
-                    f"{call.id} {call.tool_name}({', '.join(f'{k}={repr(v)}' for k, v in call.tool_args.items())})"
-                    for call in item.tool_calls
-                )
-                print_item("tool-calls", tool_calls, color="magenta3")
-        elif isinstance(item, AgentToolCallResults):
-            tool_results = "\n".join(
-                f"{res.id}: {trim_content(res.results)}"
-                for res in item.tool_call_results
-            )
-            print_item("tool-call-results", tool_results, color="cyan2")
-        elif isinstance(item, SystemMessage):
-            print_item(
-                "system",
-                trim_content(item.to_lm_legible().content),
-                color="dark_goldenrod",
-            )
-        else:
-            print_item(
-                title=f"{section.upper()}",
-                content=trim_content(
-                    item.to_lm_legible().content
-                    if hasattr(item, "to_lm_legible")
-                    else str(item)
-                )
-                if isinstance(item, StartToEndObject)
-                else str(item),
-                color="white",
-            )
-
     def add_item(
         self,
         item: StartToEndObject,
         section: ItemTypes,
         lm: LanguageModel = None,
     ):
-        # Assign unique context_id
-        item.context_id = StringRef(str(uuid.uuid4()))
+        item.context_id = next_context_id()
+        private = self.__pydantic_private__
+        index = private.get("_index")
+        if index is not None and index.shape != self._shape():
+            index = self.item_index
         getattr(self, section).append(item)
+        if index is not None:
+            index.add(item, section)
+            index.shape = self._shape()
+        context_index = private.get("_context_index")
+        if context_index is not None:
+            context_index.add(self, item, section)
+            if context_index.changes is not None:
+                context_index.changes.append(("add", self, item, section))
         # Always use self.lm (or provided lm) to add to context
         lm_to_use = lm or getattr(self, "_lm", None)
         if lm_to_use is not None:
             lm_to_use.add_to_context(item.to_lm_legible(), item.context_id)
-        self._log_item(item, section)
+        sink = get_sink()
+        if sink.enabled(INFO):
+            sink.emit(ContextEvent("item", INFO, section, self.index, item))
         return item.context_id
 
     def remove_item(
@@ -144,15 +198,27 @@ class ContextIteration(StartToEndObject):
         section: ItemTypes,
         lm: LanguageModel = None,
     ):
+        index = self.item_index
+        found = index.by_id.get(context_id)
+        if found is None or found[0] != section:
+            return False
+        item = found[1]
         section_list = getattr(self, section)
-        for i, item in enumerate(section_list):
-            if getattr(item, "context_id", None) == context_id:
+        for i, other in enumerate(section_list):
+            if other is item:
                 del section_list[i]
-                lm_to_use = lm or getattr(self, "_lm", None)
-                if lm_to_use is not None:
-                    lm_to_use.remove_from_context(context_id)
-                return True
-        return False
+                break
+        index.remove(item, section)
+        index.shape = self._shape()
+        context_index = self.__pydantic_private__.get("_context_index")
+        if context_index is not None:
+            context_index.remove(self, item, section)
+            if context_index.changes is not None:
+                context_index.changes.append(("remove", self, item, section))
+        lm_to_use = lm or getattr(self, "_lm", None)
+        if lm_to_use is not None:
+            lm_to_use.remove_from_context(context_id)
+        return True
 
     def to_lm_legible(self):
         """Convert the entire iteration for LM context."""
@@ -181,6 +247,9 @@ class ContextIteration(StartToEndObject):
     def __setstate__(self, state):
         self.__dict__.update(state)
         self._lm = None  # or restore as needed
+        self._index = None
+        self._context_index = None
+        self._owner = None
 
     def to_dict_with_class(self):
         d = self.model_dump(exclude={"prologue", "process", "epilogue"})
@@ -211,14 +280,123 @@ class ContextIteration(StartToEndObject):
 
 
 class AgentContext(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     iterations: List[ContextIteration] = []
+    session_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    tenant_id: Optional[str] = None  # Customer the session belongs to, scopes multi-tenant modules
     _lm: LanguageModel = None
+    _index: Optional[ContextIndex] = None
+    _owner: Optional[object] = None  # Iterations holding this token are not shared with snapshots
+    _journal: Optional["ContextJournal"] = None
 
     def __init__(self, _lm: LanguageModel = None, **kwargs):
         super().__init__(**kwargs)
         self._lm = _lm
         self.iterations = []
 
+    def _shape(self) -> tuple:
+        iterations = self.iterations
+        return (id(iterations), len(iterations), id(iterations[-1]) if iterations else None)
+
+    @property
+    def context_index(self) -> ContextIndex:
+        """Secondary indexes over this context's iterations.
+
+        Kept up to date by the iterations' `add_item` and `remove_item` and by `new` and
+        `add_iteration`, and rebuilt when the iterations list was replaced or changed behind their
+        back. Items put into a section list directly are picked up once their iteration is queried.
+        """
+        private = self.__pydantic_private__
+        index, shape = private.get("_index"), self._shape()
+        if index is None or index.shape != shape:
+            index = private["_index"] = ContextIndex.build(self.iterations)
+            index.shape = shape
+        return index
+
+    def _append(self, iteration: ContextIteration):
+        private = self.__pydantic_private__
+        index = private.get("_index")
+        if index is not None and index.shape != self._shape():
+            index = None
+        iteration.__pydantic_private__["_owner"] = private.get("_owner")
+        self.iterations.append(iteration)
+        if index is not None:
+            index.attach(iteration)
+            index.shape = self._shape()
+
+    def _own(self, position: int) -> ContextIteration:
+        """The iteration at `position`, first replaced by a copy if it is shared with a snapshot."""
+        private = self.__pydantic_private__
+        iteration, owner = self.iterations[position], private.get("_owner")
+        if iteration.__pydantic_private__.get("_owner") is owner:
+            return iteration
+        index = private.get("_index")
+        if index is not None and index.shape != self._shape():
+            index = None
+        copy = iteration.copy_for_write(owner)
+        copy._lm = self._lm
+        self.iterations[position] = copy
+        if index is not None:
+            index.replace(iteration, copy)
+            index.shape = self._shape()
+        return copy
+
+    def _own_iteration(self, iteration: ContextIteration) -> ContextIteration:
+        for position in range(len(self.iterations) - 1, -1, -1):
+            if self.iterations[position] is iteration:
+                return self._own(position)
+        raise ValueError("The iteration is not part of this context")
+
+    @property
+    def journal(self) -> Optional["ContextJournal"]:
+        """Journal the agent loop checkpoints this context to, see `ContextJournal`."""
+        return self._journal
+
+    @journal.setter
+    def journal(self, journal: Optional["ContextJournal"]):
+        if journal is not None:
+            journal.restart()
+        self._journal = journal
+
+    def checkpoint(
+        self,
+        stage: "Stage",
+        exit: bool = False,
+        result: Optional[AgentToolCallResult] = None,
+    ):
+        """Record the context in its journal after `stage` of the agent loop, if it has one.
+
+        Args:
+            stage (Stage): Stage of the current iteration just completed.
+            exit (bool, optional): Whether the loop is going to stop after this iteration. Defaults to False.
+            result (Optional[AgentToolCallResult], optional): For `tool_result`, the result of the call that finished.
+        """
+        journal = self.__pydantic_private__.get("_journal")
+        if journal is not None:
+            journal.checkpoint(self, stage, exit=exit, result=result)
+
+    def snapshot(self, session_id: Optional[str] = None) -> "AgentContext":
+        """Create a copy of the context, e.g. to branch a conversation, that shares its iterations.
+
+        An iteration is copied when either context writes to it through `add_item`, `remove_item`,
+        `latest`, `new` or `clear`; write to other iterations through these methods only. The
+        language model is forked, so the copy continues from the same chat context.
+
+        Args:
+            session_id (Optional[str], optional): Session of the copy. Defaults to a new session.
+        """
+        lm = self._lm.fork() if self._lm is not None else None
+        fields = {"tenant_id": self.tenant_id}
+        if session_id is not None:
+            fields["session_id"] = session_id
+        branch = AgentContext(_lm=lm, **fields)
+        branch.iterations = list(self.iterations)
+        # Neither context owns the iterations they now share
+        self._owner = object()
+        branch._owner = object()
+        return branch
+
     def save_pickled(self, file_path: str):
         """Save the context to a pickle file (only iterations)."""
         # Only serialize iterations (as dicts)
@@ -230,19 +408,26 @@ class AgentContext(BaseModel):
         """Load the context from a pickle file (only iterations)."""
         with open(file_path, "rb") as f:
             self.iterations = pickle.load(f)
+        self._reserve_ids()
 
     def save_json(self, file_path: str) -> str:
-        with open(file_path, "w") as f:
-            json.dump({"iterations":[it.to_dict_with_class() for it in self.iterations]}, f, indent=4, default=str)
+        with open(file_path, "wb") as f:
+            f.write(dumpb({"iterations": [it.to_dict_with_class() for it in self.iterations]}, indent=True))
 
     def load_json(self, file_path: str):
-        with open(file_path, "r") as f:
-            raw_list = json.load(f)
+        with open(file_path, "rb") as f:
+            raw_list = loads(f.read())
             self.iterations = [
                 ContextIteration.from_dict_with_class(item) for item in raw_list["iterations"]
             ]
             for iteration in self.iterations:
                 iteration._lm = self._lm
+        self._reserve_ids()
+
+    def _reserve_ids(self):
+        reserve_context_ids(
+            *(item.context_id for iteration in self.iterations for item in iteration.items())
+        )
 
     def get(self, idx: str):
         parts = idx.split(":")
@@ -261,22 +446,23 @@ class AgentContext(BaseModel):
         return len(self.iterations)
 
     def add_iteration(self, iteration: ContextIteration) -> int:
-        self.iterations.append(iteration)
+        reserve_context_ids(*(item.context_id for item in iteration.items()))
+        self._append(iteration)
         return len(self.iterations) - 1
 
     def new(self) -> ContextIteration:
-        if self.iterations:
+        # An iteration that has ended is left as is, without copying it if shared with a snapshot
+        if self.iterations and self.iterations[-1].end_time is None:
             self.latest().end_time = Instant.now()
         iteration = ContextIteration(index=len(self.iterations), _lm=self._lm)
         iteration.start_time = Instant.now()
-        self.iterations.append(iteration)
+        self._append(iteration)
         return iteration
 
     def latest(self) -> ContextIteration:
-        try:
-            return self.iterations[-1]
-        except IndexError:
+        if not self.iterations:
             return None
+        return self._own(-1)
 
     def latest_complete_iteration(self) -> Optional[ContextIteration]:
         for iteration in reversed(self.iterations):
@@ -287,7 +473,7 @@ class AgentContext(BaseModel):
     def clear(self, retain_system_prompt: bool = False):
         """Clear the context, optionally retaining the system prompt."""
         if retain_system_prompt:
-            first_iteration = self.get("0")
+            first_iteration = self._own(0)
             self.iterations.clear()
             first_iteration.process.clear()
             first_iteration.epilogue.clear()
@@ -298,6 +484,7 @@ class AgentContext(BaseModel):
             ]
             self.iterations.append(first_iteration)
 
+        self._index = None
         if self._lm is not None:
             self._lm.clear_context(retain_system_prompt=retain_system_prompt)
 
@@ -307,8 +494,61 @@ class AgentContext(BaseModel):
         section: ItemTypes,
         lm: LanguageModel = None,
     ):
-        lm_to_use = lm or getattr(self, "lm", None)
-        return self.latest().add_item(item, section, lm=lm_to_use)
+        # Iterations fall back to their own `_lm`
+        return self.latest().add_item(item, section, lm=lm)
+
+    def iteration_of(self, context_id: ContextId) -> Optional[ContextIteration]:
+        """The newest iteration holding the item with `context_id`, or None."""
+        index = self.context_index
+        iteration = index.locations.get(context_id)
+        if iteration is not None and iteration.find(context_id) is not None:
+            return iteration
+        # Put into a section list directly and not queried since
+        for iteration in reversed(self.iterations):
+            if iteration.find(context_id) is not None:
+                index.locations[context_id] = iteration
+                return iteration
+        return None
+
+    def find(self, context_id: ContextId) -> Optional[StartToEndObject]:
+        """The item with `context_id`, or None."""
+        iteration = self.iteration_of(context_id)
+        return iteration.find(context_id) if iteration is not None else None
+
+    def select(
+        self,
+        cls: Type[Item] = StartToEndObject,
+        section: Optional[ItemTypes] = None,
+        role: Optional[str] = None,
+        start: int = 0,
+    ) -> List[Item]:
+        """Items that are instances of `cls` in the iterations from `start` on, oldest first."""
+        index = self.context_index
+        holding = index.holding(cls, section, role)
+        if start and holding:
+            if start >= len(self.iterations):
+                return []
+            first = index.order[id(self.iterations[start])]
+            holding = [iteration for iteration in holding if index.order[id(iteration)] >= first]
+        return [item for iteration in holding for item in iteration.select(cls, section, role)]
+
+    def last(
+        self,
+        cls: Type[Item] = StartToEndObject,
+        section: Optional[ItemTypes] = None,
+        role: Optional[str] = None,
+    ) -> Optional[Item]:
+        """The newest item that is an instance of `cls` in any iteration."""
+        for iteration in reversed(self.context_index.holding(cls, section, role)):
+            item = iteration.last(cls, section, role)
+            if item is not None:
+                return item
+        return None
+
+    def tool_result(self, call_id: str) -> Optional[AgentToolCallResult]:
+        """The result recorded for the tool call with `call_id`, or None."""
+        iteration = self.context_index.tool_results.get(call_id)
+        return iteration.tool_result(call_id) if iteration is not None else None
 
     def remove_item(
         self,
@@ -316,8 +556,17 @@ class AgentContext(BaseModel):
         section: ItemTypes,
         lm: LanguageModel = None,
     ):
-        lm_to_use = lm or getattr(self, "lm", None)
-        return self.latest().remove_item(context_id, section, lm=lm_to_use)
+        """Remove an item from `section` of the newest iteration that holds it."""
+        iteration = self.iteration_of(context_id)
+        if iteration is None:
+            return False
+        if iteration.section_of(context_id) == section:
+            return self._own_iteration(iteration).remove_item(context_id, section, lm=lm)
+        # Ids loaded from older saves may repeat across iterations and sections
+        for position in range(len(self.iterations) - 1, -1, -1):
+            if self.iterations[position].section_of(context_id) == section:
+                return self._own(position).remove_item(context_id, section, lm=lm)
+        return False
 
     def remove_iteration(self, start: int, stop: Optional[int] = None):
         """Remove an iteration by index."""
@@ -330,7 +579,7 @@ class AgentContext(BaseModel):
         def remove_single_iteration(idx: int):
             if idx < len(self.iterations):
                 for item in ["prologue", "process", "epilogue"]:
-                    for sub_item in self.get(f"{idx}:{item}"):
+                    for sub_item in list(self.get(f"{idx}:{item}")):
                         sub_item: StartToEndObject
                         self.remove_item(sub_item.context_id, item)
                 del self.iterations[idx]
@@ -353,3 +602,5 @@ class AgentContext(BaseModel):
     def __setstate__(self, state):
         self.__dict__.update(state)
         self._lm = None  # or restore as needed
+        self._index = None
+        self._owner = None
@@ -0,0 +1,257 @@
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import IO, Dict, List, Literal, Optional, Tuple
+
+from chetan.lm import LanguageModel
+from chetan.types.context.agent import AgentToolCallResult, StartToEndObject
+from chetan.types.context.agent.index import SECTIONS, ContextIndex
+from chetan.types.context.agent.iteration import (
+    AgentContext,
+    ContextIteration,
+    from_dict_with_class,
+    to_dict_with_class,
+)
+from chetan.types.serialization import dumpb, loads
+
+# Stages of an agent loop iteration a checkpoint is taken after
+Stage = Literal["prologue", "response", "tool_result", "process", "epilogue"]
+
+
+@dataclass(slots=True)
+class Checkpoint:
+    """The last checkpoint of a run recorded in a `ContextJournal`."""
+
+    stage: Stage
+    iteration: int
+    exit: bool = False  # The loop was going to stop after this iteration
+    # Results of tool calls that finished while others of the same batch were still running
+    tool_results: List[AgentToolCallResult] = field(default_factory=list)
+
+
+class ContextJournal:
+    """An append-only JSON lines log of a context, written at checkpoints of the agent loop.
+
+    A checkpoint appends the items added and removed since the previous one, the times of new or
+    ended iterations and the stage reached, then flushes the file. `restore` rebuilds the context
+    as of the last checkpoint, e.g. after the process died. Only changes made through `add_item`,
+    `remove_item` and `new` are logged; anything else, like clearing the context, makes the next
+    checkpoint write the whole context again.
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        """
+        Args:
+            path (str): The journal file, created if it does not exist.
+            fsync (bool, optional): Sync the file to disk at every checkpoint, so it survives the machine going down, not only the process. Defaults to True.
+        """
+        self.path = path
+        self.fsync = fsync
+        self._file: Optional[IO[bytes]] = None
+        self._lock = threading.Lock()
+        self._index: Optional[ContextIndex] = None  # Of the context, collecting its changes
+        self._times: Dict[int, tuple] = {}  # Iteration index -> start and end time as written
+        self._seen = 0  # Iterations written
+
+    def restart(self):
+        """Write the whole context at the next checkpoint, e.g. when a context is attached."""
+        if self._index is not None:
+            self._index.changes = None
+        self._index = None
+
+    def _follow(self, context: AgentContext):
+        # The journal already holds `context` as it is
+        self._index = context.context_index
+        self._index.changes = []
+        self._times = {it.index: (it.start_time, it.end_time) for it in context.iterations}
+        self._seen = len(context.iterations)
+
+    def _iteration_records(self, context: AgentContext) -> List[dict]:
+        records = []
+        iterations = context.iterations
+        # Only the newest iteration written before may have ended since
+        for iteration in iterations[max(self._seen - 1, 0):]:
+            times = (iteration.start_time, iteration.end_time)
+            if self._times.get(iteration.index) != times:
+                self._times[iteration.index] = times
+                records.append(
+                    {
+                        "op": "iteration",
+                        "index": iteration.index,
+                        "start_time": iteration.start_time,
+                        "end_time": iteration.end_time,
+                    }
+                )
+        self._seen = len(iterations)
+        return records
+
+    def checkpoint(
+        self,
+        context: AgentContext,
+        stage: Stage,
+        exit: bool = False,
+        result: Optional[AgentToolCallResult] = None,
+    ):
+        """Append the changes to `context` since the last checkpoint and the stage reached.
+
+        Args:
+            context (AgentContext): The journaled context.
+            stage (Stage): Stage of the current iteration just completed.
+            exit (bool, optional): Whether the loop is going to stop after this iteration. Defaults to False.
+            result (Optional[AgentToolCallResult], optional): For `tool_result`, the result of the call that finished.
+        """
+        records = []
+        index = context.context_index
+        if index is not self._index:
+            # Changed behind the index's back, or the first checkpoint: write the whole context
+            records.append(
+                {"op": "reset", "session_id": context.session_id, "tenant_id": context.tenant_id}
+            )
+            self._times, self._seen = {}, 0
+            records += self._iteration_records(context)
+            for iteration in context.iterations:
+                for section in SECTIONS:
+                    for item in iteration[section]:
+                        records.append(self._add_record(iteration, item, section))
+            if self._index is not None:
+                self._index.changes = None
+            self._index = index
+        else:
+            records += self._iteration_records(context)
+            for op, iteration, item, section in index.changes:
+                if op == "add":
+                    records.append(self._add_record(iteration, item, section))
+                else:
+                    records.append({"op": "remove", "context_id": item.context_id})
+        index.changes = []
+
+        record = {
+            "op": "checkpoint",
+            "stage": stage,
+            "iteration": context.iterations[-1].index if context.iterations else -1,
+            "exit": exit,
+        }
+        if result is not None:
+            record["result"] = result.model_dump()
+        records.append(record)
+        self._write(b"".join(dumpb(record) + b"\n" for record in records))
+
+    @staticmethod
+    def _add_record(iteration: ContextIteration, item: StartToEndObject, section: str) -> dict:
+        return {
+            "op": "add",
+            "iteration": iteration.index,
+            "section": section,
+            "item": to_dict_with_class(item),
+        }
+
+    def _write(self, data: bytes):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "ab")
+            self._file.write(data)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def read(self) -> Tuple[List[dict], int]:
+        """The records up to the last checkpoint, and the size of the file up to there."""
+        records, pending, size, end = [], [], 0, 0
+        if not os.path.exists(self.path):
+            return records, end
+        with open(self.path, "rb") as f:
+            for line in f:
+                size += len(line)
+                if not line.endswith(b"\n"):
+                    break  # Cut short by the crash
+                try:
+                    record = loads(line)
+                except ValueError:
+                    break
+                pending.append(record)
+                if record["op"] == "checkpoint":
+                    records += pending
+                    pending, end = [], size
+        return records, end
+
+    def restore(
+        self, lm: Optional[LanguageModel] = None
+    ) -> Tuple[AgentContext, Optional[Checkpoint]]:
+        """Rebuild the context as of the last checkpoint, and keep logging it to this journal.
+
+        The items are replayed into `lm`'s cleared chat context in the order they were added, without
+        asking the language model or running tools. Whatever follows the last checkpoint in the
+        file, i.e. an unfinished stage, is dropped.
+
+        Args:
+            lm (Optional[LanguageModel], optional): Language model of the context.
+
+        Returns:
+            Tuple[AgentContext, Optional[Checkpoint]]: The context, and its last checkpoint if any.
+        """
+        records, end = self.read()
+        session: dict = {}
+        times: Dict[int, dict] = {}
+        sections: Dict[int, Dict[str, list]] = {}
+        live: Dict = {}  # context_id -> (iteration, section, item), in the order they were added
+        checkpoint, results = None, []
+        for record in records:
+            op = record["op"]
+            if op == "add":
+                item = from_dict_with_class(record["item"])
+                items = sections.setdefault(record["iteration"], {s: [] for s in SECTIONS})
+                items[record["section"]].append(item)
+                live[item.context_id] = (record["iteration"], record["section"], item)
+            elif op == "remove":
+                found = live.pop(record["context_id"], None)
+                if found is not None:
+                    items = sections[found[0]][found[1]]
+                    items[:] = [item for item in items if item is not found[2]]
+            elif op == "iteration":
+                times[record["index"]] = {
+                    "start_time": record["start_time"],
+                    "end_time": record["end_time"],
+                }
+            elif op == "reset":
+                session = {"session_id": record["session_id"], "tenant_id": record["tenant_id"]}
+                times, sections, live = {}, {}, {}
+            elif op == "checkpoint":
+                if record["stage"] == "tool_result":
+                    results.append(AgentToolCallResult.model_validate(record["result"]))
+                else:
+                    results = []
+                checkpoint = Checkpoint(
+                    stage=record["stage"],
+                    iteration=record["iteration"],
+                    exit=record["exit"],
+                    tool_results=list(results),
+                )
+
+        context = AgentContext(_lm=lm, **session)
+        for i in sorted(times.keys() | sections.keys()):
+            iteration = ContextIteration(index=i, _lm=lm, **times.get(i, {}))
+            for section, items in sections.get(i, {}).items():
+                iteration[section].extend(items)
+            context.add_iteration(iteration)
+
+        if lm is not None:
+            lm.clear_context()
+            for _, _, item in live.values():
+                lm.add_to_context(item.to_lm_legible(), item.context_id)
+
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if os.path.exists(self.path) and os.path.getsize(self.path) > end:
+                with open(self.path, "r+b") as f:
+                    f.truncate(end)
+        context._journal = self
+        self._follow(context)
+        return context, checkpoint
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
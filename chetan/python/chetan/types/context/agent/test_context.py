@@ -0,0 +1,198 @@
+import importlib
+import json
+import threading
+
+import pytest
+
+from chetan.lm import LanguageModel
+from chetan.tools import AgentToolCall
+from chetan.types.context.agent import (
+    AgentResponse,
+    AgentToolCallResult,
+    AgentToolCallResults,
+    EntityMessage,
+    PrologueItem,
+    SystemMessage,
+    next_context_id,
+    reserve_context_ids,
+)
+from chetan.types.context.agent.iteration import AgentContext
+from chetan.types.stringref import StringRef
+
+
+class DictLM(LanguageModel):
+    def __init__(self):
+        self.chat_context = {}
+        self.chat_context_list = []
+
+    def clone(self):
+        return DictLM()
+
+    async def chat(self, ctx, *args, tools=[], **kwargs): ...
+
+    async def chat_structured(self, ctx, response_model, *args, **kwargs): ...
+
+    def clear_context_but_system(self): ...
+
+    def load_chat_context(self, ctx): ...
+
+    def translate_tools(self, *toolfunctions): ...
+
+    def translate_from_legible_message(self, item, type):
+        return {"role": item.role, "content": str(item.content)}
+
+
+def test_context_ids(tmp_path):
+    lm = DictLM()
+    context = AgentContext(_lm=lm)
+    context.new()
+    first = context.add_item(EntityMessage(content="hi"), "prologue")
+    results = context.add_item(
+        AgentToolCallResults(
+            tool_call_results=[AgentToolCallResult(id="a", results="1"), AgentToolCallResult(id="b", results="2")]
+        ),
+        "process",
+    )
+    last = context.add_item(EntityMessage(content="bye"), "prologue")
+    assert isinstance(first, int) and first < results < last
+    assert list(lm.chat_context) == [first, (results, 0), (results, 1), last]
+
+    assert context.remove_item(results, "process")
+    assert list(lm.chat_context) == [first, last]
+    assert lm.chat_context_list == [{"role": "user", "content": "hi"}, {"role": "user", "content": "bye"}]
+    assert not context.remove_item(results, "process")
+
+    # Loading a context saved with ids from the future keeps new ids unique
+    context.latest().prologue[0].context_id = last + 1000
+    context.iterations[0].prologue.append(EntityMessage(content="legacy", context_id="6f1c-uuid"))
+    context.save_json(str(tmp_path / "context.json"))
+    loaded = AgentContext()
+    loaded.load_json(str(tmp_path / "context.json"))
+    assert loaded[0].prologue[2].context_id == StringRef("6f1c-uuid")
+    loaded.new()
+    assert loaded.add_item(EntityMessage(content="new"), "prologue") > last + 1000
+
+
+def test_context_ids_stay_unique_while_reserving():
+    drawn = [[] for _ in range(4)]
+
+    def draw(ids):
+        for _ in range(5000):
+            ids.append(next_context_id())
+
+    threads = [threading.Thread(target=draw, args=(ids,)) for ids in drawn]
+    for thread in threads:
+        thread.start()
+    for _ in range(500):
+        reserve_context_ids(next_context_id())
+    for thread in threads:
+        thread.join()
+
+    ids = [i for chunk in drawn for i in chunk]
+    assert len(set(ids)) == len(ids)
+
+
+def test_context_index():
+    context = AgentContext(_lm=DictLM())
+    context.new()
+    hi = EntityMessage(content="hi")
+    context.add_item(hi, "prologue")
+    context.add_item(EntityMessage(role="assistant", content="hello"), "prologue")
+    context.add_item(
+        AgentResponse(tool_calls=[AgentToolCall(id="call", tool_name="search", tool_args={})]),
+        "process",
+    )
+    context.add_item(AgentToolCallResults(tool_call_results=[AgentToolCallResult(id="call", results="found")]), "process")
+    iteration = context.new()
+    bye = EntityMessage(content="bye")
+    context.add_item(bye, "prologue")
+
+    assert context.find(hi.context_id) is hi
+    assert context.iteration_of(bye.context_id) is iteration
+    assert [m.content for m in context[0].select(EntityMessage)] == ["hi", "hello"]
+    assert context[0].select(PrologueItem, role="assistant")[0].content == "hello"
+    assert context.select(EntityMessage, "prologue", role="user") == [hi, bye]
+    assert context.select(EntityMessage, start=1) == [bye]
+    assert context.last(EntityMessage, role="user") is bye
+    assert context[0].first(AgentResponse, "process").tool_calls[0].id == "call"
+    assert context[0].tool_call("call").tool_name == "search"
+    assert context.tool_result("call").results == "found"
+    assert context.tool_result("other") is None
+
+    assert context.remove_item(hi.context_id, "prologue")
+    assert context.find(hi.context_id) is None
+    assert [m.content for m in context[0].select(EntityMessage)] == ["hello"]
+    # A wrong section leaves the item in place
+    assert not context.remove_item(bye.context_id, "process")
+    assert context.find(bye.context_id) is bye
+
+    # Sections changed directly are picked up by the next query
+    iteration.prologue.append(EntityMessage(content="direct", context_id=10**9))
+    assert context.find(10**9).content == "direct"
+    assert [m.content for m in context.select(EntityMessage, start=1)] == ["bye", "direct"]
+    assert context.remove_item(10**9, "prologue")
+    assert [m.content for m in iteration.prologue] == ["bye"]
+
+    # Iterations replaced wholesale are re-indexed
+    context.iterations = context.iterations[1:]
+    assert context.select(AgentResponse) == []
+    assert context.tool_result("call") is None
+
+
+def test_context_snapshot():
+    lm = DictLM()
+    context = AgentContext(_lm=lm, tenant_id="acme")
+    context.new()
+    hi = context.add_item(EntityMessage(content="hi"), "prologue")
+    context.new()
+    context.add_item(EntityMessage(content="weather?"), "prologue")
+    shared = list(context.iterations)
+
+    branch = context.snapshot()
+    assert branch.tenant_id == "acme" and branch.session_id != context.session_id
+    assert branch.iterations == shared and branch.iterations[0] is shared[0]
+
+    # Each side copies the iteration it writes to, and keeps its own chat context
+    branch.add_item(EntityMessage(content="what if?"), "prologue")
+    context.add_item(EntityMessage(content="as planned"), "prologue")
+    assert [m.content for m in shared[1].prologue] == ["weather?"]
+    assert [m.content for m in branch.latest().prologue] == ["weather?", "what if?"]
+    assert [m.content for m in context.latest().prologue] == ["weather?", "as planned"]
+    assert branch._lm is not lm
+    assert [m["content"] for m in branch._lm.chat_context_list] == ["hi", "weather?", "what if?"]
+    assert [m["content"] for m in lm.chat_context_list] == ["hi", "weather?", "as planned"]
+
+    # Removing from a shared iteration copies it too
+    assert branch.remove_item(hi, "prologue")
+    assert branch[0].prologue == [] and context.find(hi).content == "hi"
+    assert context.iterations[0] is shared[0]
+    assert branch.select(EntityMessage, role="user")[-1].content == "what if?"
+    assert context.select(EntityMessage, role="user")[-1].content == "as planned"
+
+
+@pytest.mark.parametrize(
+    "sdk, module, name",
+    [("openai", "chetan.lm.openai", "LMOpenAI"), ("anthropic", "chetan.lm.anthropic", "LMAnthropic"), ("groq", "chetan.lm.groq", "LMGroq")],
+)
+def test_translated_messages_encode_with_stdlib_json(sdk, module, name):
+    pytest.importorskip(sdk)
+    lm = getattr(importlib.import_module(module), name)(client=object())
+    context = AgentContext(_lm=lm)
+    context.new()
+    context.add_item(SystemMessage(content="Be brief"), "prologue")
+    context.add_item(EntityMessage(name="asha", content="Weather in Pune?"), "prologue")
+    call = AgentToolCall(id="call_1", tool_name="weather.get", tool_args={"city": "Pune"})
+    context.add_item(AgentResponse(content="Checking", tool_calls=[call]), "process")
+    result = AgentToolCallResult(id="call_1", results="31C")
+    context.add_item(AgentToolCallResults(tool_call_results=[result]), "process")
+    context.add_item(AgentResponse(content="It is 31C."), "process")
+
+    assert "Pune?" in json.dumps(lm.chat_context_list)
+
+
+def test_legible_messages_hold_plain_strings():
+    messages = [
+        EntityMessage(name="asha", content="hi").to_lm_legible(),
+        *AgentToolCallResults(tool_call_results=[AgentToolCallResult(id="call_1", results="31C")]).to_lm_legible(),
+    ]
+    assert json.dumps([[m.role, m.content, m.name, m.tool_call_id] for m in messages])
@@ -0,0 +1,89 @@
+"""JSON encoding and decoding for contexts, events and provider payloads.
+
+Uses orjson when it is installed and the standard library otherwise, with the same output types
+either way. `StringRef` and `Instant` are encoded as strings, pydantic models as their dumps and
+anything else the encoder does not know as `str(obj)`.
+"""
+
+import json
+from typing import Any, Union
+
+from pydantic import BaseModel
+from whenever import Instant
+
+from chetan.types.stringref import StringRef
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, StringRef):
+        return obj._value
+    if isinstance(obj, Instant):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    return str(obj)
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumpb(obj: Any, indent: bool = False, sort_keys: bool = False) -> bytes:
+        """Encode `obj` as UTF-8 JSON.
+
+        Args:
+            obj (Any): The object to encode.
+            indent (bool, optional): Pretty print with two spaces. Defaults to False.
+            sort_keys (bool, optional): Sort object keys, e.g. for stable hashes. Defaults to False.
+
+        Returns:
+            bytes: The JSON document.
+        """
+        option = _OPTIONS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+
+    def dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> str:
+        """Encode `obj` as a JSON string, see `dumpb`."""
+        return dumpb(obj, indent=indent, sort_keys=sort_keys).decode()
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """Decode a JSON document."""
+        return orjson.loads(data)
+
+else:
+
+    def dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> str:
+        """Encode `obj` as a JSON string, see `dumpb`."""
+        return json.dumps(
+            obj,
+            default=_default,
+            indent=2 if indent else None,
+            separators=None if indent else (",", ":"),
+            sort_keys=sort_keys,
+            ensure_ascii=False,
+        )
+
+    def dumpb(obj: Any, indent: bool = False, sort_keys: bool = False) -> bytes:
+        """Encode `obj` as UTF-8 JSON.
+
+        Args:
+            obj (Any): The object to encode.
+            indent (bool, optional): Pretty print with two spaces. Defaults to False.
+            sort_keys (bool, optional): Sort object keys, e.g. for stable hashes. Defaults to False.
+
+        Returns:
+            bytes: The JSON document.
+        """
+        return dumps(obj, indent=indent, sort_keys=sort_keys).encode()
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """Decode a JSON document."""
+        return json.loads(data)
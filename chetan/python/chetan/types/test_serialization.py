@@ -0,0 +1,45 @@
+import importlib
+import sys
+
+from whenever import Instant
+
+from chetan.types import serialization
+from chetan.types.context.agent import EntityMessage
+from chetan.types.stringref import StringRef
+
+
+def payload():
+    instant = Instant.from_utc(2025, 1, 2, 3, 4, 5)
+    return {
+        "b": StringRef("ref"),
+        "a": [1, 2.5, None, True],
+        "when": {1: instant},
+        "message": EntityMessage(content="hi", role="user"),
+        "other": object,
+    }
+
+
+def check(module):
+    encoded = module.dumps(payload(), sort_keys=True)
+    assert isinstance(encoded, str) and isinstance(module.dumpb(payload()), bytes)
+    decoded = module.loads(encoded)
+    assert list(decoded) == ["a", "b", "message", "other", "when"]
+    assert decoded["when"] == {"1": "2025-01-02T03:04:05Z"}
+    assert decoded["b"] == "ref" and decoded["a"] == [1, 2.5, None, True]
+    assert decoded["message"]["content"] == "hi" and decoded["other"] == str(object)
+    assert module.loads(module.dumpb({"x": "ü"}, indent=True)) == {"x": "ü"}
+    return encoded
+
+
+def test_serialization(monkeypatch):
+    encoded = check(serialization)
+    try:
+        with monkeypatch.context() as patch:
+            patch.setitem(sys.modules, "orjson", None)  # Makes the import fail
+            fallback = importlib.reload(serialization)
+            assert fallback.orjson is None
+            assert check(fallback) == encoded
+    finally:
+        # The real orjson is back in sys.modules once the patch is undone
+        importlib.reload(serialization)
+    assert serialization.orjson is sys.modules.get("orjson")
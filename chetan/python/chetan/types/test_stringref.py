@@ -0,0 +1,47 @@
+import json
+import pickle
+
+import pytest
+from pydantic import BaseModel, ValidationError
+
+from chetan.types.stringref import StringRef, dumps_with_stringref
+
+
+class Message(BaseModel):
+    content: StringRef
+
+
+def test_stringref_behaves_like_str():
+    ref = StringRef("Hello World")
+    assert not hasattr(ref, "__weakref__") and StringRef.__slots__ == ("_value",)
+
+    upper = ref.upper()
+    assert isinstance(upper, StringRef) and upper == "HELLO WORLD"
+    assert ref.startswith("Hello") is True
+    assert ref.split() == ["Hello", "World"]
+    assert StringRef.maketrans("l", "L") == str.maketrans("l", "L")
+    assert ref.translate(StringRef.maketrans("l", "L")) == "HeLLo WorLd"
+    assert list(StringRef("ab")) == ["a", "b"]
+    assert {ref: 1}["Hello World"] == 1
+
+    alias = ref
+    alias += "!"
+    assert ref is alias and ref == "Hello World!"
+    assert pickle.loads(pickle.dumps(ref)) == "Hello World!"
+    assert dumps_with_stringref({"content": ref}) == '{"content": "Hello World!"}'
+    # The standard library encoder is left as is
+    with pytest.raises(TypeError):
+        json.dumps({"content": ref})
+
+
+def test_stringref_validation():
+    assert type(Message(content="hi").content) is StringRef
+    assert Message(content=3).content == "3"
+    assert Message.model_validate_json('{"content": "hi"}').content == "hi"
+    assert Message(content="hi").model_dump_json() == '{"content":"hi"}'
+    ref = StringRef("shared")
+    assert Message(content=ref).content is ref
+    with pytest.raises(ValidationError):
+        Message(content=None)
+    with pytest.raises(ValidationError):
+        Message(content=["a"])